@@ -96,3 +96,27 @@ export const _delete = <T>(uri: string): Promise<AxiosResponse<T>> => {
     uri = cleanURI(uri);
     return axios.delete(`${SERVER_URL}/${uri}`, makeConfig());
 };
+
+/**
+ * Open a server-sent events stream, and call the listener of each event type with
+ * the data of the events of that type. The browser reconnects on its own if the
+ * stream is interrupted. Returns the stream, to be closed when no longer needed,
+ * or null if the browser does not support server-sent events.
+ */
+export const subscribe = (
+    uri: string,
+    listeners: { [eventType: string]: (data: any) => void }
+): EventSource | null => {
+    if (typeof EventSource === "undefined") {
+        return null;
+    }
+
+    uri = cleanURI(uri);
+    const source = new EventSource(`${SERVER_URL}/${uri}`, { withCredentials: true });
+    Object.entries(listeners).forEach(([eventType, listener]) =>
+        source.addEventListener(eventType, (event) =>
+            listener(JSON.parse((event as MessageEvent).data))
+        )
+    );
+    return source;
+};
@@ -39,33 +39,35 @@ export const teamOrderListSerialization = (
                 (hardware) =>
                     (hardwareRequested[hardware.id] = hardware.requested_quantity)
             );
-            order.items.forEach(({ id, hardware_id, part_returned_health }) => {
-                if (part_returned_health) {
-                    const returnItemKey = `${hardware_id}-${part_returned_health}`;
-                    if (returnedItems[returnItemKey])
-                        returnedItems[returnItemKey].quantity += 1;
-                    else {
-                        const date = new Date(order.updated_at);
-                        returnedItems[returnItemKey] = {
-                            id,
-                            quantity: 1,
-                            part_returned_health,
-                            hardware_id,
-                            time: `${date.toLocaleTimeString()} (${date.toDateString()})`,
-                        };
+            order.items.forEach(
+                ({ id, hardware_id, part_returned_health, quantity }) => {
+                    if (part_returned_health) {
+                        const returnItemKey = `${hardware_id}-${part_returned_health}`;
+                        if (returnedItems[returnItemKey])
+                            returnedItems[returnItemKey].quantity += quantity;
+                        else {
+                            const date = new Date(order.updated_at);
+                            returnedItems[returnItemKey] = {
+                                id,
+                                quantity,
+                                part_returned_health,
+                                hardware_id,
+                                time: `${date.toLocaleTimeString()} (${date.toDateString()})`,
+                            };
+                        }
+                    } else {
+                        if (hardwareItems[hardware_id])
+                            hardwareItems[hardware_id].quantityGranted += quantity;
+                        else
+                            hardwareItems[hardware_id] = {
+                                id: hardware_id,
+                                quantityGranted: quantity,
+                                quantityRequested: hardwareRequested[hardware_id],
+                            };
                     }
-                } else {
-                    if (hardwareItems[hardware_id])
-                        hardwareItems[hardware_id].quantityGranted += 1;
-                    else
-                        hardwareItems[hardware_id] = {
-                            id: hardware_id,
-                            quantityGranted: 1,
-                            quantityRequested: hardwareRequested[hardware_id],
-                        };
+                    hardwareIdsToFetch[hardware_id] = hardware_id;
                 }
-                hardwareIdsToFetch[hardware_id] = hardware_id;
-            });
+            );
             const returnedHardware = Object.values(returnedItems);
             if (returnedHardware.length)
                 returnedOrders.push({
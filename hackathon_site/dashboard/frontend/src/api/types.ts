@@ -132,6 +132,20 @@ export interface OrderFilters {
     search?: string;
 }
 
+/** Hardware events API */
+export interface HardwareStockEvent {
+    type: "hardware";
+    id: number;
+    quantity_remaining: number;
+}
+
+export interface OrderStatusEvent {
+    type: "order";
+    id: number;
+    team_id: number;
+    status: OrderStatus;
+}
+
 /** Sanitized Orders */
 export interface OrderItemTableRow {
     id: number;
@@ -173,6 +187,7 @@ export interface OrderItem {
     hardware_id: number;
     order: number;
     part_returned_health: PartReturnedHealth | null;
+    quantity: number;
     time_occurred: string;
 }
 
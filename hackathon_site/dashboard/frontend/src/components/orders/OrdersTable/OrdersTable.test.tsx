@@ -64,11 +64,13 @@ describe("Orders Table", () => {
                     id: 6,
                     hardware_id: 3,
                     part_returned_health: null,
+                    quantity: 1,
                 },
                 {
                     id: 7,
                     hardware_id: 4,
                     part_returned_health: null,
+                    quantity: 1,
                 },
             ],
         }; // initialize grid value getter params
@@ -27,7 +27,9 @@ interface IOrderStateIcon {
 
 export const orderQtyValueGetter = (params: any) => {
     const items = params?.value as ItemsInOrder[] | undefined;
-    return Array.isArray(items) ? items.length : 0;
+    return Array.isArray(items)
+        ? items.reduce((total, item) => total + item.quantity, 0)
+        : 0;
 };
 
 const OrderStateIcon = ({ status }: IOrderStateIcon) => {
@@ -70,7 +70,10 @@ const AdminDashboard = () => {
                                 ) && (
                                     <OrderCard
                                         teamCode={order.team_code}
-                                        orderQuantity={order.items.length}
+                                        orderQuantity={order.items.reduce(
+                                            (total, item) => total + item.quantity,
+                                            0
+                                        )}
                                         time={order.updated_at}
                                         id={order.id}
                                         status={order.status}
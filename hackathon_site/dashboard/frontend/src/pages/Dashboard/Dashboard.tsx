@@ -28,13 +28,19 @@ import {
     orderErrorSelector,
     isLoadingSelector as areOrdersLoadingSelector,
 } from "slices/order/orderSlice";
-import { getHardwareWithFilters, setFilters } from "slices/hardware/hardwareSlice";
+import {
+    getHardwareWithFilters,
+    setFilters,
+    updateHardwareStock,
+} from "slices/hardware/hardwareSlice";
 import { getCategories } from "slices/hardware/categorySlice";
 import AlertBox from "components/general/AlertBox/AlertBox";
 import { openTeamModalItem } from "slices/ui/uiSlice";
 import EditTeam from "components/dashboard/EditTeam/EditTeam";
 import DateRestrictionAlert from "components/general/DateRestrictionAlert/DateRestrictionAlert";
 import ProjectDescription from "components/teamDetail/ProjectDescription/ProjectDescription";
+import { subscribe } from "api/api";
+import { HardwareStockEvent } from "api/types";
 
 const Dashboard = () => {
     const dispatch = useDispatch();
@@ -52,6 +58,16 @@ const Dashboard = () => {
         dispatch(getTeamOrders());
     }, [dispatch]);
 
+    // Keep the stock and the team's orders up to date as they change
+    useEffect(() => {
+        const source = subscribe("/api/hardware/events/", {
+            hardware: (event: HardwareStockEvent) =>
+                dispatch(updateHardwareStock(event)),
+            order: () => dispatch(getTeamOrders()),
+        });
+        return () => source?.close();
+    }, [dispatch]);
+
     useEffect(() => {
         if (hardwareInOrders) {
             dispatch(setFilters({ hardware_ids: hardwareInOrders }));
@@ -26,11 +26,14 @@ import {
     hardwareSelectors,
     isMoreLoadingSelector,
     isLoadingSelector,
+    updateHardwareStock,
 } from "slices/hardware/hardwareSlice";
 import { getCategories } from "slices/hardware/categorySlice";
 import { Grid } from "@material-ui/core";
 import { userTypeSelector } from "slices/users/userSlice";
 import DateRestrictionAlert from "components/general/DateRestrictionAlert/DateRestrictionAlert";
+import { subscribe } from "api/api";
+import { HardwareStockEvent } from "api/types";
 
 const Inventory = () => {
     const dispatch = useDispatch();
@@ -60,6 +63,15 @@ const Inventory = () => {
         dispatch(getCategories());
     }, [dispatch]);
 
+    // Keep the stock up to date as orders are placed and returned
+    useEffect(() => {
+        const source = subscribe("/api/hardware/events/", {
+            hardware: (event: HardwareStockEvent) =>
+                dispatch(updateHardwareStock(event)),
+        });
+        return () => source?.close();
+    }, [dispatch]);
+
     return (
         <>
             <Header />
@@ -16,6 +16,7 @@ import {
 } from "slices/order/adminOrderSlice";
 import { clearFilters } from "slices/hardware/hardwareSlice";
 import { OrdersTable } from "components/orders/OrdersTable/OrdersTable";
+import { subscribe } from "api/api";
 
 const Orders = () => {
     const dispatch = useDispatch();
@@ -30,6 +31,14 @@ const Orders = () => {
         dispatch(getOrdersWithFilters());
     }, [dispatch]);
 
+    // Reload the orders when one is placed or changes status
+    useEffect(() => {
+        const source = subscribe("/api/hardware/events/", {
+            order: () => dispatch(getOrdersWithFilters()),
+        });
+        return () => source?.close();
+    }, [dispatch]);
+
     return (
         <>
             <Header />
@@ -10,11 +10,13 @@ import {
     updateCart,
     submitOrder,
     OrderResponse,
+    OrderTicket,
+    ORDER_TICKET_MAX_POLLS,
 } from "slices/hardware/cartSlice";
 import { makeStoreWithEntities, waitFor } from "testing/utils";
 import { mockCartItems } from "testing/mockData";
 import { displaySnackbar } from "slices/ui/uiSlice";
-import { post } from "api/api";
+import { get, post } from "api/api";
 import thunk, { ThunkDispatch } from "redux-thunk";
 import { AnyAction } from "redux";
 import configureStore from "redux-mock-store";
@@ -27,9 +29,11 @@ const mockState: RootState = {
 
 jest.mock("api/api", () => ({
     ...jest.requireActual("api/api"),
+    get: jest.fn(),
     post: jest.fn(),
 }));
 
+const mockedGet = get as jest.MockedFunction<typeof get>;
 const mockedPost = post as jest.MockedFunction<typeof post>;
 
 type DispatchExts = ThunkDispatch<RootState, void, AnyAction>;
@@ -279,4 +283,42 @@ describe("submitOrder Thunk and Reducer", () => {
             errors: orderFulfillmentFailureResponse.data.errors,
         });
     });
+
+    it("Stops waiting for a queued order after too many polls", async () => {
+        const queuedTicketResponse: AxiosResponse<OrderTicket> = {
+            config: {},
+            headers: {},
+            status: 202,
+            statusText: "Accepted",
+            data: {
+                id: 1,
+                status: "Queued",
+                queue_position: 1,
+                order: null,
+                response: null,
+            },
+        };
+        mockedPost.mockResolvedValueOnce(queuedTicketResponse);
+        mockedGet.mockClear();
+        mockedGet.mockResolvedValue(queuedTicketResponse);
+        const setTimeoutSpy = jest
+            .spyOn(global, "setTimeout")
+            .mockImplementation((callback: any) => {
+                callback();
+                return 0 as any;
+            });
+
+        const store = mockStore(mockState);
+        await store.dispatch(submitOrder());
+        setTimeoutSpy.mockRestore();
+
+        expect(mockedGet).toHaveBeenCalledTimes(ORDER_TICKET_MAX_POLLS);
+        expect(store.getActions()).toContainEqual(
+            displaySnackbar({
+                message:
+                    "Your order is taking longer than expected to process. Check your orders before submitting it again.",
+                options: { variant: "error" },
+            })
+        );
+    });
 });
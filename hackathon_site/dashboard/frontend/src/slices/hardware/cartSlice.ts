@@ -8,7 +8,7 @@ import {
 } from "@reduxjs/toolkit";
 import { AppDispatch, RootState } from "slices/store";
 import { CartItem } from "api/types";
-import { post } from "api/api";
+import { get, post } from "api/api";
 import { push } from "connected-react-router";
 import { displaySnackbar } from "slices/ui/uiSlice";
 
@@ -52,6 +52,34 @@ export interface OrderResponse {
     errors: fulfillmentError[];
 }
 
+// Returned instead of an OrderResponse when the order queue is enabled
+export interface OrderTicket {
+    id: number;
+    status: "Queued" | "Completed" | "Rejected";
+    queue_position: number | null;
+    order: number | null;
+    response: OrderResponse | { errors: string[] } | null;
+}
+
+const ORDER_TICKET_POLL_INTERVAL = 1000;
+// Give up after two minutes, the ticket is still returned as queued
+export const ORDER_TICKET_MAX_POLLS = 120;
+
+const waitForOrderTicket = async (ticket: OrderTicket): Promise<OrderTicket> => {
+    for (
+        let polls = 0;
+        ticket.status === "Queued" && polls < ORDER_TICKET_MAX_POLLS;
+        polls++
+    ) {
+        await new Promise((resolve) => setTimeout(resolve, ORDER_TICKET_POLL_INTERVAL));
+        const response = await get<OrderTicket>(
+            `/api/hardware/orders/tickets/${ticket.id}/`
+        );
+        ticket = response.data;
+    }
+    return ticket;
+};
+
 export const submitOrder = createAsyncThunk<
     OrderResponse,
     void,
@@ -67,11 +95,45 @@ export const submitOrder = createAsyncThunk<
             }));
 
         try {
-            const response = await post<OrderResponse>("/api/hardware/orders/", {
-                hardware: cartItems,
-            });
+            const response = await post<OrderResponse | OrderTicket>(
+                "/api/hardware/orders/",
+                {
+                    hardware: cartItems,
+                }
+            );
+            let orderResponse: OrderResponse;
+            if (response.status === 202) {
+                // The order was queued, wait until it has been allocated
+                const ticket = await waitForOrderTicket(response.data as OrderTicket);
+                if (ticket.status === "Queued") {
+                    const message =
+                        "Your order is taking longer than expected to process. Check your orders before submitting it again.";
+                    dispatch(
+                        displaySnackbar({
+                            message,
+                            options: { variant: "error" },
+                        })
+                    );
+                    return rejectWithValue({ status: 504, message: [message] });
+                }
+                if (ticket.status === "Rejected") {
+                    dispatch(
+                        displaySnackbar({
+                            message: "There are some problems with your order.",
+                            options: { variant: "error" },
+                        })
+                    );
+                    return rejectWithValue({
+                        status: 400,
+                        message: (ticket.response as { errors: string[] }).errors,
+                    });
+                }
+                orderResponse = ticket.response as OrderResponse;
+            } else {
+                orderResponse = response.data as OrderResponse;
+            }
             dispatch(push("/"));
-            if (response.data?.errors?.length > 0) {
+            if (orderResponse?.errors?.length > 0) {
                 dispatch(
                     displaySnackbar({
                         message: "Order has been submitted with modifications",
@@ -90,7 +152,7 @@ export const submitOrder = createAsyncThunk<
                     })
                 );
             }
-            return response.data;
+            return orderResponse;
         } catch (e: any) {
             // order reached quantity limits
             const errorData = e.response?.data?.non_field_errors;
@@ -10,6 +10,7 @@ import {
     hardwareSelectors,
     getHardwareNextPage,
     getUpdatedHardwareDetails,
+    updateHardwareStock,
 } from "slices/hardware/hardwareSlice";
 import { get, stripHostnameReturnFilters } from "api/api";
 import { AnyAction } from "redux";
@@ -257,3 +258,28 @@ describe("getUpdatedHardwareDetails thunk", () => {
         );
     });
 });
+
+describe("updateHardwareStock", () => {
+    it("Updates the quantity remaining of loaded hardware", () => {
+        const store = makeStoreWithEntities({ hardware: mockHardware });
+
+        store.dispatch(
+            updateHardwareStock({ type: "hardware", id: 1, quantity_remaining: 0 })
+        );
+        expect(hardwareSelectors.selectById(store.getState(), 1)).toEqual({
+            ...mockHardware[0],
+            quantity_remaining: 0,
+        });
+    });
+
+    it("Ignores hardware which is not loaded", () => {
+        const store = makeStoreWithEntities({ hardware: mockHardware });
+
+        store.dispatch(
+            updateHardwareStock({ type: "hardware", id: 10000, quantity_remaining: 0 })
+        );
+        expect(hardwareSelectors.selectTotal(store.getState())).toEqual(
+            mockHardware.length
+        );
+    });
+});
@@ -7,7 +7,12 @@ import {
 } from "@reduxjs/toolkit";
 import { RootState, AppDispatch } from "slices/store";
 
-import { APIListResponse, Hardware, HardwareFilters } from "api/types";
+import {
+    APIListResponse,
+    Hardware,
+    HardwareFilters,
+    HardwareStockEvent,
+} from "api/types";
 import { get, stripHostnameReturnFilters } from "api/api";
 import { displaySnackbar } from "slices/ui/uiSlice";
 
@@ -177,6 +182,20 @@ const hardwareSlice = createSlice({
         removeProductOverviewItem: (state: HardwareState) => {
             state.hardwareIdInProductOverview = null;
         },
+
+        /**
+         * Apply a stock change pushed by the hardware events stream. Hardware which
+         * is not loaded is ignored.
+         */
+        updateHardwareStock: (
+            state: HardwareState,
+            { payload }: PayloadAction<HardwareStockEvent>
+        ) => {
+            hardwareAdapter.updateOne(state, {
+                id: payload.id,
+                changes: { quantity_remaining: payload.quantity_remaining },
+            });
+        },
     },
     extraReducers: (builder) => {
         builder.addCase(getHardwareWithFilters.pending, (state) => {
@@ -250,7 +269,12 @@ const hardwareSlice = createSlice({
 export const { actions, reducer } = hardwareSlice;
 export default reducer;
 
-export const { setFilters, clearFilters, removeProductOverviewItem } = actions;
+export const {
+    setFilters,
+    clearFilters,
+    removeProductOverviewItem,
+    updateHardwareStock,
+} = actions;
 
 // Selectors
 export const hardwareSliceSelector = (state: RootState) => state[hardwareReducerName];
@@ -599,11 +599,13 @@ export const mockPendingOrders: Order[] = [
                 id: 6,
                 hardware_id: 3,
                 part_returned_health: null,
+                quantity: 1,
             },
             {
                 id: 7,
                 hardware_id: 4,
                 part_returned_health: null,
+                quantity: 1,
             },
         ],
         team_id: 2,
@@ -629,16 +631,19 @@ export const mockPendingOrders: Order[] = [
                 id: 8,
                 hardware_id: 4,
                 part_returned_health: null,
+                quantity: 1,
             },
             {
                 id: 9,
                 hardware_id: 1,
                 part_returned_health: null,
+                quantity: 1,
             },
             {
                 id: 11,
                 hardware_id: 1,
                 part_returned_health: null,
+                quantity: 1,
             },
         ],
         team_id: 2,
@@ -664,6 +669,7 @@ export const mockPendingOrders: Order[] = [
                 id: 10,
                 hardware_id: 10,
                 part_returned_health: null,
+                quantity: 1,
             },
         ],
         team_id: 1,
@@ -685,6 +691,7 @@ export const mockPendingOrders: Order[] = [
                 id: 12,
                 hardware_id: 10,
                 part_returned_health: null,
+                quantity: 1,
             },
         ],
         team_id: 1,
@@ -709,11 +716,13 @@ export const mockCheckedOutOrders: Order[] = [
                 id: 1,
                 hardware_id: 1,
                 part_returned_health: null,
+                quantity: 1,
             },
             {
                 id: 2,
                 hardware_id: 1,
                 part_returned_health: null,
+                quantity: 1,
             },
         ],
         team_id: 2,
@@ -735,16 +744,19 @@ export const mockCheckedOutOrders: Order[] = [
                 id: 3,
                 hardware_id: 1,
                 part_returned_health: "Healthy",
+                quantity: 1,
             },
             {
                 id: 4,
                 hardware_id: 1,
                 part_returned_health: null,
+                quantity: 1,
             },
             {
                 id: 5,
                 hardware_id: 2,
                 part_returned_health: null,
+                quantity: 1,
             },
         ],
         team_id: 2,
@@ -770,16 +782,19 @@ export const mockCheckedOutOrders: Order[] = [
                 id: 10,
                 hardware_id: 10,
                 part_returned_health: null,
+                quantity: 1,
             },
             {
                 id: 11,
                 hardware_id: 10,
                 part_returned_health: "Heavily Used",
+                quantity: 1,
             },
             {
                 id: 12,
                 hardware_id: 10,
                 part_returned_health: null,
+                quantity: 1,
             },
         ],
         team_id: 1,
@@ -805,16 +820,19 @@ export const mockSubmittedOrder: Order = {
             id: 8,
             hardware_id: 4,
             part_returned_health: null,
+            quantity: 1,
         },
         {
             id: 9,
             hardware_id: 1,
             part_returned_health: null,
+            quantity: 1,
         },
         {
             id: 11,
             hardware_id: 1,
             part_returned_health: null,
+            quantity: 1,
         },
     ],
     team_id: 2,
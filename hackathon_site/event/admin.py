@@ -1,10 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.db.models import Count
+from django.utils import timezone
 from import_export import resources
 from import_export.admin import ExportMixin
 
-from event.models import Profile, Team as EventTeam, User
+from event.models import OutboxEmail, Profile, Team as EventTeam, User
 from hardware.admin import OrderInline
 
 admin.site.unregister(User)
@@ -96,5 +97,36 @@ class EventTeamAdmin(admin.ModelAdmin):
         return obj.members_count
 
 
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "subject",
+        "get_recipients",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+        "sent_at",
+    )
+    list_filter = ("status",)
+    search_fields = ("subject", "to")
+    readonly_fields = ("created_at", "sent_at", "last_error")
+    actions = ("retry",)
+
+    @admin.display(description="To")
+    def get_recipients(self, obj):
+        return ", ".join(obj.to)
+
+    @admin.action(description="Retry the selected emails now")
+    def retry(self, request, queryset):
+        retried = queryset.exclude(status="Sent").update(
+            status="Pending", attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(
+            request, f"Queued {retried} email(s) to be sent again.", messages.SUCCESS
+        )
+
+
 # Register your models here.
 admin.site.register(Profile)
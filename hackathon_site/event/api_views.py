@@ -1,12 +1,9 @@
 import logging
 
-from django.core import mail
-from django.core.mail import send_mail
 from django.db import transaction
 from django.db.models import Q
 from django.conf import settings
 from django.http import HttpResponseServerError
-from django.template.loader import render_to_string
 from drf_yasg.utils import swagger_auto_schema
 
 from rest_framework import generics, mixins, status, permissions
@@ -28,7 +25,9 @@ from hardware.serializers import (
     TeamOrderChangeSerializer,
 )
 from event.permissions import UserHasProfile, FullDjangoModelPermissions
-from hardware.models import OrderItem, Order, Incident
+from hardware.etags import conditional_response
+from hardware.models import OrderItem, Order, Incident, OrderNotification
+from hardware.notifications import admin_notification, status_change_notification
 
 logger = logging.getLogger(__name__)
 
@@ -268,10 +267,12 @@ class CurrentProfileView(
 class CurrentTeamOrderListView(generics.ListAPIView):
     serializer_class = OrderListSerializer
     permission_classes = [UserHasProfile]
+    etag_vary_on_team = True
 
     def get_queryset(self):
         return Order.objects.filter(team_id=self.request.user.profile.team_id)
 
+    @conditional_response
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
@@ -341,64 +342,25 @@ class TeamOrderDetailView(mixins.UpdateModelMixin, generics.GenericAPIView):
         if order_team != user_team:
             raise PermissionDenied("Can only change the status of your orders.")
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         response = self.partial_update(request, *args, **kwargs)
 
         if "status" in request.data:
-            profiles = Profile.objects.filter(team__exact=response.data["team_id"])
-            connection = mail.get_connection(fail_silently=False)
-            connection.open()
-
-            try:
-                render_to_string_context = {
-                    "recipient": "Hardware Inventory Admins",
-                    "order": response.data,
-                    "order_status_message": f'{ORDER_STATUS_MSG[response.data["status"]]} by {request.user.first_name}',
-                }
-                send_mail(
-                    subject=render_to_string(
+            message = f'{ORDER_STATUS_MSG[response.data["status"]]} by {request.user.first_name}'
+            OrderNotification.objects.bulk_create(
+                [
+                    admin_notification(
                         self.update_order_email_subject_template,
-                        render_to_string_context,
-                    ),
-                    message=render_to_string(
                         self.update_order_email_template_admin,
-                        render_to_string_context,
+                        {"order": response.data, "order_status_message": message},
                     ),
-                    html_message=render_to_string(
-                        self.update_order_email_template_admin,
-                        render_to_string_context,
+                    status_change_notification(
+                        response.data["team_id"],
+                        response.data,
+                        message,
+                        ORDER_STATUS_CLOSING_MSG[response.data["status"]],
                     ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    connection=connection,
-                    recipient_list=[settings.HSS_ADMIN_EMAIL],
-                )
-                for profile in profiles:
-                    render_to_string_context = {
-                        **render_to_string_context,
-                        "recipient": profile.user,
-                        "order_status_closing_message": ORDER_STATUS_CLOSING_MSG[
-                            response.data["status"]
-                        ],
-                    }
-                    profile.user.email_user(
-                        subject=render_to_string(
-                            self.update_order_email_subject_template,
-                            render_to_string_context,
-                        ),
-                        message=render_to_string(
-                            self.update_order_email_template_participant,
-                            render_to_string_context,
-                        ),
-                        html_message=render_to_string(
-                            self.update_order_email_template_participant,
-                            render_to_string_context,
-                        ),
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        connection=connection,
-                    )
-            except Exception as e:
-                logger.error(e)
-                raise e
-            finally:
-                connection.close()
+                ]
+            )
         return response
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from event.models import OutboxEmail
+from event.outbox import OutboxSender, deliver_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the emails queued in the outbox, retrying failed emails with an "
+        "exponential backoff. Must be running for any email to be sent. Several "
+        "instances can run at the same time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.EMAIL_OUTBOX_BATCH_SIZE,
+            help="Number of emails claimed at a time.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="Seconds to wait before polling an empty outbox again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the emails which are currently due, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        sender = OutboxSender()
+        try:
+            while True:
+                (sent, failed) = deliver_batch(sender, options["batch_size"])
+                if sent or failed:
+                    self.report(sent, failed)
+                if sent + failed < options["batch_size"]:
+                    if options["once"]:
+                        return
+                    # Nothing left to send, do not keep the connection open while
+                    # waiting for more
+                    sender.close()
+                    time.sleep(options["interval"])
+        finally:
+            sender.close()
+
+    def report(self, sent, failed):
+        dead = OutboxEmail.objects.filter(status="Dead").count()
+        self.stdout.write(
+            f"Sent {sent} email(s), {failed} failed. {dead} email(s) in total failed "
+            f"too many times and will not be retried."
+        )
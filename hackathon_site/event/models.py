@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives
+from django.utils import timezone
 import uuid
 
 User = get_user_model()
@@ -46,3 +48,85 @@ class Profile(models.Model):
 
     def __str__(self):
         return f"{self.id} | {self.user.first_name} {self.user.last_name}"
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+    def queue(self, emails):
+        """
+        Record emails (EmailMessage or EmailMultiAlternatives instances) in the
+        outbox, to be sent by the send_outbox_emails management command. Call this
+        in the transaction of the change the emails are about, so that they are
+        only sent if it commits.
+        """
+        return self.bulk_create(
+            [
+                OutboxEmail(
+                    subject=email.subject,
+                    body=email.body,
+                    html_body=next(
+                        (
+                            content
+                            for (content, mimetype) in getattr(
+                                email, "alternatives", []
+                            )
+                            if mimetype == "text/html"
+                        ),
+                        "",
+                    ),
+                    from_email=email.from_email,
+                    to=[recipient for recipient in email.to if recipient],
+                )
+                for email in emails
+                if any(email.to)
+            ]
+        )
+
+
+class OutboxEmail(models.Model):
+    """
+    An email waiting to be sent, or sent, by the send_outbox_emails management
+    command. Emails which fail are retried with an exponential backoff, and are
+    moved to the Dead state after settings.EMAIL_OUTBOX_MAX_ATTEMPTS attempts.
+    """
+
+    STATUS_CHOICES = [
+        ("Pending", "Pending"),
+        ("Sent", "Sent"),
+        ("Dead", "Dead"),
+    ]
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    subject = models.TextField(null=False)
+    body = models.TextField(null=False)
+    html_body = models.TextField(blank=True, null=False, default="")
+    from_email = models.CharField(max_length=255, null=False)
+    to = models.JSONField(null=False)
+
+    status = models.CharField(max_length=64, choices=STATUS_CHOICES, default="Pending")
+    attempts = models.PositiveIntegerField(default=0, null=False)
+    # Pending emails are sent from this time on. Claimed emails are pushed back by
+    # settings.EMAIL_OUTBOX_LEASE_TIME, so that another worker retries them if the
+    # one which claimed them dies before recording the outcome.
+    next_attempt_at = models.DateTimeField(default=timezone.now, null=False)
+    last_error = models.TextField(blank=True, null=False, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    sent_at = models.DateTimeField(null=True)
+
+    def to_message(self):
+        email = EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+        )
+        if self.html_body:
+            email.attach_alternative(self.html_body, "text/html")
+        return email
+
+    def __str__(self):
+        return f"{self.id} | {self.subject}"
@@ -0,0 +1,167 @@
+import re
+import secrets
+from functools import lru_cache
+from html import unescape
+
+from django.conf import settings
+from django.template import loader
+from markupsafe import Markup, escape
+
+from event.outbox import build_email
+
+
+@lru_cache(maxsize=None)
+def _get_cached_template(template_name):
+    return loader.get_template(template_name)
+
+
+def get_template(template_name):
+    """
+    The template, loaded and compiled once per process. Templates are reloaded
+    every time in DEBUG, so that changes to them show up without a restart.
+    """
+    if settings.DEBUG:
+        return loader.get_template(template_name)
+    return _get_cached_template(template_name)
+
+
+_BLOCK_TAGS = {"div", "h1", "h2", "h3", "h4", "h5", "h6", "ol", "p", "table", "ul"}
+_WHITESPACE_RE = re.compile(r"\s+")
+_HIDDEN_RE = re.compile(r"<(head|script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_LINK_RE = re.compile(r'<a\b[^>]*?\bhref="([^"]*)"[^>]*>(.*?)</a>', re.IGNORECASE)
+_CELL_RE = re.compile(r"</t[dh]>\s*(?=<t[dh][\s>])", re.IGNORECASE)
+_TAG_RE = re.compile(r"<!--.*?-->|<![^>]*>|<(/?)([a-zA-Z0-9]+)[^>]*>")
+
+
+def _replace_link(match):
+    (href, text) = match.groups()
+    if href and href not in text:
+        return f"{text} ({href})"
+    return text
+
+
+def _replace_tag(match):
+    (closing, tag) = match.groups()
+    tag = (tag or "").lower()
+    if tag in _BLOCK_TAGS:
+        return "\n\n"
+    if tag == "br":
+        return "\n"
+    if closing:
+        return ""
+    if tag == "tr":
+        return "\n"
+    if tag == "li":
+        return "\n- "
+    return ""
+
+
+def html_to_text(html):
+    """
+    The plain text version of an HTML email: paragraphs separated by blank lines,
+    table rows on their own lines with their cells separated by |, and the address
+    of links after their text.
+    """
+    text = _WHITESPACE_RE.sub(" ", _HIDDEN_RE.sub("", html))
+    text = _LINK_RE.sub(_replace_link, text)
+    text = _CELL_RE.sub(" | ", text)
+    text = unescape(_TAG_RE.sub(_replace_tag, text))
+    lines = (_WHITESPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+# Tokens are unique to the process, so that the text of an email cannot contain one
+_TOKEN_PREFIX = f"__recipient_{secrets.token_hex(8)}_"
+
+
+class RecipientPlaceholder:
+    """
+    Stands in for the recipient while a notification is rendered. Each attribute
+    path read from it renders as a token, which Notification replaces with the
+    value of the path for each recipient.
+    """
+
+    def __init__(self, tokens, path=()):
+        self._tokens = tokens
+        self._path = path
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return RecipientPlaceholder(self._tokens, (*self._path, name))
+
+    def __str__(self):
+        return self._tokens.setdefault(
+            self._path, f"{_TOKEN_PREFIX}{len(self._tokens)}__"
+        )
+
+    def __html__(self):
+        return str(self)
+
+
+def resolve_path(value, path):
+    for name in path:
+        value = getattr(value, name, None)
+        if value is None:
+            return ""
+    return str(value)
+
+
+class Notification:
+    """
+    An email sent to several recipients, for which only the recipient changes.
+    The subject and body templates are rendered once, with a RecipientPlaceholder
+    as the recipient variable, recipient_name in the templates, and the fields of
+    each recipient are substituted in the rendered text. The plain text alternative
+    is converted from the HTML body.
+
+    The templates may only output the fields of the recipient, as is or with
+    striptags, and not test them: they are substituted like
+    {{ recipient.first_name|striptags }} renders.
+    """
+
+    def __init__(
+        self, subject_template, body_template, context, recipient_name="recipient"
+    ):
+        tokens = {}
+        context = {**context, recipient_name: RecipientPlaceholder(tokens)}
+        # Force the subject to a single line to avoid header injection
+        self.subject = "".join(
+            get_template(subject_template).render(context).splitlines()
+        )
+        self.html = get_template(body_template).render(context)
+        self.text = html_to_text(self.html)
+
+        self.paths = {token: path for (path, token) in tokens.items()}
+        self.pattern = re.compile("|".join(map(re.escape, self.paths)))
+
+    def render(self, recipient):
+        """
+        Returns (subject, text, html) for recipient.
+        """
+        if not self.paths:
+            return (self.subject, self.text, self.html)
+
+        text_values = {
+            token: Markup(resolve_path(recipient, path)).striptags()
+            for (token, path) in self.paths.items()
+        }
+        html_values = {token: escape(value) for (token, value) in text_values.items()}
+
+        def substitute(string, values):
+            return self.pattern.sub(lambda match: values[match.group()], string)
+
+        return (
+            substitute(self.subject, html_values),
+            substitute(self.text, text_values),
+            substitute(self.html, html_values),
+        )
+
+    def to_email(self, recipient, recipient_list):
+        (subject, text, html) = self.render(recipient)
+        return build_email(
+            subject=subject,
+            message=text,
+            html_message=html,
+            recipient_list=recipient_list,
+        )
@@ -0,0 +1,146 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
+
+from event.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def build_email(subject, message, recipient_list, html_message=None, from_email=None):
+    """
+    Build an email like send_mail does, to be queued with OutboxEmail.objects.queue
+    instead of being sent right away.
+    """
+    email = mail.EmailMultiAlternatives(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=recipient_list,
+    )
+    if html_message:
+        email.attach_alternative(html_message, "text/html")
+    return email
+
+
+def get_retry_delay(attempts):
+    """
+    Time to wait before the next attempt after the given number of failed attempts,
+    doubling from settings.EMAIL_OUTBOX_RETRY_DELAY up to
+    settings.EMAIL_OUTBOX_MAX_RETRY_DELAY.
+    """
+    return min(
+        settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.EMAIL_OUTBOX_MAX_RETRY_DELAY,
+    )
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to batch_size pending emails which are due, oldest first, and return
+    them. Their next attempt is pushed back by settings.EMAIL_OUTBOX_LEASE_TIME, so
+    that other workers skip them meanwhile.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        email_ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="Pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        OutboxEmail.objects.filter(id__in=email_ids).update(
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_TIME)
+        )
+    return list(OutboxEmail.objects.filter(id__in=email_ids).order_by("id"))
+
+
+class OutboxSender:
+    """
+    Sends emails over a connection to the email backend which is kept open between
+    batches, and reopened after an error or once
+    settings.EMAIL_OUTBOX_MESSAGES_PER_CONNECTION emails were sent over it, as SMTP
+    servers limit the number of emails per connection.
+    """
+
+    def __init__(self):
+        self.connection = None
+        self.sent_over_connection = 0
+
+    def send(self, outbox_email):
+        self.send_message(outbox_email.to_message())
+
+    def send_message(self, message):
+        if self.sent_over_connection >= settings.EMAIL_OUTBOX_MESSAGES_PER_CONNECTION:
+            self.close()
+        if self.connection is None:
+            self.connection = mail.get_connection(fail_silently=False)
+            self.connection.open()
+        try:
+            self.connection.send_messages([message])
+        except Exception:
+            self.close()
+            raise
+        self.sent_over_connection += 1
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                # The connection is dropped either way
+                logger.exception("Failed to close the email connection")
+        self.connection = None
+        self.sent_over_connection = 0
+
+
+def deliver_batch(sender, batch_size):
+    """
+    Claim and send the next batch of emails with sender, and record the outcome of
+    each. Returns (sent, failed), the numbers of emails sent and failed.
+    """
+    sent = failed = 0
+    for outbox_email in claim_batch(batch_size):
+        attempts = outbox_email.attempts + 1
+        try:
+            sender.send(outbox_email)
+        except Exception as e:
+            failed += 1
+            logger.warning(f"Failed to send email {outbox_email.id}: {e!r}")
+            dead = attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+            OutboxEmail.objects.filter(id=outbox_email.id).update(
+                status="Dead" if dead else "Pending",
+                attempts=attempts,
+                last_error=repr(e),
+                next_attempt_at=timezone.now()
+                + timedelta(seconds=get_retry_delay(attempts)),
+            )
+        else:
+            sent += 1
+            OutboxEmail.objects.filter(id=outbox_email.id).update(
+                status="Sent", attempts=attempts, sent_at=timezone.now()
+            )
+    return (sent, failed)
+
+
+def deliver_pending(batch_size=None):
+    """
+    Send all the emails which are due, and return (sent, failed). Used by tests and
+    for one-off runs, the send_outbox_emails command keeps polling.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    sender = OutboxSender()
+    sent = failed = 0
+    try:
+        while True:
+            (batch_sent, batch_failed) = deliver_batch(sender, batch_size)
+            sent += batch_sent
+            failed += batch_failed
+            if batch_sent + batch_failed < batch_size:
+                return (sent, failed)
+    finally:
+        sender.close()
@@ -4,6 +4,7 @@ from django.conf import settings
 from rest_framework import serializers
 
 from event.models import Profile, User, Team
+from hackathon_site.sparse_fields import SparseFieldsSerializerMixin
 from registration.models import Application
 from review.models import Review
 
@@ -162,7 +163,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ("id", "first_name", "last_name", "email", "profile", "groups")
 
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     profiles = ProfileInTeamSerializer(many=True, read_only=True)
 
     class Meta:
@@ -174,6 +175,7 @@ class TeamSerializer(serializers.ModelSerializer):
             "updated_at",
             "profiles",
         )
+        field_lookups = {"profiles": ["profiles__user"]}
 
 
 class ProfileCreateResponseSerializer(ProfileSerializer):
@@ -388,6 +388,32 @@ class EventTeamListsViewTestCase(SetupUserMixin, APITestCase):
         returned_ids = [res["team_code"] for res in results]
         self.assertCountEqual(returned_ids, [self.team2.team_code])
 
+    def test_team_fields(self):
+        self._login(self.permissions)
+        self._make_profile(self.user, self.team)
+
+        response = self.client.get(self.view, {"fields": "team_code"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"team_code": team.team_code}
+                for team in (self.team, self.team2, self.team3)
+            ],
+        )
+
+        # Session, user and permissions, then the count, the teams, and the profiles
+        # and their users prefetched for all the teams at once
+        with self.assertNumQueries(8):
+            response = self.client.get(self.view, {"fields": "id,profiles"})
+        self.assertEqual(
+            response.json()["results"][0]["profiles"][0]["user"]["email"],
+            self.user.email,
+        )
+
+        response = self.client.get(self.view, {"fields": "id,name"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class ProfileDetailViewTestCase(SetupUserMixin, APITestCase):
     def setUp(self):
@@ -716,6 +742,29 @@ class CurrentTeamOrderListViewTestCase(SetupUserMixin, APITestCase):
 
         self.assertEqual(expected_response, data["results"])
 
+    def test_not_modified(self):
+        Profile.objects.create(user=self.user, team=self.team)
+        self._login()
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        response = self.client.get(self.view, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Changes to the team's orders, or to the team of the user, change the ETag
+        OrderItem.objects.filter(order=self.order).first().delete()
+        response = self.client.get(self.view, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"][0]["items"]), 1)
+        etag = response["ETag"]
+
+        self.user.profile.team = self.team2
+        self.user.profile.save()
+        response = self.client.get(self.view, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"][0]["id"], self.order_2.id)
+
 
 class TeamIncidentListViewPostTestCase(SetupUserMixin, APITestCase):
     def setUp(self):
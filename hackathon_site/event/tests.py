@@ -1,15 +1,26 @@
 import re
+import smtplib
+import socketserver
+import threading
+from io import StringIO
 from unittest.mock import patch
 from datetime import datetime, timedelta, date
 
 from django.core import mail
+from django.core.management import call_command
 from django.contrib.auth.models import Group
 from django.conf import settings
-from django.test import TestCase
+from django.db import transaction
+from django.template.backends.jinja2 import Template as Jinja2Template
+from django.template.loader import render_to_string
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
-from event.models import Profile, User, Team as EventTeam
+from event.models import OutboxEmail, Profile, User, Team as EventTeam
+from event.notifications import Notification, html_to_text
+from event.outbox import build_email, claim_batch, deliver_pending, get_retry_delay
 from hackathon_site.tests import SetupUserMixin
 from registration.models import Team as RegistrationTeam, Application
 
@@ -674,3 +685,281 @@ class UserReviewStatusSerializerTestCase(SetupUserMixin, TestCase):
         }
 
         self.assertEqual(user_expected, user_serialized)
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough of an SMTP server for the SMTP email backend, which refuses the
+    recipients in server.refused_recipients.
+    """
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost")
+        for line in self.rfile:
+            command = line.decode().strip()
+            if command.upper().startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.upper().startswith("RCPT") and any(
+                recipient in command for recipient in self.server.refused_recipients
+            ):
+                self.reply("550 No such user")
+            elif command.upper().startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command.upper() == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in self.rfile:
+                    if data_line == b".\r\n":
+                        break
+                    data.append(data_line)
+                self.server.messages.append(b"".join(data))
+                self.reply("250 OK")
+            elif command.upper() == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class OutboxTestCase(TestCase):
+    def _queue(self, count=1, to="foo@bar.com"):
+        return OutboxEmail.objects.queue(
+            [
+                build_email(
+                    subject=f"Subject {i}",
+                    message="Plain",
+                    html_message="<p>HTML</p>",
+                    recipient_list=[to],
+                )
+                for i in range(count)
+            ]
+        )
+
+    def test_queue_and_deliver(self):
+        self._queue(2)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(deliver_pending(), (2, 0))
+
+        self.assertEqual(
+            [email.subject for email in mail.outbox], ["Subject 0", "Subject 1"]
+        )
+        self.assertEqual(mail.outbox[0].to, ["foo@bar.com"])
+        self.assertEqual(mail.outbox[0].from_email, settings.DEFAULT_FROM_EMAIL)
+        self.assertEqual(mail.outbox[0].body, "Plain")
+        self.assertEqual(mail.outbox[0].alternatives, [("<p>HTML</p>", "text/html")])
+        self.assertEqual(OutboxEmail.objects.filter(status="Sent").count(), 2)
+        # Sent emails are not sent again
+        self.assertEqual(deliver_pending(), (0, 0))
+
+    def test_rolled_back_with_transaction(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self._queue()
+                raise ValueError
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_no_recipients(self):
+        self._queue(to="")
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_claimed_emails_leased(self):
+        self._queue(3)
+        self.assertEqual(len(claim_batch(2)), 2)
+        # Until the lease expires, another worker only gets the remaining email
+        self.assertEqual(len(claim_batch(2)), 1)
+        self.assertEqual(len(claim_batch(2)), 0)
+
+    @override_settings(
+        EMAIL_OUTBOX_RETRY_DELAY=30,
+        EMAIL_OUTBOX_MAX_RETRY_DELAY=100,
+        EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    )
+    def test_retries_and_dead_letter(self):
+        self.assertEqual([get_retry_delay(i) for i in range(1, 5)], [30, 60, 100, 100])
+        self._queue()
+        outbox_email = OutboxEmail.objects.get()
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=smtplib.SMTPServerDisconnected("Connection lost"),
+        ):
+            for attempt in range(1, 4):
+                start = timezone.now()
+                self.assertEqual(deliver_pending(), (0, 1))
+                outbox_email.refresh_from_db()
+                self.assertEqual(outbox_email.attempts, attempt)
+                self.assertIn("Connection lost", outbox_email.last_error)
+                self.assertGreaterEqual(
+                    outbox_email.next_attempt_at,
+                    start + timedelta(seconds=get_retry_delay(attempt)),
+                )
+                # Not retried before the delay
+                self.assertEqual(deliver_pending(), (0, 0))
+                OutboxEmail.objects.update(next_attempt_at=timezone.now())
+
+        self.assertEqual(outbox_email.status, "Dead")
+        self.assertEqual(deliver_pending(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_command(self):
+        self._queue(3)
+        out = StringIO()
+        call_command("send_outbox_emails", "--once", "--batch-size=2", stdout=out)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn("Sent 2 email(s), 0 failed.", out.getvalue())
+        self.assertIn("Sent 1 email(s), 0 failed.", out.getvalue())
+
+
+class OutboxSMTPTestCase(TransactionTestCase):
+    """
+    Delivery over the SMTP backend, to a local SMTP stand-in
+    """
+
+    def setUp(self):
+        self.server = socketserver.ThreadingTCPServer(
+            ("127.0.0.1", 0), SMTPStandInHandler
+        )
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.messages = []
+        self.server.refused_recipients = ["refused@bar.com"]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        settings_override = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1",
+            EMAIL_PORT=self.server.server_address[1],
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            EMAIL_USE_SSL=False,
+            EMAIL_USE_TLS=False,
+            EMAIL_OUTBOX_MESSAGES_PER_CONNECTION=3,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_pooled_connection(self):
+        OutboxEmail.objects.queue(
+            [
+                build_email(f"Subject {i}", "Body", [f"user{i}@bar.com"])
+                for i in range(5)
+            ]
+        )
+        self.assertEqual(deliver_pending(batch_size=2), (5, 0))
+        self.assertEqual(len(self.server.messages), 5)
+        # One connection for every EMAIL_OUTBOX_MESSAGES_PER_CONNECTION emails,
+        # across batches
+        self.assertEqual(self.server.connections, 2)
+
+    def test_refused_recipient(self):
+        OutboxEmail.objects.queue(
+            [
+                build_email("Refused", "Body", ["refused@bar.com"]),
+                build_email("Accepted", "Body", ["accepted@bar.com"]),
+            ]
+        )
+        self.assertEqual(deliver_pending(), (1, 1))
+        self.assertEqual(len(self.server.messages), 1)
+        refused = OutboxEmail.objects.get(subject="Refused")
+        self.assertEqual(refused.status, "Pending")
+        self.assertEqual(refused.attempts, 1)
+        self.assertIn("refused@bar.com", refused.last_error)
+        # The connection is reopened after the error
+        self.assertEqual(self.server.connections, 2)
+
+
+class NotificationTestCase(TestCase):
+    subject_template = (
+        "hardware/emails/order_status_change/order_status_change_email_subject.txt"
+    )
+    body_template = (
+        "hardware/emails/order_status_change/order_status_change_email_body.html"
+    )
+
+    def setUp(self):
+        self.team = EventTeam.objects.create()
+        self.users = [
+            User.objects.create_user(
+                username=f"user{i}@bar.com",
+                email=f"user{i}@bar.com",
+                password="foobar123",
+                first_name=name,
+            )
+            for (i, name) in enumerate(["Foo", "Ada & <b>Lovelace</b>"])
+        ]
+        self.context = {
+            "order": {"id": 4, "team_code": self.team.team_code, "status": "Returned"},
+            "order_status_message": "has been returned.",
+            "order_status_closing_message": "Thank you & goodbye",
+        }
+
+    def test_same_as_render_to_string(self):
+        notification = Notification(
+            self.subject_template, self.body_template, self.context
+        )
+        for user in self.users:
+            context = {**self.context, "recipient": user}
+            (subject, _, html) = notification.render(user)
+            self.assertEqual(subject, render_to_string(self.subject_template, context))
+            self.assertEqual(html, render_to_string(self.body_template, context))
+        self.assertIn("Hello Ada &amp; Lovelace,", html)
+
+    def test_recipient_path(self):
+        template = "hardware/emails/create_order/create_order_email_body.html"
+        for user in self.users:
+            Profile.objects.create(user=user, team=self.team)
+        context = {"requester": self.users[0], "order": {"hardware": []}}
+        notification = Notification(self.subject_template, template, context)
+        for user in self.users:
+            self.assertEqual(
+                notification.render(user)[2],
+                render_to_string(template, {**context, "recipient": user}),
+            )
+
+    def test_templates_rendered_once(self):
+        with patch(
+            "django.template.backends.jinja2.Template.render",
+            autospec=True,
+            side_effect=Jinja2Template.render,
+        ) as render:
+            notification = Notification(
+                self.subject_template, self.body_template, self.context
+            )
+            for user in self.users:
+                notification.to_email(user, [user.email])
+        self.assertEqual(render.call_count, 2)
+
+    def test_text_alternative(self):
+        notification = Notification(
+            self.subject_template, self.body_template, self.context
+        )
+        email = notification.to_email(self.users[1], [self.users[1].email])
+        self.assertEqual(email.alternatives[0][1], "text/html")
+        self.assertEqual(
+            email.body,
+            f"Hello Ada & Lovelace,\n\n"
+            f"We are notifying you that your team's Order #4 has been returned.\n\n"
+            f"Click here ({settings.HSS_URL}#order4) to view more information about "
+            f"your order.\n\n"
+            f"Thank you & goodbye\n\n"
+            f"If this is a mistake, please let a {settings.HACKATHON_NAME} exec "
+            f"member know.\n\n"
+            f"Best,\nThe {settings.HACKATHON_NAME} Team",
+        )
+
+    def test_html_to_text_table(self):
+        self.assertEqual(
+            html_to_text(
+                "<p>Items:</p><table><tr><th>ID</th><th>Quantity</th></tr>"
+                "<tr><td> 1 </td><td>2</td></tr></table>"
+                '<ul><li><a href="https://example.com">https://example.com</a></li>'
+                "</ul>"
+            ),
+            "Items:\n\nID | Quantity\n1 | 2\n\n- https://example.com",
+        )
@@ -15,6 +15,7 @@ from rest_framework import generics, mixins
 from rest_framework.filters import SearchFilter
 
 
+from hackathon_site.sparse_fields import SparseFieldsViewMixin
 from hackathon_site.utils import is_registration_open
 from registration.forms import JoinTeamForm
 from registration.models import Team as RegistrationTeam
@@ -165,7 +166,9 @@ class DashboardView(LoginRequiredMixin, FormView):
         return super().post(request, *args, **kwargs)
 
 
-class TeamListView(mixins.ListModelMixin, generics.GenericAPIView):
+class TeamListView(
+    SparseFieldsViewMixin, mixins.ListModelMixin, generics.GenericAPIView
+):
     queryset = EventTeam.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [FullDjangoModelPermissions]
@@ -13,4 +13,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hackathon_site.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up
+from hardware.event_stream import EventStreamApplication  # noqa: E402
+
+# Serves the hardware event stream, which needs to hold its connections open
+# without tying up a worker, and passes the rest on to Django
+application = EventStreamApplication(django_application)
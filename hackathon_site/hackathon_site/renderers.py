@@ -0,0 +1,65 @@
+import msgpack
+import orjson
+from django.utils.cache import patch_vary_headers
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def patch_vary_on_accept(renderer_context):
+    # The same URL renders as JSON or MessagePack depending on the Accept header,
+    # which caches in between have to key on
+    response = (renderer_context or {}).get("response")
+    if response is not None:
+        patch_vary_headers(response, ("Accept",))
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer which encodes with orjson. The output is the same as
+    JSONRenderer's compact output: the types orjson does not encode itself, or
+    encodes differently (datetimes, decimals, lazy strings...), are encoded by
+    DRF's JSONEncoder.
+
+    Indented output, requested with an indent parameter in the Accept header, is
+    rendered by JSONRenderer.
+    """
+
+    options = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        patch_vary_on_accept(renderer_context)
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        # Like JSONRenderer, escape the line and paragraph separators, which are
+        # valid in JSON but not in JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Render responses as MessagePack, for clients which opt in with an
+    Accept: application/msgpack header or ?format=msgpack. Values without a
+    MessagePack type, such as datetimes, are converted like in JSON responses.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        patch_vary_on_accept(renderer_context)
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
@@ -101,6 +101,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "corsheaders",
     "rest_framework",
     "rest_framework.authtoken",
@@ -196,6 +197,38 @@ CACHES = {
     }
 }
 
+# Idempotency-Key handling for order creation and returns, in seconds.
+# Stored responses are replayed for IDEMPOTENCY_KEY_TTL, requests which are still
+# running hold their key for at most IDEMPOTENCY_KEY_LOCK_TIMEOUT, and duplicates
+# wait for them for at most IDEMPOTENCY_KEY_WAIT_TIMEOUT.
+IDEMPOTENCY_KEY_TTL = 60 * 60
+IDEMPOTENCY_KEY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_KEY_WAIT_TIMEOUT = 30
+IDEMPOTENCY_KEY_POLL_INTERVAL = 0.1
+
+# Cached responses of the hardware catalog (the hardware and category lists), in
+# seconds. They are invalidated whenever the hardware, categories or stock change.
+# While a stale response is recomputed, other requests for it wait at most
+# HARDWARE_CATALOG_CACHE_WAIT_TIMEOUT if there is no previous response to serve.
+HARDWARE_CATALOG_CACHE_ENABLED = True
+HARDWARE_CATALOG_CACHE_TTL = 60 * 60
+HARDWARE_CATALOG_CACHE_LOCK_TIMEOUT = 30
+HARDWARE_CATALOG_CACHE_WAIT_TIMEOUT = 5
+HARDWARE_CATALOG_CACHE_POLL_INTERVAL = 0.05
+
+# Server-sent events stream of stock and order status changes, served by the ASGI
+# application at /api/hardware/events/. Events are published through Redis pub/sub.
+# Each open stream buffers at most HARDWARE_EVENTS_QUEUE_SIZE batches of events
+# before it is closed as too slow, and idle streams get a heartbeat every
+# HARDWARE_EVENTS_HEARTBEAT_INTERVAL seconds.
+HARDWARE_EVENTS_ENABLED = True
+HARDWARE_EVENTS_QUEUE_SIZE = 100
+HARDWARE_EVENTS_HEARTBEAT_INTERVAL = 15
+
+# Change log synced from /api/hardware/changes/, at most HARDWARE_CHANGES_PAGE_SIZE
+# changes per request
+HARDWARE_CHANGES_PAGE_SIZE = 1000
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -214,6 +247,11 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.TokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "hackathon_site.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "hackathon_site.renderers.MessagePackRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
     "PAGE_SIZE": 100,
@@ -314,6 +352,48 @@ DEFAULT_FROM_EMAIL = "hello@newhacks.ca"
 CONTACT_EMAIL = DEFAULT_FROM_EMAIL
 HSS_ADMIN_EMAIL = "hardware@newhacks.ca"
 
+# Emails are queued in the outbox and sent by the send_outbox_emails management
+# command, which must be running
+# Number of emails claimed at a time by the worker
+EMAIL_OUTBOX_BATCH_SIZE = 50
+# Seconds before a claimed email is claimed again, if the worker which claimed it
+# did not record the outcome in the meantime
+EMAIL_OUTBOX_LEASE_TIME = 300
+# Failed emails are retried after EMAIL_OUTBOX_RETRY_DELAY seconds, doubling at
+# each attempt up to EMAIL_OUTBOX_MAX_RETRY_DELAY, and are given up on after
+# EMAIL_OUTBOX_MAX_ATTEMPTS attempts
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_MAX_RETRY_DELAY = 3600
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8
+# The connection to the email server is reopened after this many emails
+EMAIL_OUTBOX_MESSAGES_PER_CONNECTION = 100
+
+# Decision emails are sent by the send_decision_emails command, which records the
+# progress of a campaign after each chunk of DECISION_EMAIL_CHUNK_SIZE emails, and
+# sends at most DECISION_EMAILS_PER_MINUTE emails per minute (0 for no limit)
+DECISION_EMAIL_CHUNK_SIZE = 25
+DECISION_EMAILS_PER_MINUTE = 120
+# Seconds before a claimed chunk is claimed again, if the worker which claimed it
+# did not record its progress in the meantime
+DECISION_EMAIL_LEASE_TIME = 300
+# The Send Decisions page warns that no worker is running if a campaign did not
+# start sending within this many seconds
+DECISION_CAMPAIGN_STALLED_AFTER = 300
+
+# Hardware notifications are emailed by the send_order_notifications command. The
+# notifications to the admins are sent as a digest once the oldest is
+# ADMIN_NOTIFICATION_DIGEST_INTERVAL seconds old, and the status changes of the
+# orders of a team in one email to its members once the oldest is
+# TEAM_NOTIFICATION_WINDOW seconds old
+ADMIN_NOTIFICATION_DIGEST_INTERVAL = 900
+TEAM_NOTIFICATION_WINDOW = 300
+
+# Reviewers are assigned to the next team to review for REVIEW_ASSIGNMENT_TIMEOUT
+# seconds. The queue of teams to review is reloaded from the database every
+# REVIEW_QUEUE_RELOAD_INTERVAL seconds, to pick up new applications
+REVIEW_ASSIGNMENT_TIMEOUT = 60 * 20
+REVIEW_QUEUE_RELOAD_INTERVAL = 60
+
 REGISTRATION_OPEN_DATE = datetime(2024, 1, 18, 0, 0, 0, tzinfo=TZ_INFO)
 REGISTRATION_CLOSE_DATE = datetime(2024, 10, 16, 23, 59, 0, tzinfo=TZ_INFO)
 APPLICATION_OPEN_DATE = datetime(2024, 9, 26, 0, 0, 0, tzinfo=TZ_INFO)
@@ -322,6 +402,19 @@ EVENT_END_DATE = datetime(2024, 10, 27, 17, 0, 0, tzinfo=TZ_INFO)
 HARDWARE_SIGN_OUT_START_DATE = datetime(2024, 10, 28, 23, 59, 0, tzinfo=TZ_INFO)
 HARDWARE_SIGN_OUT_END_DATE = EVENT_END_DATE
 
+# Queued order submission, for the rush when hardware sign out opens. When enabled,
+# orders are accepted into a queue and allocated by the process_order_queue
+# management command, which must then be running.
+HARDWARE_ORDER_QUEUE_ENABLED = bool(
+    int(os.environ.get("HARDWARE_ORDER_QUEUE_ENABLED", 0))
+)
+# Submissions are refused once this many tickets are waiting
+HARDWARE_ORDER_QUEUE_MAX_DEPTH = 500
+# Number of tickets a team can have waiting at the same time
+HARDWARE_ORDER_QUEUE_MAX_PER_TEAM = 1
+# Number of tickets allocated per transaction by the worker
+HARDWARE_ORDER_QUEUE_BATCH_SIZE = 20
+
 RSVP_DAYS = 10
 
 # sign in times must be between EVENT_START_DATE and EVENT_END_DATE and in chronological order
@@ -32,6 +32,16 @@ CACHES = {
     }
 }
 
+# The cache is not reset between tests, so cached catalog responses would leak from
+# one test to the next. Tests of the catalog cache enable it with override_settings.
+HARDWARE_CATALOG_CACHE_ENABLED = False
+
+# There is no Redis server to publish the hardware events to
+HARDWARE_EVENTS_ENABLED = False
+
+# The Redis tests are skipped if there is no Redis server at REDIS_URI
+REDIS_TESTS_REQUIRED = False
+
 # For testing, make the media root a local folder to avoid
 # permissions errors
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
@@ -0,0 +1,30 @@
+"""
+Settings file for running the tests which are skipped on sqlite against postgres,
+the hardware search and the row locking tests, and the tests of the Redis review
+queue against Redis. The rest of the test suite is run with
+hackathon_site.settings.ci, some of its tests expect the ids sqlite gives.
+
+Usage:
+    ```
+    python manage.py test hardware.test_search hardware.test_concurrency review.test_assignment --settings=hackathon_site.settings.ci_postgres
+    ```
+
+Uses the postgres database from the DB_* environment variables and the Redis server
+at REDIS_URI, as in the base settings. The pg_trgm extension must be available, it
+is part of the contrib modules shipped with the official postgres images.
+"""
+from hackathon_site.settings.ci import *
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("DB_NAME", "hackathon_site"),
+        "USER": os.environ.get("DB_USER", "postgres"),
+        "PASSWORD": os.environ.get("DB_PASSWORD", ""),
+        "HOST": os.environ.get("DB_HOST", "127.0.0.1"),
+        "PORT": os.environ.get("DB_PORT", "5432"),
+    }
+}
+
+# Fail instead of skipping the Redis tests if the Redis server is not reachable
+REDIS_TESTS_REQUIRED = True
@@ -0,0 +1,138 @@
+from rest_framework import serializers
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Serializer mixin which only includes the fields listed in context["fields"],
+    and replaces the fields listed in context["expand"] with the serializers given
+    for them in Meta.expandable_fields, e.g. related ids with the related objects.
+
+    Fields are read from the columns and relations named by their source, or by
+    Meta.field_lookups for the fields whose source does not say, such as method
+    fields. restrict_queryset loads exactly those, so that the cost of a response
+    scales with the fields requested.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable_fields = getattr(self.Meta, "expandable_fields", {})
+        for name in self._context.get("expand", ()):
+            (serializer_class, serializer_kwargs) = expandable_fields[name]
+            self.fields[name] = serializer_class(**serializer_kwargs)
+
+        requested_fields = self._context.get("fields")
+        if requested_fields:
+            for name in set(self.fields) - set(requested_fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_sparse_field_names(cls):
+        return list(cls.Meta.fields)
+
+    @classmethod
+    def get_expandable_field_names(cls):
+        return list(getattr(cls.Meta, "expandable_fields", {}))
+
+    def get_field_lookups(self, name):
+        field_lookups = getattr(self.Meta, "field_lookups", {})
+        if name in field_lookups:
+            return field_lookups[name]
+        return [self.fields[name].source.replace(".", "__")]
+
+    def restrict_queryset(self, queryset):
+        """
+        Only load the columns of queryset needed by the fields of this serializer,
+        joining the forward relations they go through and prefetching the many
+        relations. The lookups of a field which go through a many relation are
+        prefetched as they are, so they have to end on a relation.
+
+        Replaces the select_related and prefetch_related of queryset.
+        """
+        model = queryset.model
+        columns = {model._meta.pk.name}
+        select_related = set()
+        prefetch_related = set()
+        for name in self.fields:
+            for lookup in self.get_field_lookups(name):
+                parts = lookup.split("__")
+                related_model = model
+                for i, part in enumerate(parts):
+                    field = related_model._meta.get_field(part)
+                    if field.many_to_many or field.one_to_many:
+                        prefetch_related.add(lookup)
+                        break
+                    if not field.is_relation or i == len(parts) - 1:
+                        columns.add(lookup)
+                        break
+                    select_related.add("__".join(parts[: i + 1]))
+                    related_model = field.related_model
+
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .select_related(*select_related)
+            .prefetch_related(*prefetch_related)
+            .only(*columns)
+        )
+
+
+class SparseFieldsViewMixin:
+    """
+    View mixin for the list views of serializers with SparseFieldsSerializerMixin,
+    which takes the fields to include from ?fields= and the fields to expand from
+    ?expand=, both comma-separated, and restricts the queryset to what they need.
+    """
+
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def get_sparse_fields(self):
+        """
+        Returns (fields, expand) from the query parameters, fields being None if
+        all the fields are included.
+        """
+        if self.request is None or self.request.method != "GET":
+            return (None, [])
+
+        serializer_class = self.get_serializer_class()
+        errors = {}
+        fields = self._parse_query_list(self.fields_query_param)
+        if fields:
+            unknown_fields = set(fields) - set(
+                serializer_class.get_sparse_field_names()
+            )
+            if unknown_fields:
+                errors[self.fields_query_param] = [
+                    f"Unknown fields: {', '.join(sorted(unknown_fields))}"
+                ]
+        expand = self._parse_query_list(self.expand_query_param)
+        unknown_expand = set(expand) - set(
+            serializer_class.get_expandable_field_names()
+        )
+        if unknown_expand:
+            errors[self.expand_query_param] = [
+                f"Fields which cannot be expanded: {', '.join(sorted(unknown_expand))}"
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return (fields or None, expand)
+
+    def _parse_query_list(self, query_param):
+        value = self.request.query_params.get(query_param, "")
+        return [name.strip() for name in value.split(",") if name.strip()]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        (fields, expand) = self.get_sparse_fields()
+        if fields is not None:
+            context["fields"] = fields
+        if expand:
+            context["expand"] = expand
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        (fields, expand) = self.get_sparse_fields()
+        if fields is None and not expand:
+            return queryset
+        return self.get_serializer().restrict_queryset(queryset)
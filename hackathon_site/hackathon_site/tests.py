@@ -1,16 +1,38 @@
-from datetime import date, datetime
+import json
+import os
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import skipUnless
 from unittest.mock import patch
 from uuid import uuid4
 
+import msgpack
 from django.conf import settings
-from django.test import TestCase, override_settings
+from django.test import TestCase, override_settings, tag
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
 
 from event.models import User, Team as EventTeam, Profile
+from hackathon_site.renderers import FastJSONRenderer, MessagePackRenderer
 from hackathon_site.utils import is_registration_open
 from registration.models import Application, Team as RegistrationTeam
 from review.models import Review
 
 
+def benchmark(test_case):
+    """
+    Leave a timing benchmark out of the test suite, as its timings depend on the
+    machine. Run the benchmarks with, for example:
+        RUN_BENCHMARKS=1 python manage.py test --tag benchmark
+    """
+    return tag("benchmark")(
+        skipUnless(
+            os.environ.get("RUN_BENCHMARKS"), "Benchmarks run with RUN_BENCHMARKS=1"
+        )(test_case)
+    )
+
+
 class SetupUserMixin:
     def setUp(self):
         self.password = "foobar123"
@@ -226,3 +248,45 @@ class IsRegistrationOpenTestCase(TestCase):
             2020, 1, 2, tzinfo=settings.TZ_INFO
         )
         self.assertFalse(is_registration_open())
+
+
+class RenderersTestCase(TestCase):
+    data = OrderedDict(
+        [
+            ("string", "Arduino \u2028 Uno \u00e9"),
+            ("int", 1),
+            ("float", 0.1),
+            ("none", None),
+            ("list", [True, False, (1, 2)]),
+            (
+                "datetime",
+                datetime(2020, 1, 1, 12, 30, 15, 123456, tzinfo=settings.TZ_INFO),
+            ),
+            ("date", date(2020, 1, 1)),
+            ("timedelta", timedelta(hours=1)),
+            ("decimal", Decimal("1.50")),
+            ("uuid", uuid4()),
+            ("lazy", gettext_lazy("Hardware")),
+            (1, "integer key"),
+        ]
+    )
+
+    def test_fast_json_same_as_json(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+        )
+
+    def test_fast_json_indent(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, "application/json; indent=4"),
+            JSONRenderer().render(self.data, "application/json; indent=4"),
+        )
+
+    def test_msgpack(self):
+        unpacked = msgpack.unpackb(
+            MessagePackRenderer().render(self.data), strict_map_key=False
+        )
+        # Converted like in JSON, except that integer keys stay integers
+        expected = json.loads(JSONRenderer().render(self.data))
+        expected[1] = expected.pop("1")
+        self.assertEqual(unpacked, expected)
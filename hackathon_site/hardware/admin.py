@@ -4,16 +4,32 @@ from urllib.parse import urlparse
 import requests
 from client_side_image_cropping import ClientsideCroppingWidget, DcsicAdminMixin
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
 from django.core.files.base import ContentFile
-from django.db import models
+from django.db import models, transaction
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.html import mark_safe
 from import_export import resources
 from import_export.admin import ImportMixin
 from import_export.widgets import ManyToManyWidget
 from import_export.fields import Field
 
-from hardware.models import Hardware, Category, Order, Incident, OrderItem
+from hardware.models import (
+    Hardware,
+    Category,
+    Order,
+    Incident,
+    OrderItem,
+    OrderNotification,
+    OrderTicket,
+)
+from hardware.pick_list import get_pick_list, write_pick_list_csv
+from hardware.search import search_enabled, search_hardware
+from hardware.serializers import OrderChangeSerializer
+from hardware.views import OrderDetailView
 
 
 class OrderInline(admin.TabularInline):
@@ -73,7 +89,7 @@ class HardwareCategoryInline(admin.TabularInline):
 class OrderItemForm(forms.ModelForm):
     class Meta:
         model = OrderItem
-        fields = ("hardware", "part_returned_health")
+        fields = ("hardware", "quantity", "part_returned_health")
 
     def clean_hardware(self):
         value = self.cleaned_data["hardware"]
@@ -133,16 +149,7 @@ class OrderItemInline(admin.TabularInline):
 
     @staticmethod
     def quantity_remaining(obj: OrderItem):
-        """
-        Get the quantity remaining by querying the Hardware model, which has the
-        necessary annotations.
-
-        This is quite inefficient, as every order item will generate a database
-        hit. That admin site should not be used heavily, so that's fine. If
-        performance becomes an issue, the hardware queryset can be cached on
-        a per-request basis to use here (probably in OrderAdmin.get_queryset).
-        """
-        return Hardware.objects.get(id=obj.hardware_id).quantity_remaining
+        return obj.hardware.quantity_remaining
 
     @staticmethod
     def max_per_team(obj: OrderItem):
@@ -158,7 +165,13 @@ class IncidentInline(admin.TabularInline):
     verbose_name = "Incident"
     verbose_name_plural = "Incidents"
     extra = 0
-    readonly_fields = ("hardware", "state", "description", "time_occurred")
+    readonly_fields = (
+        "hardware",
+        "quantity",
+        "state",
+        "description",
+        "time_occurred",
+    )
     exclude = ("part_returned_health",)
 
     @staticmethod
@@ -219,6 +232,8 @@ class HardwareResource(resources.ModelResource):
             "created_at",
             "updated_at",
             "picture",
+            "quantity_checked_out",
+            "quantity_remaining",
         )
         import_id_fields = (
             "name",
@@ -251,6 +266,12 @@ class HardwareAdmin(DcsicAdminMixin, ImportMixin, admin.ModelAdmin):
         }
     }
 
+    def get_search_results(self, request, queryset, search_term):
+        # Searching by id is left to the default search, which matches it exactly
+        if not search_enabled() or not search_term.strip() or search_term.isdigit():
+            return super().get_search_results(request, queryset, search_term)
+        return (search_hardware(queryset, search_term), False)
+
     @admin.display(ordering="quantity_remaining", description="Quantity Remaining")
     def get_quantity_remaining(self, obj):
         return obj.quantity_remaining
@@ -277,14 +298,111 @@ class OrderAdmin(admin.ModelAdmin):
     )
     list_select_related = True
     autocomplete_fields = ("team",)
+    actions = (
+        "mark_ready_for_pickup",
+        "mark_picked_up",
+        "mark_returned",
+        "mark_cancelled",
+    )
+    change_list_template = "hardware/order_change_list.html"
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related("team")
 
+    def get_urls(self):
+        urls = super().get_urls()
+        new_urls = [
+            path(
+                "pick-list/",
+                self.admin_site.admin_view(self.pick_list_view),
+                name="hardware-order-pick-list",
+            ),
+        ]
+        return new_urls + urls
+
+    def pick_list_view(self, request):
+        """
+        Printable list of the hardware to pull for all orders in a status, given by
+        the status query parameter and Submitted by default. Append &format=csv to
+        download it as CSV instead.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        order_status = request.GET.get("status", "Submitted")
+        if order_status not in dict(Order.STATUS_CHOICES):
+            order_status = "Submitted"
+        pick_list = get_pick_list(order_status)
+
+        if request.GET.get("format") == "csv":
+            filename = f"pick-list-{order_status.lower().replace(' ', '-')}.csv"
+            response = HttpResponse(content_type="text/csv")
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            write_pick_list_csv(pick_list, response)
+            return response
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Pick List: {order_status} Orders",
+            "order_status": order_status,
+            "status_choices": [choice for (choice, _) in Order.STATUS_CHOICES],
+            "pick_list": pick_list,
+            "total_quantity": sum(hardware["total_quantity"] for hardware in pick_list),
+        }
+        return TemplateResponse(request, "hardware/pick_list.html", context)
+
     @admin.display(description="Team Code")
     def get_team_code(self, obj: Order):
         return obj.team.team_code if obj.team else None
 
+    @transaction.atomic
+    def change_status(self, request, queryset, new_status):
+        (results, changed_orders) = OrderChangeSerializer.change_statuses(
+            {order_id: new_status for order_id in queryset.values_list("id", flat=True)}
+        )
+        if changed_orders:
+            OrderDetailView.queue_status_change_emails(
+                [
+                    OrderDetailView.get_status_change_email_order(order)
+                    for order in changed_orders
+                ]
+            )
+            self.message_user(
+                request,
+                f"Changed the status of {len(changed_orders)} order(s) to {new_status}.",
+                messages.SUCCESS,
+            )
+        for result in results:
+            if not result["success"]:
+                self.message_user(
+                    request,
+                    f"Order #{result['id']}: {result['message']}",
+                    messages.WARNING,
+                )
+
+    @admin.action(
+        permissions=("change",), description="Mark selected orders as Ready for Pickup"
+    )
+    def mark_ready_for_pickup(self, request, queryset):
+        self.change_status(request, queryset, "Ready for Pickup")
+
+    @admin.action(
+        permissions=("change",), description="Mark selected orders as Picked Up"
+    )
+    def mark_picked_up(self, request, queryset):
+        self.change_status(request, queryset, "Picked Up")
+
+    @admin.action(
+        permissions=("change",), description="Mark selected orders as Returned"
+    )
+    def mark_returned(self, request, queryset):
+        self.change_status(request, queryset, "Returned")
+
+    @admin.action(permissions=("change",), description="Cancel selected orders")
+    def mark_cancelled(self, request, queryset):
+        self.change_status(request, queryset, "Cancelled")
+
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -292,6 +410,7 @@ class OrderItemAdmin(admin.ModelAdmin):
         "id",
         "order_id",
         "hardware_id",
+        "quantity",
         "part_returned_health",
     )
     search_fields = ("id", "order__team__team_code", "hardware__name")
@@ -315,3 +434,70 @@ class IncidentAdmin(admin.ModelAdmin):
         return (
             obj.order_item.order.team.team_code if obj.order_item.order.team else None
         )
+
+
+@admin.register(OrderTicket)
+class OrderTicketAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "get_team_code",
+        "status",
+        "order_id",
+        "created_at",
+        "get_wait_time",
+    )
+    list_display_links = ("id", "get_team_code")
+    list_filter = ("status",)
+    search_fields = ("id", "team__team_code")
+    readonly_fields = (
+        "team",
+        "requester",
+        "status",
+        "request",
+        "response",
+        "order",
+        "created_at",
+        "processed_at",
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("team")
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Team Code")
+    def get_team_code(self, obj: OrderTicket):
+        return obj.team.team_code
+
+    @admin.display(description="Wait Time")
+    def get_wait_time(self, obj: OrderTicket):
+        if obj.processed_at is None:
+            return None
+        return obj.processed_at - obj.created_at
+
+
+@admin.register(OrderNotification)
+class OrderNotificationAdmin(admin.ModelAdmin):
+    list_display = ("id", "audience", "get_team_code", "created_at", "emailed_at")
+    list_filter = ("audience",)
+    search_fields = ("id", "team__team_code", "subject")
+    readonly_fields = (
+        "audience",
+        "team",
+        "subject",
+        "html_body",
+        "context",
+        "created_at",
+        "emailed_at",
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("team")
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Team Code")
+    def get_team_code(self, obj: OrderNotification):
+        return obj.team.team_code if obj.team else None
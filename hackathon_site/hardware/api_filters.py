@@ -1,7 +1,9 @@
 from django import forms
 from django_filters import rest_framework as filters, widgets
+from rest_framework.filters import SearchFilter
 
 from hardware.models import Hardware, Order, Incident, OrderItem
+from hardware.search import search_enabled, search_hardware
 from hardware.serializers import (
     HardwareSerializer,
     OrderListSerializer,
@@ -61,6 +63,7 @@ class HardwareFilter(filters.FilterSet):
 
     category_ids = IntegerCSVFilter(
         field_name="categories",
+        distinct=True,
         label="Comma separated list of category IDs",
         help_text="Comma separated list of category IDs",
     )
@@ -81,3 +84,20 @@ class OrderFilter(filters.FilterSet):
         label="Comma separated list of statuses",
         help_text="Comma separated list of statuses",
     )
+
+
+class HardwareSearchFilter(SearchFilter):
+    """
+    Ranked full text and typo-tolerant search of the hardware on postgres, see
+    hardware.search. Falls back to the search_fields of the view on other databases.
+    Results are ordered by relevance, unless the request also sets an ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not search_enabled():
+            return super().filter_queryset(request, queryset, view)
+
+        search = " ".join(self.get_search_terms(request))
+        if not search:
+            return queryset
+        return search_hardware(queryset, search)
@@ -7,7 +7,15 @@ app_name = "hardware"
 urlpatterns = [
     path("hardware/", views.HardwareListView.as_view(), name="hardware-list"),
     path("orders/returns/", views.OrderItemReturnView.as_view(), name="order-return"),
+    path("orders/check/", views.OrderCheckView.as_view(), name="order-check"),
+    path(
+        "orders/pick-list/", views.OrderPickListView.as_view(), name="order-pick-list",
+    ),
+    path(
+        "orders/status/", views.OrderBulkStatusView.as_view(), name="order-bulk-status",
+    ),
     path("orders/", views.OrderListView.as_view(), name="order-list"),
+    path("changes/", views.ChangeListView.as_view(), name="change-list"),
     path("categories/", views.CategoryListView.as_view(), name="category-list"),
     path("incidents/", views.IncidentListView.as_view(), name="incident-list"),
     path(
@@ -21,5 +29,10 @@ urlpatterns = [
         name="hardware-detail",
     ),
     path("orders/<int:pk>/", views.OrderDetailView.as_view(), name="order-detail",),
+    path(
+        "orders/tickets/<int:pk>/",
+        views.OrderTicketDetailView.as_view(),
+        name="order-ticket-detail",
+    ),
     path("order_items/", views.OrderItemListView.as_view(), name="order-item-list",),
 ]
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class HardwareConfig(AppConfig):
     name = "hardware"
+
+    def ready(self):
+        from hardware import signals
@@ -0,0 +1,108 @@
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+INVENTORY_VERSION_KEY = "hardware:inventory_version"
+CATALOG_CACHE_HEADER = "X-Catalog-Cache"
+
+
+def get_inventory_version():
+    version = cache.get(INVENTORY_VERSION_KEY)
+    if version is None:
+        # The version starts from the clock rather than from 0, so that it does not
+        # go back to a version which is still cached if the key is ever evicted
+        cache.add(INVENTORY_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(INVENTORY_VERSION_KEY)
+    return version
+
+
+def bump_inventory_version():
+    try:
+        cache.incr(INVENTORY_VERSION_KEY)
+    except ValueError:
+        # The key does not exist, any new version invalidates the cached responses
+        cache.add(INVENTORY_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_catalog():
+    """
+    Invalidate the cached catalog responses, and the ETags of hardware.etags, after a
+    write to the hardware, the categories, the orders or the stock.
+
+    The version is bumped right away, and once more when the transaction commits: a
+    request which reads the catalog in between still sees the old data, and would
+    otherwise cache it under the new version.
+    """
+    bump_inventory_version()
+    transaction.on_commit(bump_inventory_version)
+
+
+def build_catalog_cache_key(view_name, request):
+    # Responses contain absolute URLs (pictures, pagination links), so the host is
+    # part of the key along with the query parameters, in a stable order
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url_hash = hashlib.sha256(
+        f"{request.build_absolute_uri(request.path)}?{query}".encode()
+    ).hexdigest()
+    return f"catalog:{view_name}:{url_hash}"
+
+
+def cached_catalog_response(view_method):
+    """
+    Cache the responses of a GET view method of the hardware catalog, for
+    settings.HARDWARE_CATALOG_CACHE_TTL seconds or until the inventory version is
+    bumped by invalidate_catalog.
+
+    Responses are cached per view and query parameters. When the cached response is
+    out of date, only one request recomputes it, while the others keep getting the
+    previous response, or wait for the new one if there is none.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.HARDWARE_CATALOG_CACHE_ENABLED:
+            return view_method(view, request, *args, **kwargs)
+
+        cache_key = build_catalog_cache_key(view.__class__.__name__, request)
+        lock_key = f"{cache_key}:lock"
+        deadline = time.monotonic() + settings.HARDWARE_CATALOG_CACHE_WAIT_TIMEOUT
+
+        while True:
+            version = get_inventory_version()
+            cached = cache.get(cache_key)
+            if cached is not None and cached["version"] == version:
+                return Response(cached["data"], headers={CATALOG_CACHE_HEADER: "HIT"})
+            # cache.add only sets the key if it does not exist yet, so exactly one of
+            # the concurrent requests gets to recompute the response
+            if cache.add(
+                lock_key, version, timeout=settings.HARDWARE_CATALOG_CACHE_LOCK_TIMEOUT
+            ):
+                break
+            if cached is not None:
+                return Response(cached["data"], headers={CATALOG_CACHE_HEADER: "STALE"})
+            if time.monotonic() > deadline:
+                # Better to compute the response again than to fail the request
+                return view_method(view, request, *args, **kwargs)
+            time.sleep(settings.HARDWARE_CATALOG_CACHE_POLL_INTERVAL)
+
+        try:
+            response = view_method(view, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(
+                    cache_key,
+                    {"version": version, "data": response.data},
+                    timeout=settings.HARDWARE_CATALOG_CACHE_TTL,
+                )
+        finally:
+            cache.delete(lock_key)
+        response[CATALOG_CACHE_HEADER] = "MISS"
+        return response
+
+    return wrapper
@@ -0,0 +1,65 @@
+from django.conf import settings
+
+from hardware.models import ChangeLogEntry
+
+# Permission required to sync each model of the change log, None if any
+# authenticated user can
+CHANGE_LOG_PERMISSIONS = {
+    "hardware": None,
+    "order": "hardware.view_order",
+    "order_item": "hardware.view_orderitem",
+    "incident": "hardware.view_incident",
+}
+
+
+def get_current_cursor():
+    """
+    The cursor from which a client which has just loaded the full lists syncs.
+    """
+    return ChangeLogEntry.objects.sequence_committed()
+
+
+def get_changes(since, models):
+    """
+    Read the changes to the given models recorded after the cursor since, at most
+    settings.HARDWARE_CHANGES_PAGE_SIZE of them, and return
+    (cursor, has_more, changes), where changes maps each model to
+    {"changed": [ids], "deleted": [ids]} according to the last change to each
+    object.
+
+    Entries are read in the order they were committed, by sequence number, so an
+    entry from a long transaction is returned after the cursor passed the entries
+    committed before it rather than skipped.
+    """
+    ChangeLogEntry.objects.sequence_committed()
+
+    page_size = settings.HARDWARE_CHANGES_PAGE_SIZE
+    entries = list(
+        ChangeLogEntry.objects.filter(sequence__gt=since, model__in=models)
+        .order_by("sequence")
+        .values_list("sequence", "model", "object_id", "deleted")[: page_size + 1]
+    )
+    has_more = len(entries) > page_size
+    entries = entries[:page_size]
+    cursor = entries[-1][0] if entries else since
+
+    last_changes = {model: {} for model in models}
+    for (_, model, object_id, deleted) in entries:
+        last_changes[model][object_id] = deleted
+
+    changes = {
+        model: {
+            "changed": [
+                object_id
+                for (object_id, deleted) in last_changes[model].items()
+                if not deleted
+            ],
+            "deleted": [
+                object_id
+                for (object_id, deleted) in last_changes[model].items()
+                if deleted
+            ],
+        }
+        for model in models
+    }
+    return (cursor, has_more, changes)
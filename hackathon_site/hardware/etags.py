@@ -0,0 +1,68 @@
+import functools
+import hashlib
+from urllib.parse import urlencode
+
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from hardware.catalog_cache import get_inventory_version
+
+
+def build_etag(view, request):
+    """
+    Build the ETag of a GET response from the inventory version, which is bumped on
+    every write to the hardware, categories, orders and stock, so that it changes
+    whenever the response may have changed, without querying the database.
+
+    The response also depends on the URL, the user (through their permissions) and
+    the renderer, and on the team of the user for views with etag_vary_on_team.
+    """
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    parts = [
+        view.__class__.__name__,
+        str(get_inventory_version()),
+        request.build_absolute_uri(request.path),
+        query,
+        str(request.user.id),
+        request.accepted_renderer.format,
+    ]
+    if getattr(view, "etag_vary_on_team", False):
+        parts.append(str(request.user.profile.team_id))
+    return quote_etag(hashlib.sha256("\n".join(parts).encode()).hexdigest())
+
+
+def conditional_response(view_method):
+    """
+    Add a strong ETag to the responses of a GET view method, and answer requests
+    whose If-None-Match header matches it with an empty 304 Not Modified response,
+    without running the view.
+
+    The responses are marked as private and to be revalidated on every use, so
+    browsers send If-None-Match on their own when polling.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        etag = build_etag(view, request)
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+            etags = {
+                e[2:] if e.startswith("W/") else e for e in parse_etags(if_none_match)
+            }
+            if etag in etags or "*" in etags:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response["ETag"] = etag
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+        response = view_method(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
@@ -0,0 +1,235 @@
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django_redis import get_redis_connection
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from hardware.events import EVENTS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+EVENT_STREAM_PATH = "/api/hardware/events/"
+
+
+class EventHub:
+    """
+    Fan out the events published on the Redis channel to the event streams open in
+    this process. A single background thread holds the Redis subscription, however
+    many streams are open.
+    """
+
+    def __init__(self, listen=True):
+        self.listen = listen
+        self.queues = set()
+        self.loop = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        self.loop = asyncio.get_running_loop()
+        if self.listen:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run, daemon=True)
+                    self.thread.start()
+        queue = asyncio.Queue(maxsize=settings.HARDWARE_EVENTS_QUEUE_SIZE)
+        self.queues.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.queues.discard(queue)
+
+    def run(self):
+        while True:
+            try:
+                pubsub = get_redis_connection("default").pubsub(
+                    ignore_subscribe_messages=True
+                )
+                pubsub.subscribe(EVENTS_CHANNEL)
+                for message in pubsub.listen():
+                    self.loop.call_soon_threadsafe(
+                        self.dispatch, json.loads(message["data"])
+                    )
+            except Exception:
+                logger.exception("Lost the subscription to the hardware events")
+                time.sleep(1)
+
+    def dispatch(self, events):
+        """
+        Queue a list of events for every open stream. Must be called from the event
+        loop of the streams.
+        """
+        for queue in list(self.queues):
+            try:
+                queue.put_nowait(events)
+            except asyncio.QueueFull:
+                # The client is too slow to keep up. Rather than dropping events,
+                # close its stream: it reconnects and reloads its data.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.unsubscribe(queue)
+
+
+event_hub = EventHub()
+
+
+def authenticate(scope):
+    """
+    Authenticate the request with the same methods as the API, a session cookie or
+    a token, and return (user, team_id, can_view_all_orders). The user is None if
+    the request is not authenticated.
+    """
+    request = ASGIRequest(scope, io.BytesIO())
+    try:
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore(
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+        user = get_user(request)
+        if not user.is_authenticated:
+            try:
+                user = (TokenAuthentication().authenticate(request) or (None,))[0]
+            except AuthenticationFailed:
+                user = None
+        if user is None or not user.is_authenticated:
+            return (None, None, False)
+
+        profile = getattr(user, "profile", None)
+        return (
+            user,
+            profile.team_id if profile is not None else None,
+            user.has_perm("hardware.view_order"),
+        )
+    finally:
+        close_old_connections()
+
+
+def format_event(event):
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+class EventStreamApplication:
+    """
+    ASGI application which serves the server-sent events stream at
+    EVENT_STREAM_PATH, and passes every other request on to the Django application.
+
+    The stream sends a "hardware" event with the new quantity_remaining when the
+    stock of a hardware changes, and an "order" event when an order is placed or its
+    status changes. Participants only receive the order events of their team, while
+    users who can view all orders receive all of them.
+    """
+
+    def __init__(self, application, hub=event_hub):
+        self.application = application
+        self.hub = hub
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")[len(scope.get("root_path", "")) :]
+        if scope["type"] == "http" and path == EVENT_STREAM_PATH:
+            await self.stream(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
+
+    async def send_error(self, send, status, detail):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": json.dumps({"detail": detail}).encode(),
+            }
+        )
+
+    async def stream(self, scope, receive, send):
+        if scope["method"] != "GET":
+            await self.send_error(send, 405, f'Method "{scope["method"]}" not allowed.')
+            return
+        (user, team_id, can_view_all_orders) = await sync_to_async(authenticate)(scope)
+        if user is None:
+            await self.send_error(
+                send, 401, "Authentication credentials were not provided."
+            )
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    # Keep reverse proxies such as nginx from buffering the stream
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        queue = self.hub.subscribe()
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        next_events = None
+        try:
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": b"retry: 5000\n\n",
+                    "more_body": True,
+                }
+            )
+            while True:
+                if next_events is None:
+                    next_events = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    (next_events, disconnected),
+                    timeout=settings.HARDWARE_EVENTS_HEARTBEAT_INTERVAL,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnected.done():
+                    return
+                if not next_events.done():
+                    # Comments keep idle connections from being closed by proxies
+                    body = b": heartbeat\n\n"
+                else:
+                    events = next_events.result()
+                    next_events = None
+                    if events is None:
+                        break
+                    body = b"".join(
+                        format_event(event)
+                        for event in events
+                        if event["type"] != "order"
+                        or can_view_all_orders
+                        or (team_id is not None and event["team_id"] == team_id)
+                    )
+                if body:
+                    await send(
+                        {"type": "http.response.body", "body": body, "more_body": True}
+                    )
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            self.hub.unsubscribe(queue)
+            disconnected.cancel()
+            if next_events is not None:
+                next_events.cancel()
+
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
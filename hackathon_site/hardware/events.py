@@ -0,0 +1,63 @@
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "hardware:events"
+
+
+def publish_events(events):
+    """
+    Publish a list of events to the Redis channel which the event stream of every
+    server process is subscribed to, see hardware.event_stream.
+    """
+    if not settings.HARDWARE_EVENTS_ENABLED or not events:
+        return
+    try:
+        get_redis_connection("default").publish(EVENTS_CHANNEL, json.dumps(events))
+    except Exception:
+        # The stream is a best effort, clients still refresh their data on reconnect
+        logger.exception("Failed to publish hardware events")
+
+
+def publish_after_commit(build_events):
+    """
+    Publish the events returned by build_events once the current transaction is
+    committed, so that they are built from, and only announce, committed data.
+    """
+    if settings.HARDWARE_EVENTS_ENABLED:
+        transaction.on_commit(lambda: publish_events(build_events()))
+
+
+def publish_stock_changes(hardware_queryset):
+    """
+    Announce the quantity remaining of the hardware in hardware_queryset, once the
+    transaction which changed their stock is committed.
+    """
+    publish_after_commit(
+        lambda: [
+            {"type": "hardware", "id": hardware_id, "quantity_remaining": remaining}
+            for (hardware_id, remaining) in hardware_queryset.order_by().values_list(
+                "id", "quantity_remaining"
+            )
+        ]
+    )
+
+
+def publish_order_status_changes(order_queryset):
+    """
+    Announce the status of the orders in order_queryset, once the transaction which
+    created them or changed their status is committed.
+    """
+    publish_after_commit(
+        lambda: [
+            {"type": "order", "id": order_id, "team_id": team_id, "status": status}
+            for (order_id, team_id, status) in order_queryset.order_by().values_list(
+                "id", "team_id", "status"
+            )
+        ]
+    )
@@ -0,0 +1,31 @@
+from django.db.models import Count, Q
+
+from hardware.models import Category
+
+
+def get_hardware_facets(queryset):
+    """
+    Count the hardware of a queryset per category and per stock state, for the
+    filters of the inventory page. Each category is counted with and without the
+    hardware which is out of stock.
+
+    The category counts come from a single query grouped by category, and the stock
+    counts from a single aggregate, whatever the number of categories.
+    """
+    hardware_ids = queryset.order_by().values("id")
+    categories = (
+        Category.objects.filter(hardware__in=hardware_ids)
+        .values("id", "name")
+        .annotate(
+            count=Count("hardware"),
+            in_stock_count=Count(
+                "hardware", filter=Q(hardware__quantity_remaining__gt=0)
+            ),
+        )
+        .order_by("name", "id")
+    )
+    stock = queryset.order_by().aggregate(
+        in_stock=Count("id", filter=Q(quantity_remaining__gt=0)),
+        out_of_stock=Count("id", filter=Q(quantity_remaining__lte=0)),
+    )
+    return {"categories": list(categories), "stock": stock}
@@ -0,0 +1,117 @@
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+def build_idempotency_cache_key(view_name, user_id, idempotency_key):
+    # The key is chosen by the client, so it is hashed to keep the cache key safe
+    key_hash = hashlib.sha256(idempotency_key.encode()).hexdigest()
+    return f"idempotency:{view_name}:{user_id}:{key_hash}"
+
+
+def idempotent(view_method):
+    """
+    Make a POST view method replayable with an Idempotency-Key header.
+
+    The first request with a given key runs the view and, if it succeeds, its
+    response is stored in the cache for settings.IDEMPOTENCY_KEY_TTL seconds.
+    Requests with the same key and body get the stored response without running the
+    view again, and requests with the same key but another body are rejected.
+    Requests with the same key which arrive while the first one is still running
+    wait for its response, for up to settings.IDEMPOTENCY_KEY_WAIT_TIMEOUT seconds.
+
+    Keys are scoped to the user and the view. Requests without the header are
+    processed as usual.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if idempotency_key is None:
+            return view_method(view, request, *args, **kwargs)
+        if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response(
+                {
+                    "detail": f"{IDEMPOTENCY_KEY_HEADER} must be between 1 and "
+                    f"{IDEMPOTENCY_KEY_MAX_LENGTH} characters long."
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache_key = build_idempotency_cache_key(
+            view.__class__.__name__, request.user.id, idempotency_key
+        )
+        fingerprint = hashlib.sha256(
+            json.dumps(request.data, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        deadline = time.monotonic() + settings.IDEMPOTENCY_KEY_WAIT_TIMEOUT
+
+        # cache.add only sets the key if it does not exist yet, so exactly one of
+        # the concurrent requests with the same key gets to run the view
+        while not cache.add(
+            cache_key,
+            {"state": IN_PROGRESS, "fingerprint": fingerprint},
+            timeout=settings.IDEMPOTENCY_KEY_LOCK_TIMEOUT,
+        ):
+            stored = cache.get(cache_key)
+            if stored is None:
+                # The first request failed and released the key, try again
+                continue
+            if stored["fingerprint"] != fingerprint:
+                return Response(
+                    {
+                        "detail": f"This {IDEMPOTENCY_KEY_HEADER} has already been "
+                        "used for another request."
+                    },
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if stored["state"] == DONE:
+                return Response(
+                    stored["data"],
+                    status=stored["status"],
+                    headers={"Idempotent-Replayed": "true"},
+                )
+            if time.monotonic() > deadline:
+                return Response(
+                    {
+                        "detail": f"A request with this {IDEMPOTENCY_KEY_HEADER} is "
+                        "still being processed."
+                    },
+                    status=status.HTTP_409_CONFLICT,
+                )
+            time.sleep(settings.IDEMPOTENCY_KEY_POLL_INTERVAL)
+
+        try:
+            response = view_method(view, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if status.is_success(response.status_code) and isinstance(response, Response):
+            cache.set(
+                cache_key,
+                {
+                    "state": DONE,
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                },
+                timeout=settings.IDEMPOTENCY_KEY_TTL,
+            )
+        else:
+            # Failed requests are not stored, so that they can be retried
+            cache.delete(cache_key)
+        return response
+
+    return wrapper
@@ -0,0 +1,77 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hardware.models import OrderTicket
+from hardware.order_queue import process_batch
+from hardware.views import OrderListView
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Allocate the orders waiting in the order queue, in batches. Must be running "
+        "while settings.HARDWARE_ORDER_QUEUE_ENABLED is set. Only one instance "
+        "should be running at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.HARDWARE_ORDER_QUEUE_BATCH_SIZE,
+            help="Number of tickets allocated per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="Seconds to wait before polling an empty queue again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the tickets currently in the queue, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            tickets = process_batch(options["batch_size"])
+            if tickets:
+                self.report(tickets, time.perf_counter() - start)
+                self.queue_emails(tickets)
+            elif options["once"]:
+                return
+            else:
+                time.sleep(options["interval"])
+
+    def report(self, tickets, elapsed):
+        waits = [
+            (ticket.processed_at - ticket.created_at).total_seconds()
+            for ticket in tickets
+        ]
+        queue_depth = OrderTicket.objects.filter(status="Queued").count()
+        self.stdout.write(
+            f"Processed {len(tickets)} ticket(s) in {elapsed:.2f}s, "
+            f"{queue_depth} still queued. Waited {sum(waits) / len(waits):.1f}s on "
+            f"average, {max(waits):.1f}s at most."
+        )
+
+    def queue_emails(self, tickets):
+        for ticket in tickets:
+            # The emails are addressed on behalf of the requester, which is gone if
+            # their account was deleted in the meantime
+            if ticket.order_id is None or ticket.requester is None:
+                continue
+            try:
+                OrderListView.queue_order_created_emails(
+                    ticket.requester, ticket.team, ticket.response
+                )
+            except Exception:
+                # The order is placed either way, a failed email must not stop the
+                # queue
+                logger.exception(f"Failed to queue the emails for ticket {ticket.id}")
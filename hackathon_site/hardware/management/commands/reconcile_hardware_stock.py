@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from hardware.models import Hardware
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the stored stock counters of all hardware from their order "
+        "items, and report any hardware whose counters had drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report drift, without correcting the stored counters.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                Hardware.objects.select_for_update()
+                .with_computed_stock()
+                .exclude(
+                    quantity_checked_out=F("computed_quantity_checked_out"),
+                    quantity_remaining=F("computed_quantity_remaining"),
+                )
+                .order_by("id")
+            )
+
+            for hardware in drifted:
+                self.stdout.write(
+                    f"Hardware {hardware.id} ({hardware.name}): checked out "
+                    f"{hardware.quantity_checked_out} -> "
+                    f"{hardware.computed_quantity_checked_out}, remaining "
+                    f"{hardware.quantity_remaining} -> "
+                    f"{hardware.computed_quantity_remaining}"
+                )
+
+            if drifted and not options["dry_run"]:
+                Hardware.objects.filter(
+                    id__in=[hardware.id for hardware in drifted]
+                ).update_stock()
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("All hardware stock counters match."))
+        elif options["dry_run"]:
+            self.stdout.write(
+                self.style.WARNING(f"{len(drifted)} hardware stock counter(s) drifted.")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Corrected {len(drifted)} hardware stock counter(s)."
+                )
+            )
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hardware.notifications import queue_due_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue the digests of the hardware notifications to the admins and the "
+        "emails of the order status changes to the teams, once they are due. Must "
+        "be running for these emails to be sent, along with send_outbox_emails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=30,
+            help="Seconds to wait before checking for due notifications again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Queue the emails of the due notifications, then exit.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Queue the emails of all the pending notifications, due or not.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            queued = queue_due_notifications(force=options["all"])
+            if queued:
+                self.stdout.write(f"Queued {queued} notification email(s).")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
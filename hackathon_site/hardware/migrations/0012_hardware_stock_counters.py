@@ -0,0 +1,49 @@
+# Generated by Django 3.2.15 on 2026-10-18 08:57
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_stock_counters(apps, schema_editor):
+    Hardware = apps.get_model("hardware", "Hardware")
+    OrderItem = apps.get_model("hardware", "OrderItem")
+
+    checked_out = Coalesce(
+        Subquery(
+            OrderItem.objects.filter(hardware=OuterRef("pk"))
+            .exclude(part_returned_health="Healthy")
+            .exclude(order__status="Cancelled")
+            .order_by()
+            .values("hardware")
+            .annotate(count=Count("id"))
+            .values("count"),
+            output_field=models.IntegerField(),
+        ),
+        0,
+    )
+    Hardware.objects.update(
+        quantity_checked_out=checked_out,
+        quantity_remaining=F("quantity_available") - checked_out,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hardware", "0011_alter_order_team"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hardware",
+            name="quantity_checked_out",
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="hardware",
+            name="quantity_remaining",
+            field=models.IntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(populate_stock_counters, migrations.RunPython.noop),
+    ]
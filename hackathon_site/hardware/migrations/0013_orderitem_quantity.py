@@ -0,0 +1,64 @@
+# Generated by Django 3.2.15 on 2026-10-18 09:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_order_items(apps, schema_editor):
+    """
+    Merge the order items of each order, hardware and return health into a single
+    line with a quantity. Items with an incident are left as lines of their own.
+    """
+    OrderItem = apps.get_model("hardware", "OrderItem")
+
+    groups = (
+        OrderItem.objects.filter(incident__isnull=True)
+        .values("order_id", "hardware_id", "part_returned_health")
+        .annotate(line_id=Min("id"), quantity=Count("id"))
+        .filter(quantity__gt=1)
+        .order_by()
+    )
+    # Read the groups before deleting any of the items they aggregate
+    for group in list(groups):
+        OrderItem.objects.filter(id=group["line_id"]).update(quantity=group["quantity"])
+        OrderItem.objects.filter(
+            order_id=group["order_id"],
+            hardware_id=group["hardware_id"],
+            part_returned_health=group["part_returned_health"],
+            incident__isnull=True,
+        ).exclude(id=group["line_id"]).delete()
+
+
+def split_order_items(apps, schema_editor):
+    OrderItem = apps.get_model("hardware", "OrderItem")
+
+    # Read the lines before inserting the items they are split into
+    for line in list(OrderItem.objects.filter(quantity__gt=1)):
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    order_id=line.order_id,
+                    hardware_id=line.hardware_id,
+                    part_returned_health=line.part_returned_health,
+                    quantity=1,
+                )
+                for _ in range(line.quantity - 1)
+            ]
+        )
+    OrderItem.objects.filter(quantity__gt=1).update(quantity=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hardware", "0012_hardware_stock_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="quantity",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(merge_order_items, split_order_items),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.2.15 on 2026-10-18 09:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("event", "0008_team_project_description"),
+        ("hardware", "0013_orderitem_quantity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderTicket",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("Queued", "Queued"),
+                            ("Completed", "Completed"),
+                            ("Rejected", "Rejected"),
+                        ],
+                        default="Queued",
+                        max_length=64,
+                    ),
+                ),
+                ("request", models.JSONField()),
+                ("response", models.JSONField(null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(null=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="hardware.order",
+                    ),
+                ),
+                (
+                    "requester",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "team",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="event.team"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="orderticket",
+            index=models.Index(
+                fields=["status", "id"], name="hardware_or_status_4ee682_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.15 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hardware", "0014_orderticket"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLogEntry",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "model",
+                    models.CharField(
+                        choices=[
+                            ("hardware", "Hardware"),
+                            ("order", "Order"),
+                            ("order_item", "Order Item"),
+                            ("incident", "Incident"),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                ("object_id", models.IntegerField()),
+                ("deleted", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={"verbose_name_plural": "change log entries",},
+        ),
+        migrations.AddIndex(
+            model_name="changelogentry",
+            index=models.Index(
+                fields=["model", "id"], name="hardware_ch_model_38ed1b_idx"
+            ),
+        ),
+    ]
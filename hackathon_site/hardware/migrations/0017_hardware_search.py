@@ -0,0 +1,95 @@
+# Generated by Django 3.2.15 on 2026-10-18 10:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class PostgresAddIndex(migrations.AddIndex):
+    """
+    GIN indexes only exist on postgres, the tests run on sqlite without them.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def populate_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # Same as hardware.search.build_search_vector
+    schema_editor.execute(
+        """
+        UPDATE hardware_hardware SET search_vector =
+            setweight(to_tsvector('english', COALESCE(name, '')), 'A')
+            || setweight(to_tsvector('english', COALESCE(model_number, '') || ' ' || COALESCE(manufacturer, '')), 'B')
+            || setweight(to_tsvector('english', COALESCE((
+                SELECT STRING_AGG(category.name, ' ')
+                FROM hardware_category category
+                INNER JOIN hardware_hardware_categories link ON link.category_id = category.id
+                WHERE link.hardware_id = hardware_hardware.id
+            ), '')), 'C')
+            || setweight(to_tsvector('english', COALESCE(notes, '')), 'D')
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hardware", "0016_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="hardware",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="category",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"],
+                name="hardware_category_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="hardware",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="hardware_search_vector"
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="hardware",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="hardware_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="hardware",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["model_number"],
+                name="hardware_model_number_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        PostgresAddIndex(
+            model_name="hardware",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["manufacturer"],
+                name="hardware_manufacturer_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.RunPython(populate_search_vector, migrations.RunPython.noop),
+    ]
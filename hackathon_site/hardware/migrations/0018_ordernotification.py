@@ -0,0 +1,55 @@
+# Generated by Django 3.2.15 on 2026-10-18 10:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("event", "0009_outboxemail"),
+        ("hardware", "0017_hardware_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNotification",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "audience",
+                    models.CharField(
+                        choices=[("Admins", "Admins"), ("Team", "Team")], max_length=64
+                    ),
+                ),
+                ("subject", models.TextField(blank=True, default="")),
+                ("html_body", models.TextField(blank=True, default="")),
+                ("context", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("emailed_at", models.DateTimeField(null=True)),
+                (
+                    "team",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="event.team",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="ordernotification",
+            index=models.Index(
+                fields=["audience", "emailed_at"], name="hardware_or_audienc_fe31dd_idx"
+            ),
+        ),
+    ]
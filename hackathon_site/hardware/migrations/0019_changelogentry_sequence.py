@@ -0,0 +1,48 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def sequence_existing_entries(apps, schema_editor):
+    """
+    Cursors handed out so far are entry ids, so the existing entries keep their id
+    as their sequence number.
+    """
+    ChangeLogEntry = apps.get_model("hardware", "ChangeLogEntry")
+    ChangeLogEntry.objects.update(sequence=F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("hardware", "0018_ordernotification"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="changelogentry", name="hardware_ch_model_38ed1b_idx",
+        ),
+        migrations.AddField(
+            model_name="changelogentry",
+            name="sequence",
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.RunPython(
+            sequence_existing_entries, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name="changelogentry",
+            index=models.Index(
+                fields=["model", "sequence"], name="hardware_ch_model_550168_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="changelogentry",
+            index=models.Index(
+                condition=models.Q(("sequence__isnull", True)),
+                fields=["id"],
+                name="hardware_changelog_unsequenced",
+            ),
+        ),
+    ]
@@ -1,12 +1,28 @@
-from django.db import models
-from django.db.models import Count, F, Q
+from collections import Counter
 
-from event.models import Team as TeamEvent
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from event.models import Team as TeamEvent, User
+from hardware.catalog_cache import invalidate_catalog
+from hardware.events import publish_stock_changes
+from hardware.search import build_search_vector, search_enabled
 
 
 class Category(models.Model):
     class Meta:
         verbose_name_plural = "categories"
+        indexes = [
+            GinIndex(
+                name="hardware_category_name_trgm",
+                fields=["name"],
+                opclasses=["gin_trgm_ops"],
+            )
+        ]
 
     name = models.CharField(max_length=255, null=False)
     max_per_team = models.IntegerField(null=True)
@@ -18,35 +34,91 @@ class Category(models.Model):
         return self.name
 
 
-class AnnotatedHardwareManager(models.Manager):
-    def get_queryset(self):
-        return (
-            super()
-            .get_queryset()
-            .annotate(
-                quantity_checked_out=Count(
-                    "order_items",
-                    filter=(
-                        ~Q(order_items__part_returned_health="Healthy")
-                        & ~Q(order_items__order__status="Cancelled")
-                    ),
-                    distinct=True,
-                )
-            )
-            .annotate(
-                quantity_remaining=(F("quantity_available") - F("quantity_checked_out"))
+class HardwareQuerySet(models.QuerySet):
+    def with_computed_stock(self):
+        """
+        Annotate each hardware with the number of units checked out, computed from
+        its order items rather than read from the stored stock counters. Used to
+        reconcile the counters, the API should read the stored columns instead.
+        """
+        return self.annotate(
+            computed_quantity_checked_out=_checked_out_subquery()
+        ).annotate(
+            computed_quantity_remaining=(
+                F("quantity_available") - F("computed_quantity_checked_out")
             )
         )
 
+    def update_stock(self):
+        """
+        Recompute the stored stock counters of every hardware in this queryset from
+        its order items, in a single UPDATE. Call this in the same transaction as any
+        write that changes which order items are checked out and which bypasses the
+        model signals (bulk_create, QuerySet.update, etc.). This also invalidates
+        the cached catalog responses, which show the stock, announces the new stock
+        on the event stream and records the change in the change log.
+        """
+        checked_out = _checked_out_subquery()
+        invalidate_catalog()
+        publish_stock_changes(self)
+        ChangeLogEntry.objects.record("hardware", self.values_list("id", flat=True))
+        return self.order_by().update(
+            quantity_checked_out=checked_out,
+            quantity_remaining=F("quantity_available") - checked_out,
+        )
+
+    def update_search_vector(self):
+        """
+        Recompute the search vector of every hardware in this queryset, after a
+        change to their name, model number, manufacturer, notes or categories. Does
+        nothing if the database is not postgres, see hardware.search.
+        """
+        if not search_enabled():
+            return 0
+        return self.order_by().update(search_vector=build_search_vector())
+
+
+def _checked_out_subquery():
+    """
+    Number of units of the outer hardware that are currently checked out, i.e. order
+    items that are not part of a cancelled order and were not returned healthy.
+    """
+    return Coalesce(
+        Subquery(
+            OrderItem.objects.filter(hardware=OuterRef("pk"))
+            .exclude(part_returned_health="Healthy")
+            .exclude(order__status="Cancelled")
+            .order_by()
+            .values("hardware")
+            .annotate(quantity_sum=Sum("quantity"))
+            .values("quantity_sum"),
+            output_field=models.IntegerField(),
+        ),
+        0,
+    )
+
 
 class Hardware(models.Model):
-    objects = AnnotatedHardwareManager()
+    objects = HardwareQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "hardware"
-
-    class Config:
-        annotated_fields = ("quantity_checked_out", "quantity_remaining")
+        indexes = [
+            GinIndex(name="hardware_search_vector", fields=["search_vector"]),
+            GinIndex(
+                name="hardware_name_trgm", fields=["name"], opclasses=["gin_trgm_ops"]
+            ),
+            GinIndex(
+                name="hardware_model_number_trgm",
+                fields=["model_number"],
+                opclasses=["gin_trgm_ops"],
+            ),
+            GinIndex(
+                name="hardware_manufacturer_trgm",
+                fields=["manufacturer"],
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     name = models.CharField(max_length=255, null=False)
     model_number = models.CharField(max_length=255, null=True, blank=True)
@@ -61,25 +133,44 @@ class Hardware(models.Model):
     image_url = models.CharField(max_length=500, null=True, blank=True)
     categories = models.ManyToManyField(Category)
 
+    # Stock counters, maintained by HardwareQuerySet.update_stock in the same
+    # transaction as the writes to order items. Use the reconcile_hardware_stock
+    # management command to check them against the order items.
+    quantity_checked_out = models.IntegerField(default=0, editable=False)
+    quantity_remaining = models.IntegerField(default=0, editable=False, db_index=True)
+
+    # Maintained by HardwareQuerySet.update_search_vector, see hardware.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
 
-    def refresh_from_db(self, using=None, fields=None):
-        super().refresh_from_db(using, fields)
-
-        # Fetch the queryset again to populate the annotations. This is somewhat
-        # inefficient since it performs the query twice, so use sparingly.
-        db_instance_qs = self.__class__.objects.filter(pk=self.pk)
-        db_instance = db_instance_qs.get()
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.quantity_remaining = (
+                self.quantity_available - self.quantity_checked_out
+            )
+            super().save(*args, **kwargs)
+            return
 
-        for field_name in self.Config.annotated_fields:
-            setattr(self, field_name, getattr(db_instance, field_name))
+        super().save(*args, **kwargs)
+        # quantity_available may have changed, and the counters on this instance may
+        # be stale, so recompute them from the database rather than trusting them.
+        self.__class__.objects.filter(pk=self.pk).update_stock()
+        self.refresh_from_db(fields=("quantity_checked_out", "quantity_remaining"))
 
     def __str__(self):
         return f"{self.name} | {self.manufacturer}"
 
 
 class OrderItem(models.Model):
+    """
+    A line of an order: a quantity of one hardware, either still checked out (no
+    part_returned_health) or returned in the given health. An order has at most one
+    line per hardware and return health, except for lines with an incident, which
+    are kept separate so that the incident stays attached to the units it is about.
+    """
+
     HEALTH_CHOICES = [
         ("Healthy", "Healthy"),
         ("Heavily Used", "Heavily Used"),
@@ -95,9 +186,10 @@ class OrderItem(models.Model):
     part_returned_health = models.CharField(
         max_length=64, choices=HEALTH_CHOICES, null=True, blank=True
     )
+    quantity = models.PositiveIntegerField(default=1, null=False)
 
     def __str__(self):
-        return f"{self.id} | {self.hardware.name} | Team {self.order.team.team_code if self.order.team else None}"
+        return f"{self.id} | {self.quantity} x {self.hardware.name} | Team {self.order.team.team_code if self.order.team else None}"
 
 
 class Order(models.Model):
@@ -109,6 +201,10 @@ class Order(models.Model):
         ("Returned", "Returned"),
     ]
 
+    class Meta:
+        # Keyset pagination of the order list
+        indexes = [models.Index(fields=["created_at", "id"])]
+
     hardware = models.ManyToManyField(Hardware, through=OrderItem)
     team = models.ForeignKey(TeamEvent, on_delete=models.SET_NULL, null=True)
     status = models.CharField(
@@ -132,6 +228,11 @@ class Incident(models.Model):
         ("Major Repair Required", "Major Repair Required"),
         ("Not Sure If Works", "Not Sure If Works"),
     ]
+
+    class Meta:
+        # Keyset pagination of the incident list
+        indexes = [models.Index(fields=["created_at", "id"])]
+
     state = models.CharField(max_length=64, choices=STATE_CHOICES, null=False)
     time_occurred = models.DateTimeField(auto_now=False, auto_now_add=False, null=False)
     description = models.TextField(null=False)
@@ -144,3 +245,179 @@ class Incident(models.Model):
 
     def __str__(self):
         return f"{self.id}"
+
+
+class OrderTicketQuerySet(models.QuerySet):
+    def queue_order(self):
+        """
+        Return the ids of the queued tickets in the order the order queue serves
+        them: in submission order, but round robin between teams, so that a team
+        with several tickets waiting does not hold back the teams behind it.
+        """
+        queued_tickets = (
+            self.filter(status="Queued").order_by("id").values_list("id", "team_id")
+        )
+        team_rounds = Counter()
+        ranked_tickets = []
+        for (ticket_id, team_id) in queued_tickets:
+            ranked_tickets.append((team_rounds[team_id], ticket_id))
+            team_rounds[team_id] += 1
+        return [ticket_id for (_, ticket_id) in sorted(ranked_tickets)]
+
+
+class OrderTicket(models.Model):
+    """
+    An order submission waiting in the order queue, used instead of placing the
+    order right away when settings.HARDWARE_ORDER_QUEUE_ENABLED is set. Tickets are
+    allocated by the process_order_queue management command.
+    """
+
+    STATUS_CHOICES = [
+        ("Queued", "Queued"),
+        ("Completed", "Completed"),
+        ("Rejected", "Rejected"),
+    ]
+
+    objects = OrderTicketQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "id"])]
+
+    team = models.ForeignKey(TeamEvent, on_delete=models.CASCADE, null=False)
+    requester = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    status = models.CharField(max_length=64, choices=STATUS_CHOICES, default="Queued")
+    # A list of {"id": <hardware id>, "quantity": <int>}
+    request = models.JSONField(null=False)
+    # The order creation response once completed, or {"errors": [...]} if rejected
+    response = models.JSONField(null=True)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    processed_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.id}"
+
+
+# Key of the postgres advisory lock taken by ChangeLogQuerySet.sequence_committed
+CHANGE_LOG_SEQUENCE_LOCK = 0x6368616E6765
+
+
+class ChangeLogQuerySet(models.QuerySet):
+    def record(self, model, object_ids, deleted=False):
+        """
+        Record that the objects of the given model (one of ChangeLogEntry.MODELS) with
+        the given ids were created or updated, or deleted. Call this along with any
+        write which bypasses the model signals (bulk_create, QuerySet.update, etc.).
+        """
+        return self.bulk_create(
+            [
+                ChangeLogEntry(model=model, object_id=object_id, deleted=deleted)
+                for object_id in object_ids
+            ]
+        )
+
+    def sequence_committed(self):
+        """
+        Give the committed entries which do not have a sequence number yet the next
+        sequence numbers, and return the last sequence number (0 if there is none).
+
+        Ids are allocated when the entries are inserted, but their transaction may
+        commit after entries with a higher id, so the sync cursor is the sequence
+        number instead, handed out once the entries are visible. Sequencing is
+        serialized by a lock held until commit, so a sequence number is never
+        visible before all the lower ones.
+        """
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # sqlite serializes all writes already
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT pg_advisory_xact_lock(%s)", [CHANGE_LOG_SEQUENCE_LOCK]
+                    )
+            last_sequence = (
+                self.aggregate(last_sequence=Max("sequence"))["last_sequence"] or 0
+            )
+            first_id = self.filter(sequence__isnull=True).aggregate(first_id=Min("id"))[
+                "first_id"
+            ]
+            if first_id is None:
+                return last_sequence
+            # Entries committed meanwhile with a lower id are left for the next call
+            pending = self.filter(sequence__isnull=True, id__gte=first_id)
+            offset = last_sequence + 1 - first_id
+            pending.update(sequence=F("id") + offset)
+            return self.aggregate(last_sequence=Max("sequence"))["last_sequence"]
+
+
+class ChangeLogEntry(models.Model):
+    """
+    A write to a hardware, order, order item or incident, from which clients sync
+    their local copy of these tables. The sequence number of the entries, in commit
+    order, is the sync cursor.
+    """
+
+    MODELS = [
+        ("hardware", "Hardware"),
+        ("order", "Order"),
+        ("order_item", "Order Item"),
+        ("incident", "Incident"),
+    ]
+
+    objects = ChangeLogQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "change log entries"
+        indexes = [
+            models.Index(fields=["model", "sequence"]),
+            models.Index(
+                fields=["id"],
+                condition=Q(sequence__isnull=True),
+                name="hardware_changelog_unsequenced",
+            ),
+        ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Set by ChangeLogQuerySet.sequence_committed once the entry is committed
+    sequence = models.BigIntegerField(null=True, unique=True)
+    model = models.CharField(max_length=32, choices=MODELS)
+    object_id = models.IntegerField()
+    # Tombstone for a deleted object
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+
+    def __str__(self):
+        return f"{self.id} | {self.model} {self.object_id}"
+
+
+class OrderNotification(models.Model):
+    """
+    A notification about an order, to the admins or to the members of a team,
+    recorded when the order changes and emailed later by the send_order_notifications
+    management command. The notifications to the admins are sent together in a
+    digest every settings.ADMIN_NOTIFICATION_DIGEST_INTERVAL seconds, and the status
+    changes of the orders of a team within settings.TEAM_NOTIFICATION_WINDOW seconds
+    in one email to each member. Notifications are kept once emailed, as a log.
+    """
+
+    AUDIENCE_CHOICES = [
+        ("Admins", "Admins"),
+        ("Team", "Team"),
+    ]
+
+    class Meta:
+        indexes = [models.Index(fields=["audience", "emailed_at"])]
+
+    audience = models.CharField(max_length=64, choices=AUDIENCE_CHOICES)
+    team = models.ForeignKey(TeamEvent, on_delete=models.SET_NULL, null=True)
+    # The notification to the admins, rendered when recorded
+    subject = models.TextField(blank=True, null=False, default="")
+    html_body = models.TextField(blank=True, null=False, default="")
+    # The order and messages of a status change, rendered for each team member
+    context = models.JSONField(default=dict, null=False)
+
+    created_at = models.DateTimeField(default=timezone.now, null=False)
+    emailed_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.id} | {self.audience}"
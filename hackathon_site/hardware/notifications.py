@@ -0,0 +1,182 @@
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from event.models import OutboxEmail, Profile
+from event.notifications import Notification, html_to_text
+from event.outbox import build_email
+from hardware.models import OrderNotification
+
+ADMINS_RECIPIENT = "Hardware Inventory Admins"
+
+status_change_email_subject_template = (
+    "hardware/emails/order_status_change/order_status_change_email_subject.txt"
+)
+status_change_email_template = (
+    "hardware/emails/order_status_change/order_status_change_email_body.html"
+)
+status_changes_email_subject_template = (
+    "hardware/emails/order_status_change/order_status_changes_email_subject.txt"
+)
+status_changes_email_template = (
+    "hardware/emails/order_status_change/order_status_changes_email_body.html"
+)
+admin_digest_email_subject_template = (
+    "hardware/emails/admin_digest/admin_digest_email_subject.txt"
+)
+admin_digest_email_template = (
+    "hardware/emails/admin_digest/admin_digest_email_body.html"
+)
+
+
+def admin_notification(subject_template, body_template, context):
+    """
+    A notification to the admins, rendered now, to be saved with the other
+    notifications of the change.
+    """
+    (subject, _, html_body) = Notification(
+        subject_template, body_template, context
+    ).render(ADMINS_RECIPIENT)
+    return OrderNotification(audience="Admins", subject=subject, html_body=html_body)
+
+
+def status_change_notification(
+    team_id, order, order_status_message, order_status_closing_message
+):
+    """
+    A notification to the members of a team that the status of their order, a dict
+    with its id, team_code and status, changed.
+    """
+    return OrderNotification(
+        audience="Team",
+        team_id=team_id,
+        context={
+            "order": {
+                "id": order["id"],
+                "team_code": order["team_code"],
+                "status": order["status"],
+            },
+            "order_status_message": order_status_message,
+            "order_status_closing_message": order_status_closing_message,
+        },
+    )
+
+
+def build_admin_digest(notifications):
+    if len(notifications) == 1:
+        (notification,) = notifications
+        return build_email(
+            subject=notification.subject,
+            message=html_to_text(notification.html_body),
+            html_message=notification.html_body,
+            recipient_list=[settings.HSS_ADMIN_EMAIL],
+        )
+    return Notification(
+        admin_digest_email_subject_template,
+        admin_digest_email_template,
+        {"notifications": notifications},
+    ).to_email(ADMINS_RECIPIENT, [settings.HSS_ADMIN_EMAIL])
+
+
+def build_team_emails(notifications, profiles):
+    if len(notifications) == 1:
+        notification = Notification(
+            status_change_email_subject_template,
+            status_change_email_template,
+            notifications[0].context,
+        )
+    else:
+        notification = Notification(
+            status_changes_email_subject_template,
+            status_changes_email_template,
+            {
+                "team_code": notifications[-1].context["order"]["team_code"],
+                "changes": [notification.context for notification in notifications],
+            },
+        )
+    return [
+        notification.to_email(profile.user, [profile.user.email])
+        for profile in profiles
+    ]
+
+
+def queue_admin_digest(now, force=False):
+    """
+    Queue a digest of the pending notifications to the admins, if the oldest is
+    older than settings.ADMIN_NOTIFICATION_DIGEST_INTERVAL or if force is set.
+    Returns the number of emails queued.
+    """
+    cutoff = now - timedelta(seconds=settings.ADMIN_NOTIFICATION_DIGEST_INTERVAL)
+    with transaction.atomic():
+        notifications = list(
+            OrderNotification.objects.select_for_update(skip_locked=True)
+            .filter(audience="Admins", emailed_at__isnull=True)
+            .order_by("created_at", "id")
+        )
+        if not notifications or not (force or notifications[0].created_at <= cutoff):
+            return 0
+        OutboxEmail.objects.queue([build_admin_digest(notifications)])
+        OrderNotification.objects.filter(
+            id__in=[notification.id for notification in notifications]
+        ).update(emailed_at=now)
+    return 1
+
+
+def queue_team_notifications(now, force=False):
+    """
+    Queue one email to each member of the teams whose oldest pending notification is
+    older than settings.TEAM_NOTIFICATION_WINDOW, or of all the teams with pending
+    notifications if force is set, with all of their pending notifications.
+    Returns the number of emails queued.
+    """
+    cutoff = now - timedelta(seconds=settings.TEAM_NOTIFICATION_WINDOW)
+    with transaction.atomic():
+        pending = (
+            OrderNotification.objects.select_for_update(skip_locked=True)
+            .filter(audience="Team", emailed_at__isnull=True)
+            .order_by("team_id", "created_at", "id")
+        )
+        due_notifications = {}
+        for (team_id, notifications) in groupby(
+            pending, key=lambda notification: notification.team_id
+        ):
+            notifications = list(notifications)
+            if force or notifications[0].created_at <= cutoff:
+                due_notifications[team_id] = notifications
+        if not due_notifications:
+            return 0
+
+        profiles_by_team = {}
+        for profile in (
+            Profile.objects.filter(team_id__in=due_notifications.keys())
+            .exclude(user__email="")
+            .select_related("user")
+        ):
+            profiles_by_team.setdefault(profile.team_id, []).append(profile)
+        emails = []
+        for (team_id, notifications) in due_notifications.items():
+            emails.extend(
+                build_team_emails(notifications, profiles_by_team.get(team_id, []))
+            )
+
+        OutboxEmail.objects.queue(emails)
+        OrderNotification.objects.filter(
+            id__in=[
+                notification.id
+                for notifications in due_notifications.values()
+                for notification in notifications
+            ]
+        ).update(emailed_at=now)
+    return len(emails)
+
+
+def queue_due_notifications(force=False):
+    """
+    Queue the emails of the notifications which are due, or of all the pending
+    notifications if force is set, and return the number of emails queued.
+    """
+    now = timezone.now()
+    return queue_admin_digest(now, force) + queue_team_notifications(now, force)
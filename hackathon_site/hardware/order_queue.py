@@ -0,0 +1,77 @@
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from hardware.models import Hardware, OrderTicket
+from hardware.serializers import OrderCreateSerializer
+
+
+def get_next_batch(batch_size):
+    """
+    Return the ids of the next batch_size queued tickets, in the order given by
+    OrderTicketQuerySet.queue_order.
+    """
+    return OrderTicket.objects.queue_order()[:batch_size]
+
+
+def process_batch(batch_size):
+    """
+    Allocate the next batch of queued tickets one after the other, in a single
+    transaction, and return the processed tickets.
+
+    Each ticket is allocated like an order placed directly, which happens in its own
+    savepoint, so a ticket which is no longer within the per-team limits is rejected
+    without affecting the rest of the batch.
+    """
+    ticket_ids = get_next_batch(batch_size)
+    if not ticket_ids:
+        return []
+
+    with transaction.atomic():
+        tickets_by_id = (
+            OrderTicket.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(id__in=ticket_ids, status="Queued")
+            .select_related("team", "requester")
+            .in_bulk()
+        )
+        tickets = [
+            tickets_by_id[ticket_id]
+            for ticket_id in ticket_ids
+            if ticket_id in tickets_by_id
+        ]
+        hardware_by_id = Hardware.objects.in_bulk(
+            {e["id"] for ticket in tickets for e in ticket.request}
+        )
+
+        for ticket in tickets:
+            try:
+                missing_ids = [
+                    e["id"] for e in ticket.request if e["id"] not in hardware_by_id
+                ]
+                if missing_ids:
+                    raise serializers.ValidationError(
+                        [
+                            f'Invalid pk "{hardware_id}" - object does not exist.'
+                            for hardware_id in missing_ids
+                        ]
+                    )
+                ticket.response = OrderCreateSerializer.allocate(
+                    ticket.team,
+                    Counter(
+                        {hardware_by_id[e["id"]]: e["quantity"] for e in ticket.request}
+                    ),
+                )
+                ticket.status = "Completed"
+                ticket.order_id = ticket.response["order_id"]
+            except serializers.ValidationError as e:
+                ticket.status = "Rejected"
+                ticket.response = {"errors": [str(message) for message in e.detail]}
+            ticket.processed_at = datetime.now(settings.TZ_INFO)
+
+        OrderTicket.objects.bulk_update(
+            tickets, ["status", "response", "order", "processed_at"]
+        )
+    return tickets
@@ -0,0 +1,126 @@
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class LimitOffsetOrKeysetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination, or keyset pagination for clients which opt in by
+    passing ?cursor= (empty for the first page).
+
+    Keyset pages are ordered on the view's keyset_fields, by default
+    (created_at, id), descending if the queryset is ordered by the first of them
+    descending, and ascending otherwise. Each page is read with an indexed range
+    scan starting after the last row of the previous page, so deep pages are as
+    fast as the first one. There is no total count: the response only has the
+    results and the link to the next page, which is null on the last page.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    default_keyset_fields = ("created_at", "id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        fields = self.get_keyset_fields(view)
+        descending = queryset.query.order_by[:1] == (f"-{fields[0]}",)
+        queryset = queryset.order_by(
+            *(f"-{field}" if descending else field for field in fields)
+        )
+
+        position = self.decode_cursor(request, queryset.model, fields)
+        if position is not None:
+            queryset = queryset.filter(self.after(fields, position, descending))
+
+        # One extra row tells whether there is a next page
+        results = list(queryset[: self.limit + 1])
+        self.next_position = None
+        if len(results) > self.limit:
+            results = results[: self.limit]
+            self.next_position = [
+                self.get_row_value(results[-1], field) for field in fields
+            ]
+        return results
+
+    def get_keyset_fields(self, view):
+        return getattr(view, "keyset_fields", self.default_keyset_fields)
+
+    @staticmethod
+    def get_row_value(row, field):
+        # Rows are model instances, or dicts for views which list with values()
+        if isinstance(row, dict):
+            return row[field]
+        return getattr(row, field)
+
+    @staticmethod
+    def after(fields, position, descending):
+        """
+        Filter for the rows after position in the (fields) order, the row value
+        comparison (fields) > (position) spelled out as
+        a > x OR (a = x AND b > y) OR ...
+        """
+        lookup = "lt" if descending else "gt"
+        condition = Q()
+        for i, field in enumerate(fields):
+            condition |= Q(
+                **{previous: position[j] for j, previous in enumerate(fields[:i])},
+                **{f"{field}__{lookup}": position[i]},
+            )
+        return condition
+
+    def decode_cursor(self, request, model, fields):
+        encoded = request.query_params[self.cursor_query_param]
+        if not encoded:
+            return None
+        try:
+            values = parse.parse_qs(
+                b64decode(encoded.encode("ascii")).decode("ascii"), strict_parsing=True
+            )["p"]
+            if len(values) != len(fields):
+                raise ValueError
+            return [
+                model._meta.get_field(field).to_python(value)
+                for (field, value) in zip(fields, values)
+            ]
+        except (TypeError, ValueError, KeyError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        query = parse.urlencode(
+            [
+                ("p", value.isoformat() if hasattr(value, "isoformat") else value)
+                for value in position
+            ]
+        )
+        return b64encode(query.encode("ascii")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
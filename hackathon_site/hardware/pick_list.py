@@ -0,0 +1,91 @@
+import csv
+
+from django.db.models import Count, Sum
+
+from hardware.models import OrderItem
+
+PICK_LIST_CSV_HEADER = (
+    "hardware_id",
+    "name",
+    "model_number",
+    "manufacturer",
+    "quantity_remaining",
+    "total_quantity",
+    "team_code",
+    "team_quantity",
+    "team_orders",
+)
+
+
+def get_pick_list(order_status):
+    """
+    Aggregate the items of all orders in order_status into a list of the hardware
+    to pull, ordered by name, each with its total quantity and a breakdown of the
+    quantity per team.
+
+    Everything is computed from a single query grouped by hardware and team.
+    """
+    rows = (
+        OrderItem.objects.filter(
+            order__status=order_status, part_returned_health__isnull=True
+        )
+        .values(
+            "hardware_id",
+            "hardware__name",
+            "hardware__model_number",
+            "hardware__manufacturer",
+            "hardware__quantity_remaining",
+            "order__team_id",
+            "order__team__team_code",
+        )
+        .annotate(quantity=Sum("quantity"), orders=Count("order_id", distinct=True))
+        .order_by("hardware__name", "hardware_id", "order__team__team_code")
+    )
+
+    pick_list = []
+    for row in rows:
+        if not pick_list or pick_list[-1]["hardware_id"] != row["hardware_id"]:
+            pick_list.append(
+                {
+                    "hardware_id": row["hardware_id"],
+                    "name": row["hardware__name"],
+                    "model_number": row["hardware__model_number"],
+                    "manufacturer": row["hardware__manufacturer"],
+                    "quantity_remaining": row["hardware__quantity_remaining"],
+                    "total_quantity": 0,
+                    "teams": [],
+                }
+            )
+        pick_list[-1]["total_quantity"] += row["quantity"]
+        pick_list[-1]["teams"].append(
+            {
+                "team_id": row["order__team_id"],
+                "team_code": row["order__team__team_code"],
+                "quantity": row["quantity"],
+                "orders": row["orders"],
+            }
+        )
+    return pick_list
+
+
+def write_pick_list_csv(pick_list, stream):
+    """
+    Write a pick list to stream as CSV, with one row per hardware and team.
+    """
+    writer = csv.writer(stream)
+    writer.writerow(PICK_LIST_CSV_HEADER)
+    for hardware in pick_list:
+        for team in hardware["teams"]:
+            writer.writerow(
+                (
+                    hardware["hardware_id"],
+                    hardware["name"],
+                    hardware["model_number"],
+                    hardware["manufacturer"],
+                    hardware["quantity_remaining"],
+                    hardware["total_quantity"],
+                    team["team_code"],
+                    team["quantity"],
+                    team["orders"],
+                )
+            )
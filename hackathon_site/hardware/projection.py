@@ -0,0 +1,203 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+# Key of the parent id in the rows of the nested many relations
+PARENT_KEY = "_projection_parent"
+
+
+def get_related_query_name(relation):
+    """
+    The lookup from the related model of a many relation back to its model, e.g.
+    "hardware" for Hardware.categories and "order" for Order.items.
+    """
+    if relation.auto_created:
+        # A reverse relation, e.g. Order.items
+        return relation.field.name
+    return relation.related_query_name()
+
+
+class ProjectionSerializerMixin:
+    """
+    Serializer mixin for read-only list serializers, which reads the rows with
+    values() and builds their representations directly from the columns, instead of
+    loading model instances and getting each field from them. The representations
+    are the same as to_representation's.
+
+    Supported fields are the fields reading a column or a forward relation through
+    their source, the primary keys of many relations, nested many serializers which
+    support projection themselves, and method fields with a single lookup in
+    Meta.field_lookups whose value they return as is. can_project is False if the
+    serializer has any other field.
+    """
+
+    def get_projected_fields(self):
+        """
+        Returns a list of (field, lookup, child), where lookup is the column of the
+        field, or the many relation for the fields with a child (a nested serializer,
+        or None for primary keys). Returns None if a field is not supported.
+        """
+        model = self.Meta.model
+        field_lookups = getattr(self.Meta, "field_lookups", {})
+        projected_fields = []
+        for field in self.fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, ManyRelatedField):
+                if not isinstance(field.child_relation, PrimaryKeyRelatedField):
+                    return None
+                child = None
+            elif isinstance(field, serializers.ListSerializer):
+                if (
+                    not isinstance(field.child, ProjectionSerializerMixin)
+                    or not field.child.can_project()
+                ):
+                    return None
+                child = field.child
+            elif isinstance(field, serializers.SerializerMethodField):
+                lookups = field_lookups.get(field.field_name, [])
+                if len(lookups) != 1:
+                    return None
+                projected_fields.append((field, lookups[0], None))
+                continue
+            elif isinstance(field, serializers.BaseSerializer) or (
+                isinstance(field, serializers.RelatedField)
+                and not isinstance(field, PrimaryKeyRelatedField)
+            ):
+                return None
+            elif field.source == "*":
+                return None
+            else:
+                projected_fields.append((field, field.source.replace(".", "__"), None))
+                continue
+
+            relation = model._meta.get_field(field.source)
+            if not (relation.many_to_many or relation.one_to_many):
+                return None
+            projected_fields.append((field, relation, child))
+        return projected_fields
+
+    def can_project(self):
+        if not hasattr(self, "_projected_fields"):
+            self._projected_fields = self.get_projected_fields()
+        return self._projected_fields is not None
+
+    def project(self, queryset, extra_lookups=(), **expressions):
+        """
+        The rows of queryset as dicts of the columns of the fields, plus the primary
+        key, extra_lookups and expressions, for to_representations.
+        """
+        self.can_project()
+        lookups = [self.Meta.model._meta.pk.name, *extra_lookups]
+        for (field, lookup, child) in self._projected_fields:
+            if isinstance(lookup, str):
+                lookups.append(lookup)
+        return queryset.prefetch_related(None).values(
+            *dict.fromkeys(lookups), **expressions
+        )
+
+    def to_representations(self, rows):
+        """
+        The representations of the rows of project, reading the many relations of
+        all the rows with one query each.
+        """
+        self.can_project()
+        pk_name = self.Meta.model._meta.pk.name
+        ids = [row[pk_name] for row in rows]
+        many_values = {
+            field.field_name: self._read_many(relation, child, ids)
+            for (field, relation, child) in self._projected_fields
+            if not isinstance(relation, str)
+        }
+
+        representations = []
+        for row in rows:
+            representation = {}
+            for (field, lookup, child) in self._projected_fields:
+                if not isinstance(lookup, str):
+                    value = many_values[field.field_name].get(row[pk_name], [])
+                elif isinstance(field, serializers.SerializerMethodField):
+                    value = row[lookup]
+                else:
+                    value = self._to_representation(field, lookup, row[lookup])
+                representation[field.field_name] = value
+            representations.append(representation)
+        return representations
+
+    def _to_representation(self, field, lookup, value):
+        if value is None:
+            return None
+        if isinstance(field, PrimaryKeyRelatedField):
+            # values() reads the id of forward relations
+            return value
+        if isinstance(field, serializers.ModelField):
+            # Reads the value from the instance itself
+            value = SimpleNamespace(**{field.model_field.attname: value})
+        elif isinstance(field, serializers.FileField):
+            model_field = self._get_model_field(lookup)
+            value = model_field.attr_class(None, model_field, value)
+        return field.to_representation(value)
+
+    def _get_model_field(self, lookup):
+        model = self.Meta.model
+        *relations, name = lookup.split("__")
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def _read_many(self, relation, child, ids):
+        """
+        Map each of ids to the representations of its related objects through
+        relation, or their primary keys if child is None, ordered by primary key.
+        """
+        if not ids:
+            return {}
+        query_name = get_related_query_name(relation)
+        queryset = relation.related_model.objects.filter(
+            **{f"{query_name}__in": ids}
+        ).order_by(query_name, "pk")
+
+        values = defaultdict(list)
+        if child is None:
+            for (parent_id, pk) in queryset.values_list(query_name, "pk"):
+                values[parent_id].append(pk)
+            return values
+
+        rows = list(child.project(queryset, **{PARENT_KEY: F(query_name)}))
+        for (row, representation) in zip(rows, child.to_representations(rows)):
+            values[row[PARENT_KEY]].append(representation)
+        return values
+
+
+class ProjectionListViewMixin:
+    """
+    List view mixin which lists the rows with the projection of the serializer,
+    see ProjectionSerializerMixin, or with the serializer if it does not support it.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        if not serializer.can_project():
+            return super().list(request, *args, **kwargs)
+
+        queryset = serializer.project(
+            self.filter_queryset(self.get_queryset()),
+            extra_lookups=self.get_pagination_lookups(),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representations(page))
+        return Response(serializer.to_representations(list(queryset)))
+
+    def get_pagination_lookups(self):
+        """
+        The columns the paginator reads from the rows of the page
+        """
+        get_keyset_fields = getattr(self.paginator, "get_keyset_fields", None)
+        if get_keyset_fields is None:
+            return ()
+        return get_keyset_fields(self)
@@ -0,0 +1,24 @@
+import io
+
+from rest_framework import renderers
+
+from hardware.pick_list import write_pick_list_csv
+
+
+class PickListCSVRenderer(renderers.BaseRenderer):
+    """
+    Render a pick list as CSV, with one row per hardware and team. Selected with
+    ?format=csv or an Accept: text/csv header.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if "hardware" not in data:
+            # Errors are not pick lists, render them as a single line of text
+            return "\n".join(f"{key}: {value}" for (key, value) in data.items())
+        stream = io.StringIO()
+        write_pick_list_csv(data["hardware"], stream)
+        return stream.getvalue()
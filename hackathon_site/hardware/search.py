@@ -0,0 +1,103 @@
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.lookups import PostgresOperatorLookup
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramSimilarity,
+)
+from django.db import connection, models
+from django.db.models import Exists, F, Func, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+# Text search configuration of the hardware search vector and queries
+SEARCH_CONFIG = "english"
+
+
+@models.CharField.register_lookup
+class TrigramWordSimilar(PostgresOperatorLookup):
+    """
+    Whether the value contains a word similar to the searched text,
+    word_similarity(search, value) above pg_trgm.word_similarity_threshold. Unlike
+    trigram_similar, a short search still matches a long value, e.g. a misspelled
+    "arduno" matches "Arduino Uno Rev3". Uses the trigram indexes.
+    """
+
+    lookup_name = "trigram_word_similar"
+    postgres_operator = "%%>"
+
+
+class TrigramWordSimilarity(Func):
+    function = "word_similarity"
+    output_field = models.FloatField()
+
+    def __init__(self, expression, search, **extra):
+        super().__init__(Value(search), expression, **extra)
+
+
+def search_enabled():
+    """
+    Full text and trigram search need postgres. On other databases, e.g. sqlite in
+    CI, the hardware search falls back to a case-insensitive match on the name.
+    """
+    return connection.vendor == "postgresql"
+
+
+def build_search_vector():
+    """
+    The search vector of the outer hardware, for HardwareQuerySet.update_search_vector.
+    Matches in the name rank higher than in the model number and manufacturer, then
+    the category names, then the notes.
+    """
+    from hardware.models import Category
+
+    category_names = Subquery(
+        Category.objects.filter(hardware=OuterRef("pk"))
+        .order_by()
+        .values("hardware")
+        .annotate(names=StringAgg("name", " "))
+        .values("names")
+    )
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("model_number", "manufacturer", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(category_names, weight="C", config=SEARCH_CONFIG)
+        + SearchVector("notes", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def search_hardware(queryset, search):
+    """
+    Filter a hardware queryset on a search, and order it by relevance.
+
+    A hardware matches if its search vector matches the search, in websearch syntax
+    ("quoted phrases", or, -excluded), or if its name, model number, manufacturer or
+    one of its categories contains a word similar to the search, which tolerates
+    typos. Results are ranked on the text search rank plus the best similarity.
+    """
+    from hardware.models import Category
+
+    query = SearchQuery(search, config=SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset.annotate(
+            category_match=Exists(
+                Category.objects.filter(
+                    hardware=OuterRef("pk"), name__trigram_word_similar=search
+                )
+            ),
+            search_rank=SearchRank(F("search_vector"), query)
+            + Greatest(
+                TrigramWordSimilarity("name", search),
+                Coalesce(TrigramSimilarity("model_number", search), 0.0),
+                Coalesce(TrigramWordSimilarity("manufacturer", search), 0.0),
+            ),
+        )
+        .filter(
+            Q(search_vector=query)
+            | Q(name__trigram_word_similar=search)
+            | Q(model_number__trigram_similar=search)
+            | Q(manufacturer__trigram_word_similar=search)
+            | Q(category_match=True)
+        )
+        .order_by("-search_rank", "id")
+    )
@@ -2,16 +2,59 @@ from collections import Counter
 import functools
 from datetime import datetime
 
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 
-from event.models import Profile
-from hardware.models import Hardware, Category, OrderItem, Order, Incident
+from event.models import Profile, Team as TeamEvent
+from hackathon_site.sparse_fields import SparseFieldsSerializerMixin
+from hardware.events import publish_order_status_changes
+from hardware.projection import ProjectionSerializerMixin
+from hardware.models import (
+    Hardware,
+    Category,
+    OrderItem,
+    Order,
+    Incident,
+    OrderTicket,
+    ChangeLogEntry,
+)
+
+
+def resolve_hardware_requests(hardware_requests):
+    """
+    Replace the hardware ids in a list of hardware requests with Hardware objects,
+    fetched in a single query rather than one query per request.
+    """
+    hardware_by_id = Hardware.objects.in_bulk({e["id"] for e in hardware_requests})
+    errors = [
+        {}
+        if e["id"] in hardware_by_id
+        else {"id": [f'Invalid pk "{e["id"]}" - object does not exist.']}
+        for e in hardware_requests
+    ]
+    if any(errors):
+        raise serializers.ValidationError(errors)
+    for e in hardware_requests:
+        e["id"] = hardware_by_id[e["id"]]
+    return hardware_requests
+
+
+class CategoryInHardwareSerializer(
+    ProjectionSerializerMixin, serializers.ModelSerializer
+):
+    class Meta:
+        model = Category
+        fields = ("id", "name", "max_per_team")
 
 
-class HardwareSerializer(serializers.ModelSerializer):
+class HardwareSerializer(
+    SparseFieldsSerializerMixin, ProjectionSerializerMixin, serializers.ModelSerializer
+):
     quantity_remaining = serializers.IntegerField()
 
     class Meta:
@@ -30,6 +73,20 @@ class HardwareSerializer(serializers.ModelSerializer):
             "categories",
             "quantity_remaining",
         )
+        expandable_fields = {
+            "categories": (
+                CategoryInHardwareSerializer,
+                {"many": True, "read_only": True},
+            )
+        }
+
+
+class HardwareListQuerySerializer(serializers.Serializer):
+    facets = serializers.BooleanField(
+        default=False,
+        required=False,
+        help_text="Add the hardware counts per category and stock state",
+    )
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -47,7 +104,7 @@ class CategorySerializer(serializers.ModelSerializer):
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = ("id", "hardware", "order", "part_returned_health")
+        fields = ("id", "hardware", "order", "part_returned_health", "quantity")
 
 
 class IncidentCreateSerializer(serializers.ModelSerializer):
@@ -72,9 +129,17 @@ class IncidentCreateSerializer(serializers.ModelSerializer):
         return obj.order_item.order.team.id if obj.order_item.order.team else None
 
 
-class IncidentSerializer(IncidentCreateSerializer):
+class IncidentSerializer(SparseFieldsSerializerMixin, IncidentCreateSerializer):
     order_item = OrderItemSerializer()
 
+    class Meta(IncidentCreateSerializer.Meta):
+        field_lookups = {
+            "order_item": [
+                f"order_item__{name}" for name in OrderItemSerializer.Meta.fields
+            ],
+            "team_id": ["order_item__order__team__id"],
+        }
+
 
 class IncidentPatchSerializer(serializers.ModelSerializer):
     team_id = serializers.SerializerMethodField()
@@ -98,17 +163,22 @@ class IncidentPatchSerializer(serializers.ModelSerializer):
         return obj.order_item.order.team.id if obj.order_item.order.team else None
 
 
-class OrderItemInOrderSerializer(serializers.ModelSerializer):
+class OrderItemInOrderSerializer(
+    ProjectionSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = OrderItem
         fields = (
             "id",
             "hardware_id",
             "part_returned_health",
+            "quantity",
         )
 
 
-class OrderItemListSerializer(serializers.ModelSerializer):
+class OrderItemListSerializer(
+    SparseFieldsSerializerMixin, ProjectionSerializerMixin, serializers.ModelSerializer
+):
     team_code = serializers.SerializerMethodField()
     order_id = serializers.SerializerMethodField()
 
@@ -124,8 +194,13 @@ class OrderItemListSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
             "part_returned_health",
+            "quantity",
             "hardware",
         )
+        field_lookups = {
+            "order_id": ["order__id"],
+            "team_code": ["order__team__team_code"],
+        }
 
     @staticmethod
     def get_team_code(obj: OrderItem):
@@ -136,7 +211,9 @@ class OrderItemListSerializer(serializers.ModelSerializer):
         return obj.order.id
 
 
-class OrderListSerializer(serializers.ModelSerializer):
+class OrderListSerializer(
+    SparseFieldsSerializerMixin, ProjectionSerializerMixin, serializers.ModelSerializer
+):
     items = OrderItemInOrderSerializer(many=True, read_only=True)
     team_code = serializers.SerializerMethodField()
 
@@ -152,6 +229,7 @@ class OrderListSerializer(serializers.ModelSerializer):
             "updated_at",
             "request",
         )
+        field_lookups = {"team_code": ["team__team_code"]}
 
     @staticmethod
     def get_team_code(obj: Order):
@@ -177,19 +255,80 @@ class OrderChangeSerializer(OrderListSerializer):
             "updated_at",
         )
 
+    @classmethod
+    def get_status_change_error(cls, current_status, new_status):
+        if current_status not in cls.change_options:
+            return "Cannot change the status for this order."
+        if new_status not in cls.change_options[current_status]:
+            return f"Cannot change the status of an order from {current_status} to {new_status}."
+        return None
+
     def validate_status(self, data):
-        current_status = self.instance.status
+        error_message = self.get_status_change_error(self.instance.status, data)
+        if error_message is not None:
+            raise serializers.ValidationError(error_message)
+        return data
 
-        if current_status not in self.change_options:
-            raise serializers.ValidationError(
-                "Cannot change the status for this order."
+    @classmethod
+    def change_statuses(cls, new_statuses):
+        """
+        Change the status of several orders at once, given a dict of order ids to
+        their new status. Every change is validated against change_options, and the
+        valid ones are written with one update per new status.
+
+        Returns a result per order id, with the status of the order afterwards,
+        whether it was changed and the error message if not, and the list of the
+        orders which were changed.
+        """
+        results = []
+        changed_orders = []
+        order_ids_by_status = {}
+
+        with transaction.atomic():
+            orders = (
+                Order.objects.select_for_update(of=("self",))
+                .select_related("team")
+                .in_bulk(new_statuses.keys())
             )
+            for (order_id, new_status) in new_statuses.items():
+                order = orders.get(order_id)
+                if order is None:
+                    error_message = "Order does not exist."
+                else:
+                    error_message = cls.get_status_change_error(
+                        order.status, new_status
+                    )
+                if error_message is None:
+                    order.status = new_status
+                    order_ids_by_status.setdefault(new_status, []).append(order_id)
+                    changed_orders.append(order)
+                results.append(
+                    {
+                        "id": order_id,
+                        "status": getattr(order, "status", None),
+                        "success": error_message is None,
+                        "message": error_message,
+                    }
+                )
 
-        if data not in self.change_options[current_status]:
-            raise serializers.ValidationError(
-                f"Cannot change the status of an order from {current_status} to {data}."
-            )
-        return data
+            updated_at = timezone.now()
+            for (new_status, order_ids) in order_ids_by_status.items():
+                Order.objects.filter(id__in=order_ids).update(
+                    status=new_status, updated_at=updated_at
+                )
+            if changed_orders:
+                # Bulk updates do not send the signals which keep the stock in sync
+                # and announce the new statuses, see hardware.signals
+                Hardware.objects.filter(
+                    order_items__order__in=changed_orders
+                ).update_stock()
+                publish_order_status_changes(
+                    Order.objects.filter(id__in=[order.id for order in changed_orders])
+                )
+                ChangeLogEntry.objects.record(
+                    "order", [order.id for order in changed_orders]
+                )
+        return (results, changed_orders)
 
 
 class TeamOrderChangeSerializer(OrderChangeSerializer):
@@ -198,11 +337,96 @@ class TeamOrderChangeSerializer(OrderChangeSerializer):
     }
 
 
-class OrderCreateSerializer(serializers.Serializer):
+class OrderBulkStatusChangeSerializer(serializers.Serializer):
+    class OrderStatusChangeSerializer(serializers.Serializer):
+        id = serializers.IntegerField(required=True)
+        status = serializers.ChoiceField(choices=Order.STATUS_CHOICES, required=True)
+
+    orders = OrderStatusChangeSerializer(many=True, required=True)
+
+    def validate_orders(self, orders):
+        if len(orders) < 1:
+            raise serializers.ValidationError("No orders specified")
+        order_ids = [order["id"] for order in orders]
+        if len(set(order_ids)) != len(order_ids):
+            raise serializers.ValidationError(
+                "Each order can only appear once in a status change request"
+            )
+        return orders
+
+
+class OrderBulkStatusChangeResponseSerializer(serializers.Serializer):
+    class OrderStatusChangeResultSerializer(serializers.Serializer):
+        id = serializers.IntegerField(required=True)
+        status = serializers.CharField(allow_null=True, required=True)
+        success = serializers.BooleanField(required=True)
+        message = serializers.CharField(allow_null=True, required=True)
+
+    orders = OrderStatusChangeResultSerializer(many=True, required=True)
+
+
+class PickListQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(
+        choices=Order.STATUS_CHOICES, default="Submitted", required=False
+    )
+
+
+class PickListSerializer(serializers.Serializer):
+    class PickListHardwareSerializer(serializers.Serializer):
+        class PickListTeamSerializer(serializers.Serializer):
+            team_id = serializers.IntegerField(allow_null=True)
+            team_code = serializers.CharField(allow_null=True)
+            quantity = serializers.IntegerField()
+            orders = serializers.IntegerField()
+
+        hardware_id = serializers.IntegerField()
+        name = serializers.CharField()
+        model_number = serializers.CharField()
+        manufacturer = serializers.CharField()
+        quantity_remaining = serializers.IntegerField()
+        total_quantity = serializers.IntegerField()
+        teams = PickListTeamSerializer(many=True)
+
+    status = serializers.CharField()
+    hardware = PickListHardwareSerializer(many=True)
+
+
+class ChangeListQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, required=False)
+    models = serializers.CharField(required=False)
+
+    def validate_models(self, models):
+        models = [model.strip() for model in models.split(",") if model.strip()]
+        valid_models = [model for (model, _) in ChangeLogEntry.MODELS]
+        invalid_models = [model for model in models if model not in valid_models]
+        if invalid_models:
+            raise serializers.ValidationError(
+                f"Unknown models {', '.join(invalid_models)}, valid models are "
+                f"{', '.join(valid_models)}"
+            )
+        return models
+
+
+class ChangeListSerializer(serializers.Serializer):
+    class ModelChangesSerializer(serializers.Serializer):
+        changed = serializers.ListField(child=serializers.DictField())
+        deleted = serializers.ListField(child=serializers.IntegerField())
+
+    cursor = serializers.IntegerField()
+    has_more = serializers.BooleanField()
+    changes = serializers.DictField(child=ModelChangesSerializer())
+
+
+class OrderRequestSerializer(serializers.Serializer):
+    """
+    A cart of requested hardware, with the checks shared by placing an order and
+    checking one.
+    """
+
     class OrderCreateHardwareSerializer(serializers.Serializer):
-        id = serializers.PrimaryKeyRelatedField(
-            queryset=Hardware.objects.all(), many=False, required=True
-        )
+        # Resolved to a Hardware object for the whole cart at once, in
+        # OrderRequestSerializer.validate_hardware
+        id = serializers.IntegerField(required=True)
         quantity = serializers.IntegerField(required=True)
 
     hardware = OrderCreateHardwareSerializer(many=True, required=True)
@@ -219,8 +443,14 @@ class OrderCreateSerializer(serializers.Serializer):
             Counter(),
         )
 
-    # check that the requests are within per-team constraints
-    def validate(self, data):
+    def validate_hardware(self, hardware_requests):
+        return resolve_hardware_requests(hardware_requests)
+
+    def check_feasibility(self, data):
+        """
+        Check the time, profile and team size restrictions, raising a validation
+        error if they are not met, and return the feasibility report of the request.
+        """
         if (
             not self.context["request"]
             .user.groups.filter(name=settings.TEST_USER_GROUP)
@@ -240,71 +470,250 @@ class OrderCreateSerializer(serializers.Serializer):
         except ObjectDoesNotExist:
             raise serializers.ValidationError("User does not have profile")
 
+        # requested_hardware is a Counter where the keys are <Hardware Object>'s
+        # and values are <Int>'s
+        requested_hardware = self.merge_requests(hardware_requests=data["hardware"])
+        report = self.get_feasibility_report(requested_hardware, user_profile.team)
+
         # team size restrictions
-        team_size = Profile.objects.filter(team__exact=user_profile.team).count()
-        if team_size < settings.MIN_MEMBERS or team_size > settings.MAX_MEMBERS:
+        if (
+            report["team_size"] < settings.MIN_MEMBERS
+            or report["team_size"] > settings.MAX_MEMBERS
+        ):
             raise serializers.ValidationError(
                 "User's team does not meet team size criteria"
             )
-        # requested_hardware is a Counter where the keys are <Hardware Object>'s
-        # and values are <Int>'s
-        requested_hardware = self.merge_requests(hardware_requests=data["hardware"])
-        if not requested_hardware:
-            raise serializers.ValidationError("No hardware submitted")
-        hardware_query = (
-            Hardware.objects.filter(
-                id__in=[hardware.id for hardware in requested_hardware.keys()],
+        return report
+
+    @staticmethod
+    def get_feasibility_report(requested_hardware, team, check_stock=True):
+        """
+        Evaluate the requested hardware against the stock, the per-team hardware and
+        category limits and the team size, given the team's unreturned orders.
+
+        Everything is fetched up front in a fixed number of queries, whatever the
+        number of requested hardware. Returns a dict with the team size, one entry
+        per requested hardware and one entry per category of the requested hardware,
+        each with the quantities involved and the name of the violated rule (or None).
+
+        Each hardware entry also has the quantity which could be fulfilled, given the
+        stock and the limits left by the hardware before it in the request, and the
+        rule which limits it below the requested quantity (or None).
+        """
+        hardware_ids = [hardware.id for hardware in requested_hardware.keys()]
+        hardware_categories = {}
+        for hardware_category in Hardware.categories.through.objects.filter(
+            hardware_id__in=hardware_ids
+        ).select_related("category"):
+            hardware_categories.setdefault(hardware_category.hardware_id, []).append(
+                hardware_category.category
             )
-            .all()
-            .prefetch_related("categories", "order_items")
-        )
-        team_unreturned_orders = hardware_query.annotate(
-            past_order_count=Count(
-                "order_items",
-                filter=Q(order_items__part_returned_health__isnull=True)
-                & ~Q(order_items__order__status="Cancelled")
-                & Q(order_items__order__team=user_profile.team),
-                distinct=True,
+        categories = {
+            category.id: category
+            for category_list in hardware_categories.values()
+            for category in category_list
+        }
+
+        team_order_items = (
+            OrderItem.objects.filter(
+                order__team=team, part_returned_health__isnull=True
             )
+            .exclude(order__status="Cancelled")
+            .order_by()
         )
-        category_counts = dict()
-        error_messages = []
+        team_hardware_quantities = dict(
+            team_order_items.filter(hardware_id__in=hardware_ids)
+            .values("hardware_id")
+            .annotate(team_quantity=Sum("quantity"))
+            .values_list("hardware_id", "team_quantity")
+        )
+        team_category_quantities = dict(
+            team_order_items.filter(hardware__categories__in=categories.keys())
+            .values("hardware__categories")
+            .annotate(team_quantity=Sum("quantity"))
+            .values_list("hardware__categories", "team_quantity")
+        )
+
+        report = {
+            "team_size": Profile.objects.filter(team=team).count(),
+            "hardware": [],
+            "categories": [],
+        }
+        category_reports = {}
         for (hardware, requested_quantity) in requested_hardware.items():
-            team_hardware = team_unreturned_orders.get(id=hardware.id)
-            team_hardware_count = getattr(team_hardware, "past_order_count", 0)
-            if hardware.quantity_remaining - requested_quantity < 0:
+            team_quantity = team_hardware_quantities.get(hardware.id, 0)
+            violation = None
+            if check_stock and hardware.quantity_remaining < requested_quantity:
+                violation = "stock"
+            elif (
+                hardware.max_per_team is not None
+                and team_quantity + requested_quantity > hardware.max_per_team
+            ):
+                violation = "hardware_limit"
+            report["hardware"].append(
+                {
+                    "hardware": hardware,
+                    "requested_quantity": requested_quantity,
+                    "quantity_remaining": hardware.quantity_remaining,
+                    "team_quantity": team_quantity,
+                    "max_per_team": hardware.max_per_team,
+                    "violation": violation,
+                }
+            )
+            for category in hardware_categories.get(hardware.id, []):
+                if category.id not in category_reports:
+                    category_reports[category.id] = {
+                        "category": category,
+                        "requested_quantity": 0,
+                        "team_quantity": team_category_quantities.get(category.id, 0),
+                        "max_per_team": category.max_per_team,
+                        "violation": None,
+                    }
+                    report["categories"].append(category_reports[category.id])
+                category_reports[category.id][
+                    "requested_quantity"
+                ] += requested_quantity
+
+        for category_report in report["categories"]:
+            if (
+                category_report["max_per_team"] is not None
+                and category_report["team_quantity"]
+                + category_report["requested_quantity"]
+                > category_report["max_per_team"]
+            ):
+                category_report["violation"] = "category_limit"
+
+        category_quantities_left = {
+            category_report["category"].id: max(
+                category_report["max_per_team"] - category_report["team_quantity"], 0
+            )
+            for category_report in report["categories"]
+            if category_report["max_per_team"] is not None
+        }
+        for hardware_report in report["hardware"]:
+            hardware = hardware_report["hardware"]
+            limits = [(max(hardware_report["quantity_remaining"], 0), "stock", None)]
+            if hardware_report["max_per_team"] is not None:
+                limits.append(
+                    (
+                        max(
+                            hardware_report["max_per_team"]
+                            - hardware_report["team_quantity"],
+                            0,
+                        ),
+                        "hardware_limit",
+                        None,
+                    )
+                )
+            for category in hardware_categories.get(hardware.id, []):
+                if category.id in category_quantities_left:
+                    limits.append(
+                        (
+                            category_quantities_left[category.id],
+                            "category_limit",
+                            category,
+                        )
+                    )
+            (limit, limiting_rule, limiting_category) = min(
+                limits, key=lambda limit: limit[0]
+            )
+            if limit >= hardware_report["requested_quantity"]:
+                (limit, limiting_rule, limiting_category) = (
+                    hardware_report["requested_quantity"],
+                    None,
+                    None,
+                )
+            hardware_report["fulfillable_quantity"] = limit
+            hardware_report["limiting_rule"] = limiting_rule
+            hardware_report["limiting_category"] = limiting_category
+            for category in hardware_categories.get(hardware.id, []):
+                if category.id in category_quantities_left:
+                    category_quantities_left[category.id] -= limit
+        return report
+
+    @staticmethod
+    def get_limit_errors(report):
+        """
+        Returns the error messages for the violations in a feasibility report, empty
+        if the request is within all the limits.
+        """
+        error_messages = []
+        for hardware_report in report["hardware"]:
+            hardware = hardware_report["hardware"]
+            if hardware_report["violation"] == "stock":
                 error_messages.append(
                     f"Unable to order Hardware {hardware.name} because there are not enough items in stock"
                 )
-            elif (team_hardware_count + requested_quantity) > hardware.max_per_team:
+            elif hardware_report["violation"] == "hardware_limit":
                 error_messages.append(
                     "Maximum number of items for Hardware {} is reached (limit of {} per team)".format(
                         hardware.name, hardware.max_per_team
                     )
                 )
-            for category in hardware.categories.all():
-                category_counts[category] = (
-                    category_counts.get(category, 0)
-                    + team_hardware_count
-                    + requested_quantity
-                )
-        for (category, count) in category_counts.items():
-            if count > category.max_per_team:
+        for category_report in report["categories"]:
+            category = category_report["category"]
+            if category_report["violation"] == "category_limit":
                 error_messages.append(
                     "Maximum number of items for the Category {} is reached (limit of {} items per team)".format(
                         category.name, category.max_per_team
                     )
                 )
+        return error_messages
+
+
+class OrderCreateSerializer(OrderRequestSerializer):
+    # check that the requests are within per-team constraints
+    def validate(self, data):
+        report = self.check_feasibility(data)
+        if not report["hardware"]:
+            raise serializers.ValidationError("No hardware submitted")
+        error_messages = self.get_limit_errors(report)
         if error_messages:
             raise serializers.ValidationError(error_messages)
         return data
 
+    @staticmethod
+    def lock_hardware(team, requested_hardware):
+        """
+        Lock the team and the requested hardware rows until the end of the current
+        transaction, and return the requested hardware re-read under the lock.
+
+        Rows are always locked team first, then hardware by ascending id, so that
+        concurrent orders wait on each other instead of deadlocking. Orders from the
+        same team are serialized by the team lock, which keeps the per-team and
+        per-category limits exact; orders for the same hardware are serialized by
+        the hardware lock, which keeps the stock exact.
+        """
+        TeamEvent.objects.select_for_update().get(pk=team.pk)
+        locked_hardware = {
+            hardware.id: hardware
+            for hardware in Hardware.objects.select_for_update()
+            .filter(id__in=[hardware.id for hardware in requested_hardware.keys()])
+            .order_by("id")
+        }
+        return Counter(
+            {
+                locked_hardware[hardware.id]: requested_quantity
+                for (hardware, requested_quantity) in requested_hardware.items()
+            }
+        )
+
     def create(self, validated_data):
-        # validated data should already satisfy all constraints
-        requested_hardware = self.merge_requests(
-            hardware_requests=validated_data["hardware"]
+        return self.allocate(
+            self.context["request"].user.profile.team,
+            self.merge_requests(hardware_requests=validated_data["hardware"]),
         )
 
+    @classmethod
+    def allocate(cls, team, requested_hardware):
+        """
+        Place an order for the team with as much of the requested hardware as is in
+        stock, and return the order id with the fulfilled quantity and the errors
+        per hardware. Raises a ValidationError if the request is no longer within
+        the per-team limits.
+        """
+        # validated data satisfied all constraints when it was validated, but another
+        # order may have been placed since, so the limits are checked again under lock
         new_order = None
         response_data = {"order_id": None, "hardware": [], "errors": []}
 
@@ -315,48 +724,140 @@ class OrderCreateSerializer(serializers.Serializer):
                 {"id": hardware.id, "requested_quantity": requested_quantity}
             )
 
-        order_items = []
-        for (hardware, requested_quantity) in requested_hardware.items():
-            num_order_items = min(hardware.quantity_remaining, requested_quantity)
-            if num_order_items <= 0:
-                response_data["hardware"].append(
-                    {"hardware_id": hardware.id, "quantity_fulfilled": 0}
-                )
-                response_data["errors"].append(
-                    {
-                        "hardware_id": hardware.id,
-                        "message": "There are no {}s available".format(hardware.name),
-                    }
+        with transaction.atomic():
+            requested_hardware = cls.lock_hardware(team, requested_hardware)
+            error_messages = cls.get_limit_errors(
+                cls.get_feasibility_report(requested_hardware, team, check_stock=False)
+            )
+            if error_messages:
+                raise serializers.ValidationError(error_messages)
+
+            order_items = []
+            for (hardware, requested_quantity) in requested_hardware.items():
+                num_order_items = min(hardware.quantity_remaining, requested_quantity)
+                if num_order_items <= 0:
+                    response_data["hardware"].append(
+                        {"hardware_id": hardware.id, "quantity_fulfilled": 0}
+                    )
+                    response_data["errors"].append(
+                        {
+                            "hardware_id": hardware.id,
+                            "message": "There are no {}s available".format(
+                                hardware.name
+                            ),
+                        }
+                    )
+                    continue
+                if new_order is None:
+                    new_order = Order.objects.create(
+                        team=team,
+                        status="Submitted",
+                        request=serialized_requested_hardware,
+                    )
+                    response_data["order_id"] = new_order.id
+                order_items.append(
+                    OrderItem(
+                        order=new_order, hardware=hardware, quantity=num_order_items
+                    )
                 )
-                continue
-            if new_order is None:
-                new_order = Order.objects.create(
-                    team=self.context["request"].user.profile.team,
-                    status="Submitted",
-                    request=serialized_requested_hardware,
+                response_data["hardware"].append(
+                    {"hardware_id": hardware.id, "quantity_fulfilled": num_order_items}
                 )
-                response_data["order_id"] = new_order.id
-            order_items += [
-                OrderItem(order=new_order, hardware=hardware)
-                for _ in range(num_order_items)
-            ]
-            response_data["hardware"].append(
-                {"hardware_id": hardware.id, "quantity_fulfilled": num_order_items}
-            )
-            if num_order_items != requested_quantity:
-                response_data["errors"].append(
-                    {
-                        "hardware_id": hardware.id,
-                        "message": "Only {} of {} {}(s) were available".format(
-                            num_order_items, requested_quantity, hardware.name,
-                        ),
-                    }
+                if num_order_items != requested_quantity:
+                    response_data["errors"].append(
+                        {
+                            "hardware_id": hardware.id,
+                            "message": "Only {} of {} {}(s) were available".format(
+                                num_order_items, requested_quantity, hardware.name,
+                            ),
+                        }
+                    )
+            if order_items:
+                OrderItem.objects.bulk_create(order_items)
+                ChangeLogEntry.objects.record(
+                    "order_item",
+                    OrderItem.objects.filter(order=new_order).values_list(
+                        "id", flat=True
+                    ),
                 )
-        if order_items:
-            OrderItem.objects.bulk_create(order_items)
+                Hardware.objects.filter(
+                    id__in=[hardware.id for hardware in requested_hardware.keys()]
+                ).update_stock()
         return response_data
 
 
+class OrderTicketSerializer(serializers.ModelSerializer):
+    queue_position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderTicket
+        fields = (
+            "id",
+            "status",
+            "queue_position",
+            "order",
+            "request",
+            "response",
+            "created_at",
+            "processed_at",
+        )
+
+    def get_queue_position(self, obj):
+        if obj.status != "Queued":
+            return None
+        # Tickets are served round robin between teams rather than by id, so the
+        # position comes from the queue order used by the worker
+        queue_order = OrderTicket.objects.queue_order()
+        if obj.id not in queue_order:
+            # Processed since it was read
+            return None
+        return queue_order.index(obj.id) + 1
+
+
+class OrderCheckSerializer(OrderRequestSerializer):
+    """
+    Dry run of OrderCreateSerializer, which reports per requested hardware how much
+    of it could be ordered and which rule limits it, without creating anything.
+    """
+
+    def validate(self, data):
+        data["report"] = self.check_feasibility(data)
+        return data
+
+    def to_representation(self, instance):
+        report = instance["report"]
+        return {
+            "hardware": [
+                {
+                    "hardware_id": hardware_report["hardware"].id,
+                    "requested_quantity": hardware_report["requested_quantity"],
+                    "fulfillable_quantity": hardware_report["fulfillable_quantity"],
+                    "limiting_rule": hardware_report["limiting_rule"],
+                    "category_id": getattr(
+                        hardware_report["limiting_category"], "id", None
+                    ),
+                }
+                for hardware_report in report["hardware"]
+            ],
+            "errors": self.get_limit_errors(report),
+        }
+
+
+class OrderCheckResponseSerializer(serializers.Serializer):
+    class OrderCheckResponseHardwareSerializer(serializers.Serializer):
+        LIMITING_RULE_CHOICES = ["stock", "hardware_limit", "category_limit"]
+        hardware_id = serializers.IntegerField(required=True)
+        requested_quantity = serializers.IntegerField(required=True)
+        fulfillable_quantity = serializers.IntegerField(required=True)
+        limiting_rule = serializers.ChoiceField(
+            choices=LIMITING_RULE_CHOICES, allow_null=True, required=True
+        )
+        category_id = serializers.IntegerField(allow_null=True, required=True)
+
+    hardware = OrderCheckResponseHardwareSerializer(many=True, required=True)
+    errors = serializers.ListField(child=serializers.CharField(), required=True)
+
+
 class OrderCreateResponseSerializer(serializers.Serializer):
     class OrderCreateResponseQuantitySerializer(serializers.Serializer):
         hardware_id = serializers.PrimaryKeyRelatedField(
@@ -379,20 +880,23 @@ class OrderCreateResponseSerializer(serializers.Serializer):
     errors = OrderCreateResponseErrorSerializer(many=True, required=True)
 
 
-class OrderItemReturnSerializer(serializers.Serializer):
+class OrderReturnSerializer(serializers.Serializer):
     class HardwareItemReturnSerializer(serializers.Serializer):
         HEALTH_CHOICES = ["Healthy", "Heavily Used", "Broken", "Lost"]
-        id = serializers.PrimaryKeyRelatedField(
-            queryset=Hardware.objects.all(), many=False, required=True
-        )
+        # Resolved to a Hardware object for the whole order at once, in
+        # OrderReturnSerializer.validate_hardware
+        id = serializers.IntegerField(required=True)
         quantity = serializers.IntegerField(required=True)
         part_returned_health = serializers.CharField(max_length=64, required=True)
 
     hardware = HardwareItemReturnSerializer(many=True, required=True)
     order = serializers.PrimaryKeyRelatedField(
-        queryset=Order.objects.all(), many=False, required=True
+        queryset=Order.objects.select_related("team"), many=False, required=True
     )
 
+    def validate_hardware(self, hardware_requests):
+        return resolve_hardware_requests(hardware_requests)
+
     def validate(self, data):
         # get array of hardware and order id from data parameter
         hardware_array = data["hardware"]
@@ -400,72 +904,252 @@ class OrderItemReturnSerializer(serializers.Serializer):
             raise ValidationError("No hardware specified in return request")
         return data
 
-    def create(self, validated_data):
-        hardware = validated_data["hardware"]
-        order = validated_data["order"]
-        order_items_in_order = OrderItem.objects.filter(order=order)
-
-        response_data = {
-            "order_id": order.id,
-            "returned_items": [],
-            "team_code": order.team.team_code,
-            "errors": [],
-        }
 
-        for hardware_item in hardware:
-            if (
-                hardware_item["part_returned_health"]
-                not in OrderItemReturnSerializer.HardwareItemReturnSerializer.HEALTH_CHOICES
-            ):
-                response_data["errors"].append(
-                    {
-                        "hardware_id": hardware_item["id"].id,
-                        "message": f"Invalid part health return status for hardware item {hardware_item['id'].name}",
-                    }
+class OrderItemReturnSerializer(OrderReturnSerializer):
+    """
+    Returns hardware for either a single order, given by the order and hardware
+    fields, or for several orders of the same team, given as a list in the orders
+    field.
+    """
+
+    hardware = OrderReturnSerializer.HardwareItemReturnSerializer(
+        many=True, required=False
+    )
+    order = serializers.PrimaryKeyRelatedField(
+        queryset=Order.objects.select_related("team"), many=False, required=False
+    )
+    orders = OrderReturnSerializer(many=True, required=False)
+
+    def validate(self, data):
+        if "orders" in data:
+            if "order" in data or "hardware" in data:
+                raise serializers.ValidationError(
+                    "Specify either a single order or a list of orders to return"
                 )
-                continue
+            if len(data["orders"]) < 1:
+                raise serializers.ValidationError(
+                    "No orders specified in return request"
+                )
+            order_returns = data["orders"]
+        else:
+            missing_fields = {
+                field: ["This field is required."]
+                for field in ("hardware", "order")
+                if field not in data
+            }
+            if missing_fields:
+                raise serializers.ValidationError(missing_fields)
+            order_returns = [super().validate(data)]
+
+        orders = [order_return["order"] for order_return in order_returns]
+        if len({order.id for order in orders}) != len(orders):
+            raise serializers.ValidationError(
+                "Each order can only appear once in a return request"
+            )
+        if len({order.team_id for order in orders}) != 1:
+            raise serializers.ValidationError(
+                "All orders in a return request must belong to the same team"
+            )
+        return data
 
-            order_items_with_hardware = list(
-                order_items_in_order.filter(
-                    hardware=hardware_item["id"], part_returned_health__isnull=True
+    @staticmethod
+    def return_order_items(order_items, returns):
+        """
+        Mark hardware as returned, given all the lines of the orders for the
+        returned hardware and a list of (order, hardware, quantity,
+        part_returned_health) tuples, with quantities no higher than what is checked
+        out.
+
+        The lines are assigned their health in memory, then written with one update
+        per health, one bulk update of the quantities, and at most one delete and one
+        insert. Lines which are returned in full are relabelled, the others are
+        split, and the returned units are merged into the order's line for that
+        hardware and health. Lines with an incident are never merged, so that the
+        incident stays attached to its units.
+        """
+        checked_out_order_items = {}
+        returned_order_items = {}
+        for order_item in order_items:
+            key = (order_item.order_id, order_item.hardware_id)
+            if order_item.part_returned_health is None:
+                checked_out_order_items.setdefault(key, []).append(order_item)
+            elif not hasattr(order_item, "incident"):
+                returned_order_items.setdefault(
+                    key + (order_item.part_returned_health,), order_item
                 )
+
+        relabelled_order_items = {}
+        resized_order_items = {}
+        deleted_order_items = []
+        created_order_items = []
+
+        for (order, hardware, quantity, part_returned_health) in returns:
+            key = (order.id, hardware.id)
+            returned_order_item = returned_order_items.get(
+                key + (part_returned_health,)
             )
-            num_checked_out_order_items = len(order_items_with_hardware)
+            merged_quantity = 0
+
+            for order_item in list(checked_out_order_items.get(key, [])):
+                if quantity <= 0:
+                    break
+                returned_quantity = min(order_item.quantity, quantity)
+                quantity -= returned_quantity
+
+                if returned_quantity < order_item.quantity:
+                    order_item.quantity -= returned_quantity
+                    resized_order_items[order_item.id] = order_item
+                    merged_quantity += returned_quantity
+                    continue
+
+                checked_out_order_items[key].remove(order_item)
+                if hasattr(order_item, "incident") or returned_order_item is None:
+                    order_item.part_returned_health = part_returned_health
+                    relabelled_order_items.setdefault(part_returned_health, []).append(
+                        order_item
+                    )
+                    if not hasattr(order_item, "incident"):
+                        returned_order_item = order_item
+                else:
+                    deleted_order_items.append(order_item)
+                    merged_quantity += returned_quantity
 
-            if num_checked_out_order_items == 0 and hardware_item["quantity"] > 0:
-                response_data["errors"].append(
-                    {
-                        "hardware_id": hardware_item["id"].id,
-                        "message": f"There are no checked out items for hardware item {hardware_item['id'].name} for order #{order}.",
-                    }
+            if merged_quantity == 0:
+                continue
+            if returned_order_item is None:
+                returned_order_item = OrderItem(
+                    order=order,
+                    hardware=hardware,
+                    part_returned_health=part_returned_health,
+                    quantity=merged_quantity,
                 )
+                created_order_items.append(returned_order_item)
+            else:
+                returned_order_item.quantity += merged_quantity
+                if returned_order_item.pk is not None:
+                    resized_order_items[returned_order_item.id] = returned_order_item
+            returned_order_items[key + (part_returned_health,)] = returned_order_item
+
+        for (part_returned_health, order_items) in relabelled_order_items.items():
+            OrderItem.objects.filter(
+                id__in=[order_item.id for order_item in order_items]
+            ).update(part_returned_health=part_returned_health)
+        if resized_order_items:
+            OrderItem.objects.bulk_update(resized_order_items.values(), ["quantity"])
+        if deleted_order_items:
+            OrderItem.objects.filter(
+                id__in=[order_item.id for order_item in deleted_order_items]
+            ).delete()
+        if created_order_items:
+            OrderItem.objects.bulk_create(created_order_items)
+        # Covers the relabelled, resized and created lines, the deleted ones got
+        # their tombstone from the post_delete signal
+        ChangeLogEntry.objects.record(
+            "order_item",
+            OrderItem.objects.filter(
+                order__in={order for (order, _, _, _) in returns},
+                hardware__in={hardware for (_, hardware, _, _) in returns},
+            ).values_list("id", flat=True),
+        )
+        Hardware.objects.filter(
+            id__in={hardware.id for (_, hardware, _, _) in returns}
+        ).update_stock()
 
-            max_available_quantity = hardware_item["quantity"]
-            if num_checked_out_order_items < hardware_item["quantity"]:
-                max_available_quantity = num_checked_out_order_items
-                if num_checked_out_order_items > 0:
+    def create(self, validated_data):
+        order_returns = validated_data.get("orders") or [validated_data]
+        orders = [order_return["order"] for order_return in order_returns]
+
+        # All the lines of the orders for the returned hardware are loaded at once,
+        # including the returned ones into which the returned units are merged
+        checked_out_quantities = Counter()
+        order_items = list(
+            OrderItem.objects.filter(
+                order__in=orders,
+                hardware__in={
+                    hardware_item["id"]
+                    for order_return in order_returns
+                    for hardware_item in order_return["hardware"]
+                },
+            )
+            .select_related("incident")
+            .order_by("id")
+        )
+        for order_item in order_items:
+            if order_item.part_returned_health is None:
+                checked_out_quantities[
+                    (order_item.order_id, order_item.hardware_id)
+                ] += order_item.quantity
+
+        returns = []
+        order_responses = []
+        for order_return in order_returns:
+            order = order_return["order"]
+            response_data = {
+                "order_id": order.id,
+                "returned_items": [],
+                "team_code": order.team.team_code,
+                "errors": [],
+            }
+            order_responses.append(response_data)
+
+            for hardware_item in order_return["hardware"]:
+                if (
+                    hardware_item["part_returned_health"]
+                    not in OrderReturnSerializer.HardwareItemReturnSerializer.HEALTH_CHOICES
+                ):
                     response_data["errors"].append(
                         {
                             "hardware_id": hardware_item["id"].id,
-                            "message": f"Requested quantity of {hardware_item['quantity']} for hardware {hardware_item['id'].name} was higher than available. {max_available_quantity} {'was' if max_available_quantity == 1 else 'were'} returned.",
+                            "message": f"Invalid part health return status for hardware item {hardware_item['id'].name}",
                         }
                     )
+                    continue
 
-            for quantity_idx in range(max_available_quantity):
-                order_items_with_hardware[
-                    quantity_idx
-                ].part_returned_health = hardware_item["part_returned_health"]
-                order_items_with_hardware[quantity_idx].save()
+                key = (order.id, hardware_item["id"].id)
+                num_checked_out_order_items = checked_out_quantities[key]
 
-            if max_available_quantity > 0:
-                response_data["returned_items"].append(
-                    {
-                        "hardware_id": hardware_item["id"].id,
-                        "quantity": max_available_quantity,
-                    }
-                )
+                if num_checked_out_order_items == 0 and hardware_item["quantity"] > 0:
+                    response_data["errors"].append(
+                        {
+                            "hardware_id": hardware_item["id"].id,
+                            "message": f"There are no checked out items for hardware item {hardware_item['id'].name} for order #{order}.",
+                        }
+                    )
 
-        return response_data
+                max_available_quantity = hardware_item["quantity"]
+                if num_checked_out_order_items < hardware_item["quantity"]:
+                    max_available_quantity = num_checked_out_order_items
+                    if num_checked_out_order_items > 0:
+                        response_data["errors"].append(
+                            {
+                                "hardware_id": hardware_item["id"].id,
+                                "message": f"Requested quantity of {hardware_item['quantity']} for hardware {hardware_item['id'].name} was higher than available. {max_available_quantity} {'was' if max_available_quantity == 1 else 'were'} returned.",
+                            }
+                        )
+
+                if max_available_quantity > 0:
+                    checked_out_quantities[key] -= max_available_quantity
+                    returns.append(
+                        (
+                            order,
+                            hardware_item["id"],
+                            max_available_quantity,
+                            hardware_item["part_returned_health"],
+                        )
+                    )
+                    response_data["returned_items"].append(
+                        {
+                            "hardware_id": hardware_item["id"].id,
+                            "quantity": max_available_quantity,
+                        }
+                    )
+
+        if returns:
+            self.return_order_items(order_items, returns)
+
+        if "orders" not in validated_data:
+            return order_responses[0]
+        return {"team_code": orders[0].team.team_code, "orders": order_responses}
 
 
 class OrderItemReturnResponseSerializer(serializers.Serializer):
@@ -489,3 +1173,8 @@ class OrderItemReturnResponseSerializer(serializers.Serializer):
     team_code = serializers.CharField(required=True)
     returned_items = OrderReturnResponseReturnItemSerializer(many=True, required=True)
     errors = OrderReturnResponseErrorSerializer(many=True, required=True)
+
+
+class OrderItemBulkReturnResponseSerializer(serializers.Serializer):
+    team_code = serializers.CharField(required=True)
+    orders = OrderItemReturnResponseSerializer(many=True, required=True)
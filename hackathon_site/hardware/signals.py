@@ -0,0 +1,175 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from hardware.catalog_cache import invalidate_catalog
+from hardware.events import publish_order_status_changes
+from hardware.models import (
+    Category,
+    ChangeLogEntry,
+    Hardware,
+    Incident,
+    Order,
+    OrderItem,
+)
+
+
+@receiver(post_save, sender=OrderItem, dispatch_uid="order_item_save_stock_signal")
+@receiver(post_delete, sender=OrderItem, dispatch_uid="order_item_delete_stock_signal")
+def update_order_item_stock(sender, instance, **kwargs):
+    """
+    Keep the stored stock counters of the hardware in sync when a single order item
+    is created, returned, edited or deleted. Bulk writes do not send these signals,
+    and must call HardwareQuerySet.update_stock themselves.
+    """
+    Hardware.objects.filter(pk=instance.hardware_id).update_stock()
+
+
+@receiver(post_save, sender=Order, dispatch_uid="order_save_stock_signal")
+def update_order_stock(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Cancelling an order releases its items back into stock, so the counters of all
+    the hardware in the order need to be updated when its status changes.
+    """
+    if created or (update_fields is not None and "status" not in update_fields):
+        return
+
+    Hardware.objects.filter(order_items__order=instance).update_stock()
+
+
+@receiver(post_save, sender=Order, dispatch_uid="order_save_event_signal")
+def publish_order_status(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Announce new orders and status changes on the event stream.
+    """
+    if created or update_fields is None or "status" in update_fields:
+        publish_order_status_changes(Order.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Hardware, dispatch_uid="hardware_raw_save_stock_signal")
+def update_raw_hardware_stock(sender, instance, raw, **kwargs):
+    """
+    Fixtures are saved raw, which bypasses Hardware.save, so the stock counters of
+    loaded hardware have to be computed here.
+    """
+    if raw:
+        Hardware.objects.filter(pk=instance.pk).update_stock()
+
+
+@receiver(post_save, sender=Hardware, dispatch_uid="hardware_save_catalog_signal")
+@receiver(post_delete, sender=Hardware, dispatch_uid="hardware_delete_catalog_signal")
+@receiver(post_save, sender=Order, dispatch_uid="order_save_catalog_signal")
+@receiver(post_delete, sender=Order, dispatch_uid="order_delete_catalog_signal")
+@receiver(post_save, sender=Category, dispatch_uid="category_save_catalog_signal")
+@receiver(post_delete, sender=Category, dispatch_uid="category_delete_catalog_signal")
+@receiver(
+    m2m_changed,
+    sender=Hardware.categories.through,
+    dispatch_uid="hardware_categories_catalog_signal",
+)
+def invalidate_catalog_cache(sender, **kwargs):
+    """
+    Invalidate the cached hardware and category lists, and the ETags of the hardware
+    and order endpoints, when the hardware, categories or orders are edited, e.g. in
+    the admin. Changes to the stock and order items invalidate them through
+    HardwareQuerySet.update_stock.
+    """
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Hardware, dispatch_uid="hardware_save_search_signal")
+def update_hardware_search_vector(sender, instance, **kwargs):
+    Hardware.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Category, dispatch_uid="category_save_search_signal")
+def update_category_search_vector(sender, instance, created, **kwargs):
+    """
+    Category names are part of the search vector of their hardware.
+    """
+    if not created:
+        Hardware.objects.filter(categories=instance).update_search_vector()
+
+
+@receiver(pre_delete, sender=Category, dispatch_uid="category_pre_delete_search_signal")
+def collect_category_hardware(sender, instance, **kwargs):
+    # The links to the hardware are gone by the time post_delete is sent
+    instance.search_hardware_ids = list(
+        instance.hardware_set.values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Category, dispatch_uid="category_delete_search_signal")
+def update_deleted_category_search_vector(sender, instance, **kwargs):
+    Hardware.objects.filter(
+        id__in=getattr(instance, "search_hardware_ids", [])
+    ).update_search_vector()
+
+
+@receiver(
+    m2m_changed,
+    sender=Hardware.categories.through,
+    dispatch_uid="hardware_categories_search_signal",
+)
+def update_categories_search_vector(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Update the search vectors when categories are added to or removed from
+    hardware, from either side of the relation.
+    """
+    if action == "pre_clear" and reverse:
+        instance.search_hardware_ids = list(
+            instance.hardware_set.values_list("id", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        hardware = Hardware.objects.filter(pk=instance.pk)
+    elif action == "post_clear":
+        hardware = Hardware.objects.filter(
+            id__in=getattr(instance, "search_hardware_ids", [])
+        )
+    else:
+        hardware = Hardware.objects.filter(id__in=pk_set)
+    hardware.update_search_vector()
+
+
+CHANGE_LOG_MODELS = {
+    Hardware: "hardware",
+    Order: "order",
+    OrderItem: "order_item",
+    Incident: "incident",
+}
+
+
+@receiver(post_save, sender=Hardware, dispatch_uid="hardware_save_change_log_signal")
+@receiver(post_save, sender=Order, dispatch_uid="order_save_change_log_signal")
+@receiver(post_save, sender=OrderItem, dispatch_uid="order_item_save_change_log_signal")
+@receiver(post_save, sender=Incident, dispatch_uid="incident_save_change_log_signal")
+def record_saved_change(sender, instance, **kwargs):
+    """
+    Record single saves in the change log. Bulk writes do not send these signals,
+    and must call ChangeLogEntry.objects.record themselves.
+    """
+    ChangeLogEntry.objects.record(CHANGE_LOG_MODELS[sender], [instance.pk])
+
+
+@receiver(
+    post_delete, sender=Hardware, dispatch_uid="hardware_delete_change_log_signal"
+)
+@receiver(post_delete, sender=Order, dispatch_uid="order_delete_change_log_signal")
+@receiver(
+    post_delete, sender=OrderItem, dispatch_uid="order_item_delete_change_log_signal"
+)
+@receiver(
+    post_delete, sender=Incident, dispatch_uid="incident_delete_change_log_signal"
+)
+def record_deleted_change(sender, instance, **kwargs):
+    """
+    Record a tombstone in the change log for deleted objects, including the ones
+    deleted by QuerySet.delete and by cascades, which send this signal for each
+    object.
+    """
+    ChangeLogEntry.objects.record(
+        CHANGE_LOG_MODELS[sender], [instance.pk], deleted=True
+    )
@@ -1,22 +1,55 @@
+import hashlib
+import json
+import threading
+from collections import Counter
 from datetime import datetime
+from io import StringIO
+from unittest.mock import patch
 
 from dateutil.relativedelta import relativedelta
 from django.contrib.auth.models import Permission, Group
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import override_settings
 from django.urls import reverse
 from django.conf import settings
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status, serializers
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
 
 from event.models import Team, User, Profile
-from hardware.models import Hardware, Category, Order, OrderItem, Incident
+from event.outbox import deliver_pending
+from hardware.catalog_cache import (
+    CATALOG_CACHE_HEADER,
+    build_catalog_cache_key,
+    bump_inventory_version,
+    get_inventory_version,
+)
+from hardware.idempotency import build_idempotency_cache_key
+from hardware.notifications import queue_due_notifications
+from hardware.pick_list import get_pick_list
+from hardware.models import (
+    Hardware,
+    Category,
+    Order,
+    OrderItem,
+    Incident,
+    OrderTicket,
+    ChangeLogEntry,
+)
 from hardware.serializers import (
     HardwareSerializer,
     CategorySerializer,
     OrderListSerializer,
     OrderItemListSerializer,
     IncidentSerializer,
+    OrderCreateSerializer,
+    OrderItemReturnSerializer,
+    OrderChangeSerializer,
 )
 from hackathon_site.tests import SetupUserMixin
 
@@ -232,6 +265,77 @@ class HardwareListViewTestCase(SetupUserMixin, APITestCase):
             else:
                 self.assertEqual(returned_ids, order_asc[::-1], msg="descending")
 
+    def test_no_facets_by_default(self):
+        self._login()
+        response = self.client.get(self.view)
+        self.assertNotIn("facets", response.json())
+
+    def test_facets(self):
+        self._login()
+        # Take hardware1 out of stock
+        OrderItem.objects.create(order=self.order, hardware=self.hardware1, quantity=1)
+
+        # The category and stock filters do not apply to the facets, the search does
+        url = self._build_filter_url(
+            facets="true", category_ids=self.category3.id, in_stock="true"
+        )
+        with self.assertNumQueries(7):
+            # Session, user, page count, page, categories of the one result, then the
+            # two facet queries
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(
+            [hardware["id"] for hardware in data["results"]], [self.hardware3.id]
+        )
+        self.assertEqual(
+            data["facets"],
+            {
+                "categories": [
+                    {
+                        "id": self.category1.id,
+                        "name": "category1",
+                        "count": 2,
+                        "in_stock_count": 1,
+                    },
+                    {
+                        "id": self.category2.id,
+                        "name": "category2",
+                        "count": 1,
+                        "in_stock_count": 1,
+                    },
+                    {
+                        "id": self.category3.id,
+                        "name": "category3",
+                        "count": 1,
+                        "in_stock_count": 1,
+                    },
+                ],
+                "stock": {"in_stock": 2, "out_of_stock": 1},
+            },
+        )
+
+        url = self._build_filter_url(facets="true", search="aHardware")
+        self.assertEqual(
+            self.client.get(url).json()["facets"],
+            {
+                "categories": [
+                    {
+                        "id": self.category1.id,
+                        "name": "category1",
+                        "count": 1,
+                        "in_stock_count": 0,
+                    }
+                ],
+                "stock": {"in_stock": 0, "out_of_stock": 1},
+            },
+        )
+
+    def test_facets_invalid(self):
+        self._login()
+        response = self.client.get(self._build_filter_url(facets="maybe"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class HardwareDetailViewTestCase(SetupUserMixin, APITestCase):
     def setUp(self):
@@ -338,6 +442,249 @@ class CategoryListViewTestCase(SetupUserMixin, APITestCase):
         self.assertEqual(expected_unique_hardware_counts, actual_unique_hardware_counts)
 
 
+@override_settings(HARDWARE_CATALOG_CACHE_ENABLED=True)
+class HardwareCatalogCacheTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.category = Category.objects.create(name="category", max_per_team=4)
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=10, max_per_team=10
+        )
+        self.hardware.categories.add(self.category)
+        self.view = reverse("api:hardware:hardware-list")
+        self.category_view = reverse("api:hardware:category-list")
+
+    def tearDown(self):
+        cache.clear()
+
+    def _hardware_queries(self, queries):
+        return [
+            query
+            for query in queries.captured_queries
+            if '"hardware_hardware"' in query["sql"]
+        ]
+
+    def test_cached_response(self):
+        self._login()
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response[CATALOG_CACHE_HEADER], "MISS")
+
+        with CaptureQueriesContext(connection) as queries:
+            cached_response = self.client.get(self.view)
+        self.assertEqual(cached_response[CATALOG_CACHE_HEADER], "HIT")
+        self.assertEqual(cached_response.json(), response.json())
+        self.assertEqual(self._hardware_queries(queries), [])
+
+    def test_query_parameters_cached_separately(self):
+        self._login()
+        Hardware.objects.create(name="other", quantity_available=1, max_per_team=1)
+        self.assertEqual(self.client.get(self.view).json()["count"], 2)
+
+        response = self.client.get(self.view, {"search": "other", "limit": 10})
+        self.assertEqual(response[CATALOG_CACHE_HEADER], "MISS")
+        self.assertEqual(response.json()["count"], 1)
+        # The order of the parameters does not matter
+        response = self.client.get(f"{self.view}?limit=10&search=other")
+        self.assertEqual(response[CATALOG_CACHE_HEADER], "HIT")
+        self.assertEqual(response.json()["count"], 1)
+
+    def test_invalidated_by_hardware_changes(self):
+        self._login()
+        self.client.get(self.view)
+        self.hardware.name = "renamed"
+        self.hardware.save()
+
+        response = self.client.get(self.view)
+        self.assertEqual(response[CATALOG_CACHE_HEADER], "MISS")
+        self.assertEqual(response.json()["results"][0]["name"], "renamed")
+
+    def test_invalidated_by_stock_changes(self):
+        self._login()
+        self.client.get(self.view)
+        order = Order.objects.create(
+            team=Team.objects.create(),
+            request={"hardware": [{"id": self.hardware.id, "quantity": 3}]},
+        )
+        OrderItem.objects.create(order=order, hardware=self.hardware, quantity=3)
+
+        response = self.client.get(self.view)
+        self.assertEqual(response[CATALOG_CACHE_HEADER], "MISS")
+        self.assertEqual(response.json()["results"][0]["quantity_remaining"], 7)
+
+        # Bulk writes which refresh the stock also invalidate the catalog
+        OrderItem.objects.filter(order=order).update(quantity=1)
+        Hardware.objects.filter(id=self.hardware.id).update_stock()
+        response = self.client.get(self.view)
+        self.assertEqual(response.json()["results"][0]["quantity_remaining"], 9)
+
+    def test_invalidated_after_commit(self):
+        self._login()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Hardware.objects.filter(id=self.hardware.id).update_stock()
+        version = get_inventory_version()
+        self.client.get(self.view)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_inventory_version(), version)
+        self.assertEqual(self.client.get(self.view)[CATALOG_CACHE_HEADER], "MISS")
+
+    def test_category_list_cached(self):
+        self._login()
+        self.assertEqual(
+            self.client.get(self.category_view)[CATALOG_CACHE_HEADER], "MISS"
+        )
+        self.assertEqual(
+            self.client.get(self.category_view)[CATALOG_CACHE_HEADER], "HIT"
+        )
+
+        self.hardware.categories.remove(self.category)
+        response = self.client.get(self.category_view)
+        self.assertEqual(response[CATALOG_CACHE_HEADER], "MISS")
+        self.assertEqual(response.json()["results"][0]["unique_hardware_count"], 0)
+
+        Category.objects.create(name="other", max_per_team=1)
+        response = self.client.get(self.category_view)
+        self.assertEqual(response.json()["count"], 2)
+
+    def test_stale_response_served_while_recomputed(self):
+        self._login()
+        response = self.client.get(self.view)
+        bump_inventory_version()
+        cache_key = build_catalog_cache_key(
+            "HardwareListView", response.renderer_context["request"]
+        )
+        # Another request is recomputing the response
+        cache.add(f"{cache_key}:lock", get_inventory_version())
+
+        with CaptureQueriesContext(connection) as queries:
+            stale_response = self.client.get(self.view)
+        self.assertEqual(stale_response[CATALOG_CACHE_HEADER], "STALE")
+        self.assertEqual(stale_response.json(), response.json())
+        self.assertEqual(self._hardware_queries(queries), [])
+
+    def test_waits_for_response_being_computed(self):
+        self._login()
+        response = self.client.get(self.view)
+        cache_key = build_catalog_cache_key(
+            "HardwareListView", response.renderer_context["request"]
+        )
+        cached = cache.get(cache_key)
+        cache.delete(cache_key)
+        cache.add(f"{cache_key}:lock", cached["version"])
+
+        def finish_computing():
+            cache.set(cache_key, cached)
+            cache.delete(f"{cache_key}:lock")
+
+        timer = threading.Timer(0.2, finish_computing)
+        timer.start()
+        with CaptureQueriesContext(connection) as queries:
+            waiting_response = self.client.get(self.view)
+        timer.join()
+        self.assertEqual(waiting_response[CATALOG_CACHE_HEADER], "HIT")
+        self.assertEqual(waiting_response.json(), response.json())
+        self.assertEqual(self._hardware_queries(queries), [])
+
+
+class ConditionalGetTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=10, max_per_team=10
+        )
+        self.team = Team.objects.create()
+        self.order = Order.objects.create(
+            team=self.team,
+            request={"hardware": [{"id": self.hardware.id, "quantity": 1}]},
+        )
+        self.order_item = OrderItem.objects.create(
+            order=self.order, hardware=self.hardware
+        )
+        self.hardware_list_view = reverse("api:hardware:hardware-list")
+        self.hardware_detail_view = reverse(
+            "api:hardware:hardware-detail", kwargs={"pk": self.hardware.id}
+        )
+        self.order_list_view = reverse("api:hardware:order-list")
+
+    def _assert_not_modified(self, view, if_none_match):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(view, HTTP_IF_NONE_MATCH=if_none_match)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn(response["ETag"], if_none_match)
+        self.assertEqual(response.content, b"")
+        # The serializers are not run, so neither hardware nor orders are queried
+        self.assertFalse(
+            any(
+                '"hardware_hardware"' in query["sql"]
+                or '"hardware_order"' in query["sql"]
+                for query in queries.captured_queries
+            )
+        )
+
+    def test_hardware_list(self):
+        self._login()
+        response = self.client.get(self.hardware_list_view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self.assertIn("no-cache", response["Cache-Control"])
+        self._assert_not_modified(self.hardware_list_view, etag)
+        self._assert_not_modified(self.hardware_list_view, f'"other", W/{etag}')
+
+        # Other query parameters have their own ETag
+        response = self.client.get(
+            self.hardware_list_view, {"search": "hardware"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_hardware_detail(self):
+        self._login()
+        response = self.client.get(self.hardware_detail_view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self._assert_not_modified(self.hardware_detail_view, response["ETag"])
+
+        response = self.client.get(
+            reverse("api:hardware:hardware-detail", kwargs={"pk": 10000})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_modified_after_stock_change(self):
+        self._login()
+        etag = self.client.get(self.hardware_detail_view)["ETag"]
+        self.order_item.part_returned_health = "Healthy"
+        self.order_item.save()
+
+        response = self.client.get(self.hardware_detail_view, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["quantity_remaining"], 10)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_order_list(self):
+        self._login(
+            Permission.objects.filter(
+                content_type__app_label="hardware", codename="view_order"
+            )
+        )
+        response = self.client.get(self.order_list_view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+        self._assert_not_modified(self.order_list_view, etag)
+
+        self.order.status = "Ready for Pickup"
+        self.order.save()
+        response = self.client.get(self.order_list_view, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"][0]["status"], "Ready for Pickup")
+
+    def test_permissions_checked_first(self):
+        self._login()
+        response = self.client.get(self.order_list_view, HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
 class IncidentListViewTestCase(SetupUserMixin, APITestCase):
     def setUp(self):
         super().setUp()
@@ -805,6 +1152,281 @@ class OrderItemListViewGetTestCase(SetupUserMixin, APITestCase):
         )
 
 
+class KeysetPaginationTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.permissions = Permission.objects.filter(
+            content_type__app_label="hardware",
+            codename__in=["view_order", "view_orderitem", "view_incident"],
+        )
+        self.team = Team.objects.create()
+        self.hardware = Hardware.objects.create(
+            name="name",
+            model_number="model",
+            manufacturer="manufacturer",
+            datasheet="/datasheet/location/",
+            quantity_available=10,
+        )
+        self.orders = []
+        for i in range(7):
+            order = Order.objects.create(
+                status="Submitted", team=self.team, request={"hardware": []}
+            )
+            order_item = OrderItem.objects.create(order=order, hardware=self.hardware)
+            Incident.objects.create(
+                state="Broken",
+                time_occurred=datetime.now(settings.TZ_INFO),
+                description="Broken",
+                order_item=order_item,
+            )
+            self.orders.append(order)
+        # Rows created at the same time are ordered by id. The first two orders keep
+        # their creation time, after the tie.
+        tie = datetime.now(settings.TZ_INFO) - relativedelta(hours=1)
+        Order.objects.filter(id__in=[order.id for order in self.orders[2:5]]).update(
+            created_at=tie
+        )
+        Order.objects.filter(id__in=[order.id for order in self.orders[5:]]).update(
+            created_at=tie - relativedelta(hours=1)
+        )
+        self.expected_order_ids = (
+            [order.id for order in self.orders[5:]]
+            + [order.id for order in self.orders[2:5]]
+            + [order.id for order in self.orders[:2]]
+        )
+
+    def _pages(self, view, params):
+        ids = []
+        (url, params) = (reverse(view), {"cursor": "", **params})
+        while url is not None:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertEqual(list(data), ["next", "results"])
+            self.assertLessEqual(len(data["results"]), 3)
+            ids += [result["id"] for result in data["results"]]
+            (url, params) = (data["next"], {})
+        return ids
+
+    def test_orders(self):
+        self._login(self.permissions)
+        self.assertEqual(
+            self._pages("api:hardware:order-list", {"limit": 3}),
+            self.expected_order_ids,
+        )
+        self.assertEqual(
+            self._pages(
+                "api:hardware:order-list", {"limit": 3, "ordering": "-created_at"}
+            ),
+            self.expected_order_ids[::-1],
+        )
+
+    def test_order_items_and_incidents(self):
+        self._login(self.permissions)
+        self.assertEqual(
+            self._pages("api:hardware:order-item-list", {"limit": 3}),
+            list(OrderItem.objects.order_by("id").values_list("id", flat=True)),
+        )
+        self.assertEqual(
+            self._pages("api:hardware:incident-list", {"limit": 3}),
+            list(
+                Incident.objects.order_by("created_at", "id").values_list(
+                    "id", flat=True
+                )
+            ),
+        )
+
+    def test_filters_apply(self):
+        self._login(self.permissions)
+        Order.objects.filter(id=self.orders[0].id).update(status="Cancelled")
+        self.assertEqual(
+            self._pages("api:hardware:order-list", {"limit": 3, "status": "Cancelled"}),
+            [self.orders[0].id],
+        )
+
+    def test_no_count_query(self):
+        self._login(self.permissions)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("api:hardware:order-item-list"), {"cursor": "", "limit": 3}
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_limit_offset_by_default(self):
+        self._login(self.permissions)
+        response = self.client.get(reverse("api:hardware:order-list"), {"limit": 3})
+        self.assertEqual(response.json()["count"], 7)
+
+    def test_invalid_cursor(self):
+        self._login(self.permissions)
+        for cursor in ("abc", "cD0x", "cD1hJnA9Yg=="):
+            response = self.client.get(
+                reverse("api:hardware:order-list"), {"cursor": cursor}
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SparseFieldsTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.permissions = Permission.objects.filter(
+            content_type__app_label="hardware",
+            codename__in=["view_order", "view_orderitem", "view_incident"],
+        )
+        self.team = Team.objects.create()
+        self.category = Category.objects.create(name="Sensors", max_per_team=4)
+        self.orders = []
+        for i in range(3):
+            hardware = Hardware.objects.create(
+                name=f"Hardware {i}",
+                model_number="model",
+                manufacturer="manufacturer",
+                datasheet="/datasheet/location/",
+                quantity_available=10,
+            )
+            hardware.categories.add(self.category)
+            order = Order.objects.create(
+                status="Submitted", team=self.team, request={"hardware": []}
+            )
+            order_item = OrderItem.objects.create(order=order, hardware=hardware)
+            Incident.objects.create(
+                state="Broken",
+                time_occurred=datetime.now(settings.TZ_INFO),
+                description="Broken",
+                order_item=order_item,
+            )
+            self.orders.append(order)
+
+    def _get(self, view, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(view), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return (response.json()["results"], queries.captured_queries)
+
+    def test_hardware_fields(self):
+        self._login()
+        (results, queries) = self._get(
+            "api:hardware:hardware-list", {"fields": "id,name,quantity_remaining"}
+        )
+        self.assertEqual(
+            results,
+            [
+                # One of each is in a submitted order
+                {"id": hardware.id, "name": hardware.name, "quantity_remaining": 9}
+                for hardware in Hardware.objects.order_by("id")
+            ],
+        )
+        # The unused columns are not loaded
+        self.assertFalse(
+            any("notes" in query["sql"] for query in queries), queries,
+        )
+
+    def test_hardware_fields_with_facets(self):
+        self._login()
+        response = self.client.get(
+            reverse("api:hardware:hardware-list"),
+            {"fields": "id", "facets": "true", "search": "Hardware"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["results"][0], {"id": Hardware.objects.first().id})
+        self.assertEqual(data["facets"]["stock"], {"in_stock": 3, "out_of_stock": 0})
+
+    def test_hardware_expand_categories(self):
+        self._login()
+        (results, _) = self._get(
+            "api:hardware:hardware-list",
+            {"fields": "id,categories", "expand": "categories"},
+        )
+        category = {"id": self.category.id, "name": "Sensors", "max_per_team": 4}
+        self.assertEqual([result["categories"] for result in results], [[category]] * 3)
+
+        (results, _) = self._get("api:hardware:hardware-list", {})
+        self.assertEqual(results[0]["categories"], [self.category.id])
+
+    def test_orders(self):
+        self._login(self.permissions)
+        (results, queries) = self._get(
+            "api:hardware:order-list", {"fields": "id,team_code,items"}
+        )
+        self.assertEqual(
+            [list(result) for result in results], [["id", "items", "team_code"]] * 3
+        )
+        self.assertEqual(results[0]["team_code"], self.team.team_code)
+        self.assertEqual(len(results[0]["items"]), 1)
+
+        # The teams and the items of all the orders are loaded at once
+        Order.objects.create(
+            status="Submitted", team=Team.objects.create(), request={"hardware": []}
+        )
+        (_, more_queries) = self._get(
+            "api:hardware:order-list", {"fields": "id,team_code,items"}
+        )
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_order_items(self):
+        self._login(self.permissions)
+        (results, _) = self._get(
+            "api:hardware:order-item-list", {"fields": "id,order_id,team_code"}
+        )
+        self.assertEqual(
+            results,
+            [
+                {
+                    "id": order_item.id,
+                    "order_id": order_item.order_id,
+                    "team_code": self.team.team_code,
+                }
+                for order_item in OrderItem.objects.order_by("id")
+            ],
+        )
+
+    def test_incidents(self):
+        self._login(self.permissions)
+        (results, queries) = self._get(
+            "api:hardware:incident-list", {"fields": "id,state,order_item,team_id"}
+        )
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertEqual(sorted(result), ["id", "order_item", "state", "team_id"])
+            self.assertEqual(result["team_id"], self.team.id)
+            self.assertIn(result["order_item"]["order"], [o.id for o in self.orders])
+        Incident.objects.create(
+            state="Missing",
+            time_occurred=datetime.now(settings.TZ_INFO),
+            description="Missing",
+            order_item=OrderItem.objects.create(
+                order=self.orders[0], hardware=Hardware.objects.first()
+            ),
+        )
+        (_, more_queries) = self._get(
+            "api:hardware:incident-list", {"fields": "id,state,order_item,team_id"}
+        )
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_unknown_fields(self):
+        self._login(self.permissions)
+        response = self.client.get(
+            reverse("api:hardware:hardware-list"),
+            {"fields": "id,price", "expand": "team"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {
+                "fields": ["Unknown fields: price"],
+                "expand": ["Fields which cannot be expanded: team"],
+            },
+        )
+        response = self.client.get(
+            reverse("api:hardware:order-list"), {"expand": "categories"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class IncidentListViewPostTestCase(SetupUserMixin, APITestCase):
     def setUp(self):
         super().setUp()
@@ -1068,6 +1690,10 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
         Profile.objects.create(user=self.user, team=self.team)
         Profile.objects.create(user=self.user2, team=self.team)
 
+    @staticmethod
+    def _quantity(order_items):
+        return order_items.aggregate(quantity=Sum("quantity"))["quantity"]
+
     def create_order(self):
         self.hardware1 = Hardware.objects.create(
             name="aHardware",
@@ -1182,7 +1808,7 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
 
         order = Order.objects.get(pk=1)
         self.assertEqual(order.items.count(), 1, "More than 1 order item created")
-        self.assertCountEqual(order.hardware.all(), [simple_hardware])
+        self.assertCountEqual(order.hardware.distinct(), [simple_hardware])
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
     def test_create_simple_order(self):
@@ -1215,7 +1841,7 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
 
         order = Order.objects.get(pk=1)
         self.assertEqual(order.items.count(), 1, "More than 1 order item created")
-        self.assertCountEqual(order.hardware.all(), [simple_hardware])
+        self.assertCountEqual(order.hardware.distinct(), [simple_hardware])
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
     def test_invalid_input_hardware_limit(self):
@@ -1355,8 +1981,8 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
         self.assertEqual(response.json(), expected_response)
 
         order = Order.objects.get(pk=2)
-        self.assertEqual(order.items.count(), 4)
-        self.assertCountEqual(order.hardware.all(), [hardware])
+        self.assertEqual(self._quantity(order.items.all()), 4)
+        self.assertCountEqual(order.hardware.distinct(), [hardware])
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
     def test_hardware_limit_cancelled_orders(self):
@@ -1397,7 +2023,7 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
 
         order = Order.objects.get(pk=2)
         self.assertEqual(order.items.all().count(), 1)
-        self.assertCountEqual(order.hardware.all(), [hardware])
+        self.assertCountEqual(order.hardware.distinct(), [hardware])
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
     def test_invalid_input_category_limit(self):
@@ -1537,8 +2163,8 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
         self.assertEqual(response.json(), expected_response)
 
         order = Order.objects.get(pk=2)
-        self.assertEqual(order.items.count(), 4)
-        self.assertCountEqual(order.hardware.all(), [hardware])
+        self.assertEqual(self._quantity(order.items.all()), 4)
+        self.assertCountEqual(order.hardware.distinct(), [hardware])
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
     def test_category_limit_cancelled_orders(self):
@@ -1579,7 +2205,7 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
 
         order = Order.objects.get(pk=2)
         self.assertEqual(order.items.count(), 1)
-        self.assertCountEqual(order.hardware.all(), [hardware])
+        self.assertCountEqual(order.hardware.distinct(), [hardware])
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
     def test_invalid_inputs_multiple_hardware(self):
@@ -1696,12 +2322,14 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
         self.assertEqual(response_json.get("errors"), [])
 
         order = Order.objects.get(pk=order_id)
-        self.assertCountEqual(order.hardware.all(), [hardware_1, hardware_2])
+        self.assertCountEqual(order.hardware.distinct(), [hardware_1, hardware_2])
         self.assertEqual(
-            order.items.filter(hardware=hardware_1).count(), num_hardware_1_requested
+            self._quantity(order.items.filter(hardware=hardware_1)),
+            num_hardware_1_requested,
         )
         self.assertEqual(
-            order.items.filter(hardware=hardware_2).count(), num_hardware_2_requested
+            self._quantity(order.items.filter(hardware=hardware_2)),
+            num_hardware_2_requested,
         )
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
@@ -1747,8 +2375,9 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
         self.assertEqual(response.json(), expected_response)
 
         order = Order.objects.get(pk=1)
-        self.assertEqual(order.items.all().count(), num_hardware_requested)
-        self.assertCountEqual(order.hardware.all(), [hardware])
+        self.assertEqual(self._quantity(order.items.all()), num_hardware_requested)
+        self.assertEqual(order.items.count(), 1, "More than 1 order line created")
+        self.assertCountEqual(order.hardware.distinct(), [hardware])
 
     @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
     def test_limited_by_remaining_quantities(self):
@@ -1785,6 +2414,7 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
                 for _ in range(num_existing_orders)
             ]
         )
+        Hardware.objects.filter(id=hardware.id).update_stock()
 
         request_data = {
             "hardware": [{"id": hardware.id, "quantity": num_hardware_requested}]
@@ -1893,36 +2523,540 @@ class OrderListViewPostTestCase(SetupUserMixin, APITestCase):
             {"non_field_errors": ["User's team does not meet team size criteria"]},
         )
 
-
-class OrderListPatchTestCase(SetupUserMixin, APITestCase):
-    def setUp(self):
-        super().setUp()
-        self.team = Team.objects.create()
-        self.view_name = "api:hardware:order-detail"
-        self.change_permissions = Permission.objects.filter(
-            content_type__app_label="hardware", codename="change_order"
-        )
-        hardware = Hardware.objects.create(
-            name="name",
-            model_number="model",
-            manufacturer="manufacturer",
-            datasheet="/datasheet/location/",
-            quantity_available=4,
-            max_per_team=1,
-            picture="/picture/location",
-        )
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_category_limit_counts_other_hardware_in_category(self):
+        self._login()
+        self.create_min_number_of_profiles()
+        held_hardware, requested_hardware = [
+            Hardware.objects.create(name=name, quantity_available=10, max_per_team=10)
+            for name in ("held", "requested")
+        ]
+        held_hardware.categories.add(self.category_limit_4)
+        requested_hardware.categories.add(self.category_limit_4)
         order = Order.objects.create(
-            status="Submitted",
-            team=self.team,
-            request={"hardware": [{"id": 1, "quantity": 2}]},
+            team=self.team, status="Submitted", request={"hardware": []}
         )
-        OrderItem.objects.create(order=order, hardware=hardware)
-        self.pk = order.id
+        OrderItem.objects.create(order=order, hardware=held_hardware, quantity=3)
 
-    def _build_view(self, pk):
-        return reverse(self.view_name, kwargs={"pk": pk})
+        request_data = {"hardware": [{"id": requested_hardware.id, "quantity": 2}]}
+        response = self.client.post(self.view, request_data, format="json")
 
-    def test_user_not_logged_in(self):
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {
+                "non_field_errors": [
+                    "Maximum number of items for the Category {} is reached (limit of {} items per team)".format(
+                        self.category_limit_4.name, self.category_limit_4.max_per_team
+                    )
+                ]
+            },
+        )
+
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_invalid_hardware_id(self):
+        self._login()
+        self.create_min_number_of_profiles()
+        self.create_order()
+
+        request_data = {
+            "hardware": [
+                {"id": self.hardware1.id, "quantity": 1},
+                {"id": 1000, "quantity": 1},
+            ]
+        }
+        response = self.client.post(self.view, request_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {"hardware": [{}, {"id": ['Invalid pk "1000" - object does not exist.']}]},
+        )
+
+    def test_feasibility_report(self):
+        self.create_min_number_of_profiles()
+        hardware = Hardware.objects.create(
+            name="hardware", quantity_available=10, max_per_team=3
+        )
+        hardware.categories.add(self.category_limit_4, self.category_limit_10)
+        order = Order.objects.create(
+            team=self.team, status="Submitted", request={"hardware": []}
+        )
+        OrderItem.objects.create(order=order, hardware=hardware, quantity=2)
+        hardware.refresh_from_db()
+
+        with self.assertNumQueries(4):
+            report = OrderCreateSerializer.get_feasibility_report(
+                Counter({hardware: 2}), self.team
+            )
+
+        self.assertEqual(report["team_size"], 2)
+        self.assertEqual(
+            report["hardware"],
+            [
+                {
+                    "hardware": hardware,
+                    "requested_quantity": 2,
+                    "quantity_remaining": 8,
+                    "team_quantity": 2,
+                    "max_per_team": 3,
+                    "violation": "hardware_limit",
+                    "fulfillable_quantity": 1,
+                    "limiting_rule": "hardware_limit",
+                    "limiting_category": None,
+                }
+            ],
+        )
+        self.assertCountEqual(
+            report["categories"],
+            [
+                {
+                    "category": self.category_limit_4,
+                    "requested_quantity": 2,
+                    "team_quantity": 2,
+                    "max_per_team": 4,
+                    "violation": None,
+                },
+                {
+                    "category": self.category_limit_10,
+                    "requested_quantity": 2,
+                    "team_quantity": 2,
+                    "max_per_team": 10,
+                    "violation": None,
+                },
+            ],
+        )
+
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_validate_num_queries_independent_of_cart_size(self):
+        self.create_min_number_of_profiles()
+        category = Category.objects.create(name="category", max_per_team=1000)
+        request = APIRequestFactory().post(self.view)
+        request.user = self.user
+
+        num_queries = {}
+        for cart_size in (1, 10, 50, 100):
+            with self.subTest(cart_size=cart_size):
+                cart = []
+                for i in range(cart_size):
+                    hardware = Hardware.objects.create(
+                        name=f"hardware{cart_size}-{i}",
+                        quantity_available=10,
+                        max_per_team=10,
+                    )
+                    hardware.categories.add(category)
+                    cart.append(hardware)
+
+                serializer = OrderCreateSerializer(
+                    data={
+                        "hardware": [
+                            {"id": hardware.id, "quantity": 1} for hardware in cart
+                        ]
+                    },
+                    context={"request": request},
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertTrue(serializer.is_valid(), serializer.errors)
+                num_queries[cart_size] = len(queries)
+
+        self.assertEqual(len(set(num_queries.values())), 1, num_queries)
+
+
+class OrderCheckViewTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create()
+        Profile.objects.create(user=self.user, team=self.team)
+        self.user2 = User.objects.create_user(
+            username="frank@johnston.com", password="hellothere31415"
+        )
+        Profile.objects.create(user=self.user2, team=self.team)
+
+        self.category = Category.objects.create(name="category", max_per_team=4)
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=2, max_per_team=5
+        )
+        self.other_hardware = Hardware.objects.create(
+            name="other_hardware", quantity_available=10, max_per_team=5
+        )
+        self.hardware.categories.add(self.category)
+        self.other_hardware.categories.add(self.category)
+        self.view = reverse("api:hardware:order-check")
+
+    def _check(self, hardware_requests):
+        return self.client.post(
+            self.view,
+            {
+                "hardware": [
+                    {"id": hardware.id, "quantity": quantity}
+                    for (hardware, quantity) in hardware_requests
+                ]
+            },
+            format="json",
+        )
+
+    def test_user_not_logged_in(self):
+        response = self._check([(self.hardware, 1)])
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_fulfillable_cart(self):
+        self._login()
+        response = self._check([(self.hardware, 1), (self.other_hardware, 2)])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "hardware": [
+                    {
+                        "hardware_id": self.hardware.id,
+                        "requested_quantity": 1,
+                        "fulfillable_quantity": 1,
+                        "limiting_rule": None,
+                        "category_id": None,
+                    },
+                    {
+                        "hardware_id": self.other_hardware.id,
+                        "requested_quantity": 2,
+                        "fulfillable_quantity": 2,
+                        "limiting_rule": None,
+                        "category_id": None,
+                    },
+                ],
+                "errors": [],
+            },
+        )
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_limited_cart(self):
+        self._login()
+        order = Order.objects.create(
+            team=self.team, status="Submitted", request={"hardware": []}
+        )
+        OrderItem.objects.create(order=order, hardware=self.other_hardware)
+
+        response = self._check([(self.hardware, 3), (self.other_hardware, 3)])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["hardware"],
+            [
+                {
+                    "hardware_id": self.hardware.id,
+                    "requested_quantity": 3,
+                    "fulfillable_quantity": 2,
+                    "limiting_rule": "stock",
+                    "category_id": None,
+                },
+                {
+                    "hardware_id": self.other_hardware.id,
+                    "requested_quantity": 3,
+                    "fulfillable_quantity": 1,
+                    "limiting_rule": "category_limit",
+                    "category_id": self.category.id,
+                },
+            ],
+        )
+        self.assertEqual(
+            response.json()["errors"],
+            [
+                "Unable to order Hardware hardware because there are not enough items in stock",
+                "Maximum number of items for the Category category is reached (limit of 4 items per team)",
+            ],
+        )
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_empty_cart(self):
+        self._login()
+        response = self._check([])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"hardware": [], "errors": []})
+
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_team_size_criteria(self):
+        self._login()
+        self.user2.profile.delete()
+        response = self._check([(self.hardware, 1)])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {"non_field_errors": ["User's team does not meet team size criteria"]},
+        )
+
+
+@override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+class IdempotencyKeyTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create()
+        Profile.objects.create(user=self.user, team=self.team)
+        self.user2 = User.objects.create_user(
+            username="frank@johnston.com", password="hellothere31415"
+        )
+        Profile.objects.create(user=self.user2, team=self.team)
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=10, max_per_team=10
+        )
+        self.request_data = {"hardware": [{"id": self.hardware.id, "quantity": 2}]}
+        self.view = reverse("api:hardware:order-list")
+
+    def tearDown(self):
+        cache.clear()
+
+    def _post(self, request_data, idempotency_key="key"):
+        return self.client.post(
+            self.view,
+            request_data,
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=idempotency_key,
+        )
+
+    def test_replayed_order(self):
+        self._login()
+        response = self._post(self.request_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        num_emails = len(mail.outbox)
+
+        replayed_response = self._post(self.request_data)
+        self.assertEqual(replayed_response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replayed_response.json(), response.json())
+        self.assertEqual(replayed_response["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), num_emails)
+
+        self.assertEqual(
+            self._post(self.request_data, "other-key").status_code,
+            status.HTTP_201_CREATED,
+        )
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_for_other_request(self):
+        self._login()
+        self._post(self.request_data)
+        response = self._post({"hardware": [{"id": self.hardware.id, "quantity": 1}]})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_not_stored(self):
+        self._login()
+        self.hardware.max_per_team = 1
+        self.hardware.save()
+        response = self._post(self.request_data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.hardware.max_per_team = 10
+        self.hardware.save()
+        response = self._post(self.request_data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def _start_request(self, request_data):
+        """
+        Mark a request with the key "key" as in progress, as if it had been received
+        by another worker.
+        """
+        cache_key = build_idempotency_cache_key("OrderListView", self.user.id, "key")
+        fingerprint = hashlib.sha256(
+            json.dumps(request_data, sort_keys=True).encode()
+        ).hexdigest()
+        cache.set(cache_key, {"state": "in_progress", "fingerprint": fingerprint})
+        return (cache_key, fingerprint)
+
+    @override_settings(IDEMPOTENCY_KEY_WAIT_TIMEOUT=5)
+    def test_duplicate_waits_for_request_in_progress(self):
+        self._login()
+        (cache_key, fingerprint) = self._start_request(self.request_data)
+        data = {"order_id": 1, "hardware": [], "errors": []}
+        timer = threading.Timer(
+            0.2,
+            cache.set,
+            args=(
+                cache_key,
+                {
+                    "state": "done",
+                    "fingerprint": fingerprint,
+                    "status": 201,
+                    "data": data,
+                },
+            ),
+        )
+        timer.start()
+        try:
+            response = self._post(self.request_data)
+        finally:
+            timer.join()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), data)
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(IDEMPOTENCY_KEY_WAIT_TIMEOUT=0.2)
+    def test_duplicate_times_out(self):
+        self._login()
+        self._start_request(self.request_data)
+        response = self._post(self.request_data)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Order.objects.exists())
+
+    def test_replayed_return(self):
+        self.user.groups.add(Group.objects.get(name="Hardware Site Admins"))
+        self._login()
+        order = Order.objects.create(
+            team=self.team, status="Picked Up", request={"hardware": []}
+        )
+        OrderItem.objects.create(order=order, hardware=self.hardware, quantity=2)
+        request_data = {
+            "order": order.id,
+            "hardware": [
+                {
+                    "id": self.hardware.id,
+                    "quantity": 1,
+                    "part_returned_health": "Healthy",
+                }
+            ],
+        }
+
+        for _ in range(2):
+            response = self.client.post(
+                reverse("api:hardware:order-return"),
+                request_data,
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="key",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertCountEqual(
+            order.items.values_list("part_returned_health", "quantity"),
+            [(None, 1), ("Healthy", 1)],
+        )
+
+
+@override_settings(
+    HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO),
+    HARDWARE_ORDER_QUEUE_ENABLED=True,
+)
+class OrderQueueViewTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create()
+        Profile.objects.create(user=self.user, team=self.team)
+        self.user2 = User.objects.create_user(
+            username="frank@johnston.com", password="hellothere31415"
+        )
+        Profile.objects.create(user=self.user2, team=self.team)
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=10, max_per_team=10
+        )
+        self.request_data = {"hardware": [{"id": self.hardware.id, "quantity": 2}]}
+        self.view = reverse("api:hardware:order-list")
+
+    def test_order_queued(self):
+        self._login()
+        response = self.client.post(self.view, self.request_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        ticket = OrderTicket.objects.get()
+        self.assertEqual(response.json()["id"], ticket.id)
+        self.assertEqual(response.json()["status"], "Queued")
+        self.assertEqual(response.json()["queue_position"], 1)
+        self.assertEqual(ticket.request, [{"id": self.hardware.id, "quantity": 2}])
+        self.assertEqual(ticket.requester, self.user)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_order_validated_before_queueing(self):
+        self._login()
+        response = self.client.post(
+            self.view,
+            {"hardware": [{"id": self.hardware.id, "quantity": 11}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(OrderTicket.objects.exists())
+
+    def test_team_already_queued(self):
+        self._login()
+        self.client.post(self.view, self.request_data, format="json")
+        response = self.client.post(self.view, self.request_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(OrderTicket.objects.count(), 1)
+
+    @override_settings(HARDWARE_ORDER_QUEUE_MAX_DEPTH=0)
+    def test_queue_full(self):
+        self._login()
+        response = self.client.post(self.view, self.request_data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertFalse(OrderTicket.objects.exists())
+
+    def test_poll_ticket(self):
+        self._login()
+        ticket_id = self.client.post(
+            self.view, self.request_data, format="json"
+        ).json()["id"]
+        call_command("process_order_queue", "--once", stdout=StringIO())
+
+        response = self.client.get(
+            reverse("api:hardware:order-ticket-detail", kwargs={"pk": ticket_id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        order = Order.objects.get()
+        self.assertEqual(response.json()["status"], "Completed")
+        self.assertIsNone(response.json()["queue_position"])
+        self.assertEqual(response.json()["order"], order.id)
+        self.assertEqual(
+            response.json()["response"],
+            {
+                "order_id": order.id,
+                "hardware": [
+                    {"hardware_id": self.hardware.id, "quantity_fulfilled": 2}
+                ],
+                "errors": [],
+            },
+        )
+
+    def test_poll_other_team_ticket(self):
+        self._login()
+        ticket = OrderTicket.objects.create(
+            team=Team.objects.create(), request=self.request_data["hardware"]
+        )
+        response = self.client.get(
+            reverse("api:hardware:order-ticket-detail", kwargs={"pk": ticket.id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class OrderListPatchTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create()
+        self.view_name = "api:hardware:order-detail"
+        self.change_permissions = Permission.objects.filter(
+            content_type__app_label="hardware", codename="change_order"
+        )
+        hardware = Hardware.objects.create(
+            name="name",
+            model_number="model",
+            manufacturer="manufacturer",
+            datasheet="/datasheet/location/",
+            quantity_available=4,
+            max_per_team=1,
+            picture="/picture/location",
+        )
+        order = Order.objects.create(
+            status="Submitted",
+            team=self.team,
+            request={"hardware": [{"id": 1, "quantity": 2}]},
+        )
+        OrderItem.objects.create(order=order, hardware=hardware)
+        self.pk = order.id
+
+    def _build_view(self, pk):
+        return reverse(self.view_name, kwargs={"pk": pk})
+
+    def test_user_not_logged_in(self):
         request_data = {"status": "Ready for Pickup"}
         response = self.client.patch(self._build_view(self.pk), request_data)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1977,35 +3111,655 @@ class OrderListPatchTestCase(SetupUserMixin, APITestCase):
         self.assertFalse(request_data["status"] == Order.objects.get(id=self.pk).status)
 
 
-class OrderItemReturnViewTestCase(SetupUserMixin, APITestCase):
+class OrderBulkStatusViewTestCase(SetupUserMixin, APITestCase):
     def setUp(self):
         super().setUp()
-        self.team = Team.objects.create()
-        self.order = Order.objects.create(
-            status="Cart",
-            team=self.team,
-            request={"hardware": [{"id": 1, "quantity": 2}]},
-        )
-        self.permissions = Permission.objects.filter(
+        self.view = reverse("api:hardware:order-bulk-status")
+        self.change_permissions = Permission.objects.filter(
             content_type__app_label="hardware", codename="change_order"
         )
-
         self.hardware = Hardware.objects.create(
             name="name",
             model_number="model",
             manufacturer="manufacturer",
             datasheet="/datasheet/location/",
-            notes="notes",
-            quantity_available=4,
-            max_per_team=3,
+            quantity_available=10,
+            max_per_team=10,
             picture="/picture/location",
         )
+        self.team = Team.objects.create()
+        self._make_profile(self.user, self.team)
+        self.other_team = Team.objects.create()
 
-        self.order_item = OrderItem.objects.create(
-            order=self.order, hardware=self.hardware,
+    def _create_order(self, team, order_status="Submitted"):
+        order = Order.objects.create(
+            status=order_status,
+            team=team,
+            request={"hardware": [{"id": self.hardware.id, "quantity": 1}]},
         )
+        OrderItem.objects.create(order=order, hardware=self.hardware)
+        return order
 
-        self.request_data = {
+    def test_user_not_logged_in(self):
+        order = self._create_order(self.team)
+        response = self.client.patch(
+            self.view,
+            {"orders": [{"id": order.id, "status": "Ready for Pickup"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_lack_perms(self):
+        self._login()
+        order = self._create_order(self.team)
+        response = self.client.patch(
+            self.view,
+            {"orders": [{"id": order.id, "status": "Ready for Pickup"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_per_order_results(self):
+        self._login(self.change_permissions)
+        ready_order = self._create_order(self.team)
+        cancelled_order = self._create_order(self.other_team)
+        picked_up_order = self._create_order(self.other_team, "Picked Up")
+        response = self.client.patch(
+            self.view,
+            {
+                "orders": [
+                    {"id": ready_order.id, "status": "Ready for Pickup"},
+                    {"id": cancelled_order.id, "status": "Cancelled"},
+                    {"id": picked_up_order.id, "status": "Cancelled"},
+                    {"id": 100000, "status": "Cancelled"},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "orders": [
+                    {
+                        "id": ready_order.id,
+                        "status": "Ready for Pickup",
+                        "success": True,
+                        "message": None,
+                    },
+                    {
+                        "id": cancelled_order.id,
+                        "status": "Cancelled",
+                        "success": True,
+                        "message": None,
+                    },
+                    {
+                        "id": picked_up_order.id,
+                        "status": "Picked Up",
+                        "success": False,
+                        "message": "Cannot change the status of an order from "
+                        "Picked Up to Cancelled.",
+                    },
+                    {
+                        "id": 100000,
+                        "status": None,
+                        "success": False,
+                        "message": "Order does not exist.",
+                    },
+                ]
+            },
+        )
+        ready_order.refresh_from_db()
+        cancelled_order.refresh_from_db()
+        picked_up_order.refresh_from_db()
+        self.assertEqual(ready_order.status, "Ready for Pickup")
+        self.assertEqual(cancelled_order.status, "Cancelled")
+        self.assertEqual(picked_up_order.status, "Picked Up")
+
+    def test_cancelled_orders_release_stock(self):
+        self._login(self.change_permissions)
+        order = self._create_order(self.team)
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 9)
+
+        response = self.client.patch(
+            self.view,
+            {"orders": [{"id": order.id, "status": "Cancelled"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 10)
+        self.assertEqual(self.hardware.quantity_checked_out, 0)
+
+    def test_one_update_per_status(self):
+        orders = [self._create_order(self.team) for _ in range(10)]
+        new_statuses = {order.id: "Ready for Pickup" for order in orders[:5]}
+        new_statuses.update({order.id: "Cancelled" for order in orders[5:]})
+
+        with CaptureQueriesContext(connection) as queries:
+            OrderChangeSerializer.change_statuses(new_statuses)
+        order_updates = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "hardware_order"')
+        ]
+        self.assertEqual(len(order_updates), 2)
+        self.assertEqual(
+            Order.objects.filter(status="Ready for Pickup").count(), len(orders[:5])
+        )
+        self.assertEqual(
+            Order.objects.filter(status="Cancelled").count(), len(orders[5:])
+        )
+
+    def test_notifications_queued(self):
+        self._login(self.change_permissions)
+        team_order = self._create_order(self.team)
+        other_team_order = self._create_order(self.other_team)
+        response = self.client.patch(
+            self.view,
+            {
+                "orders": [
+                    {"id": team_order.id, "status": "Ready for Pickup"},
+                    {"id": other_team_order.id, "status": "Ready for Pickup"},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The emails are sent by the outbox worker, not during the request
+        self.assertEqual(len(mail.outbox), 0)
+        # One digest to the admins, and one email to the participant in self.team
+        self.assertEqual(queue_due_notifications(force=True), 2)
+        self.assertEqual(deliver_pending(), (2, 0))
+        self.assertEqual(
+            sorted(email.to[0] for email in mail.outbox),
+            sorted([settings.HSS_ADMIN_EMAIL, self.user.email]),
+        )
+
+    def test_no_notifications_without_changes(self):
+        self._login(self.change_permissions)
+        order = self._create_order(self.team, "Returned")
+        response = self.client.patch(
+            self.view,
+            {"orders": [{"id": order.id, "status": "Cancelled"}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.json()["orders"][0]["success"])
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_duplicate_orders(self):
+        self._login(self.change_permissions)
+        order = self._create_order(self.team)
+        response = self.client.patch(
+            self.view,
+            {
+                "orders": [
+                    {"id": order.id, "status": "Ready for Pickup"},
+                    {"id": order.id, "status": "Cancelled"},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {"orders": ["Each order can only appear once in a status change request"]},
+        )
+
+    def test_no_orders(self):
+        self._login(self.change_permissions)
+        response = self.client.patch(self.view, {"orders": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"orders": ["No orders specified"]})
+
+
+class OrderPickListViewTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = reverse("api:hardware:order-pick-list")
+        self.view_permissions = Permission.objects.filter(
+            content_type__app_label="hardware", codename="view_order"
+        )
+        self.team = Team.objects.create(team_code="AAAAA")
+        self.other_team = Team.objects.create(team_code="BBBBB")
+        self.resistor = Hardware.objects.create(
+            name="Resistor",
+            model_number="R1",
+            manufacturer="Acme",
+            quantity_available=20,
+        )
+        self.arduino = Hardware.objects.create(
+            name="Arduino", model_number="A1", manufacturer="Acme", quantity_available=5
+        )
+
+    def _create_order(self, team, items, order_status="Submitted"):
+        order = Order.objects.create(
+            status=order_status,
+            team=team,
+            request={
+                "hardware": [
+                    {"id": hardware.id, "quantity": quantity}
+                    for (hardware, quantity) in items
+                ]
+            },
+        )
+        for (hardware, quantity) in items:
+            OrderItem.objects.create(order=order, hardware=hardware, quantity=quantity)
+        return order
+
+    def test_user_not_logged_in(self):
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_lack_perms(self):
+        self._login()
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_pick_list(self):
+        self._login(self.view_permissions)
+        self._create_order(self.team, [(self.resistor, 3), (self.arduino, 1)])
+        self._create_order(self.team, [(self.resistor, 2)])
+        self._create_order(self.other_team, [(self.resistor, 4)])
+        # Orders in other statuses are left out
+        self._create_order(self.other_team, [(self.arduino, 2)], "Ready for Pickup")
+        self.resistor.refresh_from_db()
+        self.arduino.refresh_from_db()
+
+        with self.assertNumQueries(1):
+            get_pick_list("Submitted")
+
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "status": "Submitted",
+                "hardware": [
+                    {
+                        "hardware_id": self.arduino.id,
+                        "name": "Arduino",
+                        "model_number": "A1",
+                        "manufacturer": "Acme",
+                        "quantity_remaining": self.arduino.quantity_remaining,
+                        "total_quantity": 1,
+                        "teams": [
+                            {
+                                "team_id": self.team.id,
+                                "team_code": "AAAAA",
+                                "quantity": 1,
+                                "orders": 1,
+                            }
+                        ],
+                    },
+                    {
+                        "hardware_id": self.resistor.id,
+                        "name": "Resistor",
+                        "model_number": "R1",
+                        "manufacturer": "Acme",
+                        "quantity_remaining": self.resistor.quantity_remaining,
+                        "total_quantity": 9,
+                        "teams": [
+                            {
+                                "team_id": self.team.id,
+                                "team_code": "AAAAA",
+                                "quantity": 5,
+                                "orders": 2,
+                            },
+                            {
+                                "team_id": self.other_team.id,
+                                "team_code": "BBBBB",
+                                "quantity": 4,
+                                "orders": 1,
+                            },
+                        ],
+                    },
+                ],
+            },
+        )
+
+    def test_pick_list_other_status(self):
+        self._login(self.view_permissions)
+        self._create_order(self.team, [(self.resistor, 3)])
+        self._create_order(self.other_team, [(self.arduino, 2)], "Ready for Pickup")
+        response = self.client.get(self.view, {"status": "Ready for Pickup"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["status"], "Ready for Pickup")
+        self.assertEqual(
+            [hardware["hardware_id"] for hardware in data["hardware"]],
+            [self.arduino.id],
+        )
+
+    def test_invalid_status(self):
+        self._login(self.view_permissions)
+        response = self.client.get(self.view, {"status": "Lost"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"status": ['"Lost" is not a valid choice.']})
+
+    def test_pick_list_csv(self):
+        self._login(self.view_permissions)
+        self._create_order(self.team, [(self.resistor, 3)])
+        self._create_order(self.other_team, [(self.resistor, 4)])
+        self.resistor.refresh_from_db()
+
+        response = self.client.get(self.view, {"format": "csv"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="pick-list-submitted.csv"',
+        )
+        self.assertEqual(
+            response.content.decode().splitlines(),
+            [
+                "hardware_id,name,model_number,manufacturer,quantity_remaining,"
+                "total_quantity,team_code,team_quantity,team_orders",
+                f"{self.resistor.id},Resistor,R1,Acme,13,7,AAAAA,3,1",
+                f"{self.resistor.id},Resistor,R1,Acme,13,7,BBBBB,4,1",
+            ],
+        )
+
+
+class ChangeListViewTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.view = reverse("api:hardware:change-list")
+        self.view_permissions = Permission.objects.filter(
+            content_type__app_label="hardware",
+            codename__in=["view_order", "view_orderitem", "view_incident"],
+        )
+        self.team = Team.objects.create()
+        self.hardware = Hardware.objects.create(
+            name="name",
+            model_number="model",
+            manufacturer="manufacturer",
+            datasheet="/datasheet/location/",
+            quantity_available=5,
+            max_per_team=5,
+            picture="/picture/location",
+        )
+        self.order = Order.objects.create(
+            status="Submitted",
+            team=self.team,
+            request={"hardware": [{"id": self.hardware.id, "quantity": 2}]},
+        )
+        self.order_item = OrderItem.objects.create(
+            order=self.order, hardware=self.hardware, quantity=2
+        )
+
+    def _cursor(self):
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["cursor"]
+
+    def _changes(self, since, **params):
+        response = self.client.get(self.view, {"since": since, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def _request(self):
+        return APIRequestFactory().get(self.view)
+
+    def test_user_not_logged_in(self):
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cursor_without_since(self):
+        self._login()
+        self.assertEqual(
+            self.client.get(self.view).json(),
+            {
+                "cursor": ChangeLogEntry.objects.latest("sequence").sequence,
+                "has_more": False,
+                "changes": {},
+            },
+        )
+
+    def test_updated_and_deleted(self):
+        self._login(self.view_permissions)
+        cursor = self._cursor()
+        self.assertEqual(
+            self._changes(cursor),
+            {
+                "cursor": cursor,
+                "has_more": False,
+                "changes": {
+                    model: {"changed": [], "deleted": []}
+                    for model in ("hardware", "order", "order_item", "incident")
+                },
+            },
+        )
+
+        self.hardware.notes = "Updated"
+        self.hardware.save()
+        other_hardware = Hardware.objects.create(
+            name="other",
+            model_number="model",
+            manufacturer="manufacturer",
+            quantity_available=1,
+        )
+        other_hardware_id = other_hardware.id
+        other_hardware.delete()
+
+        data = self._changes(cursor, models="hardware")
+        self.assertGreater(data["cursor"], cursor)
+        self.assertEqual(
+            data["changes"],
+            {
+                "hardware": {
+                    "changed": HardwareSerializer(
+                        [self.hardware], many=True, context={"request": self._request()}
+                    ).data,
+                    "deleted": [other_hardware_id],
+                }
+            },
+        )
+        self.assertEqual(
+            self._changes(data["cursor"], models="hardware")["changes"],
+            {"hardware": {"changed": [], "deleted": []}},
+        )
+
+    def test_deleted_order_cascades_tombstones(self):
+        self._login(self.view_permissions)
+        cursor = self._cursor()
+        incident = Incident.objects.create(
+            state="Heavily Used",
+            order_item=self.order_item,
+            time_occurred=datetime.now(settings.TZ_INFO),
+        )
+        (order_id, order_item_id) = (self.order.id, self.order_item.id)
+        self.order.delete()
+
+        changes = self._changes(cursor)["changes"]
+        self.assertEqual(changes["order"], {"changed": [], "deleted": [order_id]})
+        self.assertEqual(
+            changes["order_item"], {"changed": [], "deleted": [order_item_id]}
+        )
+        self.assertEqual(changes["incident"], {"changed": [], "deleted": [incident.id]})
+        self.assertEqual(changes["hardware"]["changed"][0]["id"], self.hardware.id)
+
+    @override_settings(HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO))
+    def test_order_placed(self):
+        self._login(self.view_permissions)
+        self._make_profile(self.user, self.team)
+        self._make_profile(
+            User.objects.create_user(username="a@b.com", email="a@b.com"), self.team
+        )
+        cursor = self._cursor()
+
+        response = self.client.post(
+            reverse("api:hardware:order-list"),
+            {"hardware": [{"id": self.hardware.id, "quantity": 1}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(id=response.json()["order_id"])
+
+        changes = self._changes(cursor)["changes"]
+        self.assertEqual([o["id"] for o in changes["order"]["changed"]], [order.id])
+        self.assertEqual(
+            [item["id"] for item in changes["order_item"]["changed"]],
+            list(order.items.values_list("id", flat=True)),
+        )
+        self.assertEqual(changes["hardware"]["changed"][0]["quantity_remaining"], 2)
+
+    def test_bulk_status_change_and_return(self):
+        self._login(self.view_permissions)
+        cursor = self._cursor()
+
+        OrderChangeSerializer.change_statuses({self.order.id: "Ready for Pickup"})
+        changes = self._changes(cursor)
+        self.assertEqual(
+            changes["changes"]["order"]["changed"][0]["status"], "Ready for Pickup"
+        )
+
+        self.user.groups.add(Group.objects.get(name="Hardware Site Admins"))
+        self.order.status = "Picked Up"
+        self.order.save()
+        cursor = changes["cursor"]
+        response = self.client.post(
+            reverse("api:hardware:order-return"),
+            {
+                "hardware": [
+                    {
+                        "id": self.hardware.id,
+                        "quantity": 1,
+                        "part_returned_health": "Healthy",
+                    }
+                ],
+                "order": self.order.id,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        changes = self._changes(cursor)["changes"]
+        self.assertCountEqual(
+            [
+                (item["id"], item["part_returned_health"], item["quantity"])
+                for item in changes["order_item"]["changed"]
+            ],
+            [
+                (item.id, item.part_returned_health, item.quantity)
+                for item in self.order.items.all()
+            ],
+        )
+        self.assertEqual(changes["hardware"]["changed"][0]["quantity_remaining"], 4)
+
+    def test_permissions(self):
+        self._login()
+        self.assertEqual(list(self._changes(0)["changes"]), ["hardware"])
+
+        response = self.client.get(self.view, {"since": 0, "models": "order"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_query(self):
+        self._login()
+        for params in ({"since": -1}, {"since": "a"}, {"since": 0, "models": "team"}):
+            response = self.client.get(self.view, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_late_commit_not_skipped(self):
+        self._login()
+        cursor = self._cursor()
+        # An entry which got its id before the entries synced above, but was
+        # committed after them
+        late_entry = ChangeLogEntry.objects.create(
+            id=ChangeLogEntry.objects.earliest("id").id - 1,
+            model="hardware",
+            object_id=self.hardware.id,
+        )
+
+        data = self._changes(cursor, models="hardware")
+        self.assertEqual(
+            [hardware["id"] for hardware in data["changes"]["hardware"]["changed"]],
+            [self.hardware.id],
+        )
+        late_entry.refresh_from_db()
+        self.assertEqual(data["cursor"], late_entry.sequence)
+        self.assertGreater(data["cursor"], cursor)
+
+    @override_settings(HARDWARE_CHANGES_PAGE_SIZE=2)
+    def test_has_more(self):
+        self._login()
+        for i in range(3):
+            Hardware.objects.create(
+                name=f"hardware {i}",
+                model_number="model",
+                manufacturer="manufacturer",
+                quantity_available=1,
+            )
+
+        cursor = 0
+        synced = []
+        pages = 0
+        while True:
+            data = self._changes(cursor, models="hardware")
+            synced += [
+                hardware["id"] for hardware in data["changes"]["hardware"]["changed"]
+            ]
+            cursor = data["cursor"]
+            pages += 1
+            if not data["has_more"]:
+                break
+        self.assertEqual(pages, 3)
+        self.assertCountEqual(
+            set(synced), Hardware.objects.values_list("id", flat=True)
+        )
+
+    def test_num_queries(self):
+        self._login(self.view_permissions)
+        cursor = self._cursor()
+        for i in range(5):
+            order = Order.objects.create(
+                status="Submitted", team=self.team, request={"hardware": []}
+            )
+            OrderItem.objects.create(order=order, hardware=self.hardware)
+
+        with CaptureQueriesContext(connection) as few:
+            self._changes(cursor)
+        for i in range(5):
+            order = Order.objects.create(
+                status="Submitted", team=self.team, request={"hardware": []}
+            )
+            OrderItem.objects.create(order=order, hardware=self.hardware)
+        with CaptureQueriesContext(connection) as many:
+            self._changes(cursor)
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+
+class OrderItemReturnViewTestCase(SetupUserMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.team = Team.objects.create()
+        self.order = Order.objects.create(
+            status="Cart",
+            team=self.team,
+            request={"hardware": [{"id": 1, "quantity": 2}]},
+        )
+        self.permissions = Permission.objects.filter(
+            content_type__app_label="hardware", codename="change_order"
+        )
+
+        self.hardware = Hardware.objects.create(
+            name="name",
+            model_number="model",
+            manufacturer="manufacturer",
+            datasheet="/datasheet/location/",
+            notes="notes",
+            quantity_available=4,
+            max_per_team=3,
+            picture="/picture/location",
+        )
+
+        self.order_item = OrderItem.objects.create(
+            order=self.order, hardware=self.hardware,
+        )
+
+        self.request_data = {
             "hardware": [{"id": 1, "quantity": 1, "part_returned_health": "Healthy"}],
             "order": self.order_item.id,
         }
@@ -2021,6 +3775,232 @@ class OrderItemReturnViewTestCase(SetupUserMixin, APITestCase):
         response = self.client.post(self.view, self.request_data)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def _login_as_admin(self):
+        self.user.groups.add(Group.objects.get(name="Hardware Site Admins"))
+        self._login()
+
+    def _return(self, quantity, part_returned_health="Healthy"):
+        request_data = {
+            "hardware": [
+                {
+                    "id": self.hardware.id,
+                    "quantity": quantity,
+                    "part_returned_health": part_returned_health,
+                }
+            ],
+            "order": self.order.id,
+        }
+        return self.client.post(self.view, request_data, format="json")
+
+    def _lines(self):
+        return [
+            (order_item.part_returned_health, order_item.quantity)
+            for order_item in self.order.items.all()
+        ]
+
+    def test_partial_return_splits_line(self):
+        self._login_as_admin()
+        self.order_item.quantity = 3
+        self.order_item.save()
+
+        response = self._return(2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            response.json()["returned_items"],
+            [{"hardware_id": self.hardware.id, "quantity": 2}],
+        )
+        self.assertCountEqual(self._lines(), [(None, 1), ("Healthy", 2)])
+
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 3)
+
+    def test_returns_merge_into_one_line_per_health(self):
+        self._login_as_admin()
+        self.order_item.quantity = 3
+        self.order_item.save()
+
+        self._return(1)
+        self._return(1, "Broken")
+        self._return(1)
+        self.assertCountEqual(self._lines(), [("Healthy", 2), ("Broken", 1)])
+
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 3)
+
+    def test_return_keeps_incident_line(self):
+        self._login_as_admin()
+        self.order_item.quantity = 2
+        self.order_item.save()
+        incident_item = OrderItem.objects.create(
+            order=self.order, hardware=self.hardware
+        )
+        Incident.objects.create(
+            state="Broken",
+            time_occurred="2022-08-08T01:18:00-04:00",
+            description="Description",
+            order_item=incident_item,
+        )
+
+        self._return(3, "Broken")
+        self.assertCountEqual(self._lines(), [("Broken", 2), ("Broken", 1)])
+        incident_item.refresh_from_db()
+        self.assertEqual(incident_item.part_returned_health, "Broken")
+        self.assertEqual(incident_item.quantity, 1)
+
+    def test_return_several_orders(self):
+        self._login_as_admin()
+        other_order = Order.objects.create(
+            status="Picked Up", team=self.team, request={"hardware": []}
+        )
+        OrderItem.objects.create(order=other_order, hardware=self.hardware, quantity=2)
+
+        request_data = {
+            "orders": [
+                {
+                    "order": self.order.id,
+                    "hardware": [
+                        {
+                            "id": self.hardware.id,
+                            "quantity": 1,
+                            "part_returned_health": "Healthy",
+                        }
+                    ],
+                },
+                {
+                    "order": other_order.id,
+                    "hardware": [
+                        {
+                            "id": self.hardware.id,
+                            "quantity": 2,
+                            "part_returned_health": "Broken",
+                        }
+                    ],
+                },
+            ]
+        }
+        response = self.client.post(self.view, request_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            response.json(),
+            {
+                "team_code": self.team.team_code,
+                "orders": [
+                    {
+                        "order_id": self.order.id,
+                        "returned_items": [
+                            {"hardware_id": self.hardware.id, "quantity": 1}
+                        ],
+                        "team_code": self.team.team_code,
+                        "errors": [],
+                    },
+                    {
+                        "order_id": other_order.id,
+                        "returned_items": [
+                            {"hardware_id": self.hardware.id, "quantity": 2}
+                        ],
+                        "team_code": self.team.team_code,
+                        "errors": [],
+                    },
+                ],
+            },
+        )
+        self.assertEqual(self._lines(), [("Healthy", 1)])
+        self.assertEqual(
+            [
+                (order_item.part_returned_health, order_item.quantity)
+                for order_item in other_order.items.all()
+            ],
+            [("Broken", 2)],
+        )
+        # Broken parts stay out of stock
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 2)
+
+    def test_return_orders_of_several_teams(self):
+        self._login_as_admin()
+        other_order = Order.objects.create(
+            status="Picked Up", team=Team.objects.create(), request={"hardware": []}
+        )
+        OrderItem.objects.create(order=other_order, hardware=self.hardware)
+
+        request_data = {
+            "orders": [
+                {
+                    "order": order.id,
+                    "hardware": [
+                        {
+                            "id": self.hardware.id,
+                            "quantity": 1,
+                            "part_returned_health": "Healthy",
+                        }
+                    ],
+                }
+                for order in (self.order, other_order)
+            ]
+        }
+        response = self.client.post(self.view, request_data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {
+                "non_field_errors": [
+                    "All orders in a return request must belong to the same team"
+                ]
+            },
+        )
+        self.assertEqual(self._lines(), [(None, 1)])
+
+    def test_return_without_hardware(self):
+        self._login_as_admin()
+        response = self.client.post(self.view, {"order": self.order.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"hardware": ["This field is required."]})
+
+    def test_return_num_queries_independent_of_kit_size(self):
+        num_queries = {}
+        for kit_size in (4, 10, 40):
+            with self.subTest(kit_size=kit_size):
+                order = Order.objects.create(
+                    status="Picked Up", team=self.team, request={"hardware": []}
+                )
+                kit = []
+                for i in range(kit_size):
+                    hardware = Hardware.objects.create(
+                        name=f"hardware{kit_size}-{i}", quantity_available=10
+                    )
+                    OrderItem.objects.create(order=order, hardware=hardware, quantity=2)
+                    kit.append(hardware)
+
+                serializer = OrderItemReturnSerializer(
+                    data={
+                        "order": order.id,
+                        "hardware": [
+                            {
+                                "id": hardware.id,
+                                "quantity": 2 if i % 2 else 1,
+                                "part_returned_health": "Broken"
+                                if i % 3
+                                else "Healthy",
+                            }
+                            for (i, hardware) in enumerate(kit)
+                        ],
+                    }
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertTrue(serializer.is_valid(), serializer.errors)
+                    serializer.save()
+                num_queries[kit_size] = len(queries)
+                self.assertEqual(
+                    OrderItem.objects.filter(
+                        order=order, part_returned_health__isnull=False
+                    ).count(),
+                    kit_size,
+                )
+
+        self.assertEqual(len(set(num_queries.values())), 1, num_queries)
+
     # TODO: https://ieeeuoft.atlassian.net/browse/IEEE-224
     # def test_successful_status_change(self):
     #     self._login(self.permissions)
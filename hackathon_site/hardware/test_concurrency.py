@@ -0,0 +1,168 @@
+import threading
+import time
+from datetime import datetime
+from unittest import skipUnless
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from event.models import Team, User, Profile
+from hackathon_site.tests import benchmark
+from hardware.changes import get_changes, get_current_cursor
+from hardware.models import ChangeLogEntry, Hardware, OrderItem
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "Row locks are only meaningful on postgres, sqlite serializes all writes",
+)
+@override_settings(
+    HARDWARE_SIGN_OUT_START_DATE=datetime.now(settings.TZ_INFO) - relativedelta(days=1),
+    HARDWARE_SIGN_OUT_END_DATE=datetime.now(settings.TZ_INFO) + relativedelta(days=1),
+)
+class OrderAllocationConcurrencyTestCase(TransactionTestCase):
+    """
+    Fires NUM_TEAMS order requests in parallel, one per team, against a hardware
+    with only QUANTITY_AVAILABLE units in stock, and checks that exactly
+    QUANTITY_AVAILABLE units are handed out. The throughput of the orders is an
+    opt-in benchmark.
+
+    Run against a postgres database, for example:
+        python manage.py test hardware.test_concurrency
+    """
+
+    NUM_TEAMS = 20
+    QUANTITY_AVAILABLE = 5
+    # Lower bound on the number of orders per second, loose enough for a laptop
+    MIN_THROUGHPUT = 5
+
+    def setUp(self):
+        self.hardware = Hardware.objects.create(
+            name="popular",
+            quantity_available=self.QUANTITY_AVAILABLE,
+            max_per_team=self.QUANTITY_AVAILABLE,
+        )
+        self.users = []
+        for team_number in range(self.NUM_TEAMS):
+            team = Team.objects.create()
+            for member_number in range(settings.MIN_MEMBERS):
+                user = User.objects.create_user(
+                    username=f"member{member_number}@team{team_number}.com",
+                    password="foobar123",
+                )
+                Profile.objects.create(user=user, team=team)
+            self.users.append(user)
+        self.view = reverse("api:hardware:order-list")
+
+    def _place_order(self, user, barrier, responses):
+        client = APIClient()
+        client.force_authenticate(user)
+        try:
+            barrier.wait()
+            responses.append(
+                client.post(
+                    self.view,
+                    {"hardware": [{"id": self.hardware.id, "quantity": 1}]},
+                    format="json",
+                )
+            )
+        finally:
+            connection.close()
+
+    def _place_orders(self):
+        """
+        Place the order of every team at once, and return the responses and the
+        time they took
+        """
+        responses = []
+        barrier = threading.Barrier(self.NUM_TEAMS)
+        threads = [
+            threading.Thread(target=self._place_order, args=(user, barrier, responses))
+            for user in self.users
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(responses), self.NUM_TEAMS)
+        return (responses, elapsed)
+
+    def test_no_overselling(self):
+        (responses, _) = self._place_orders()
+        fulfilled = 0
+        for response in responses:
+            if response.status_code == status.HTTP_201_CREATED:
+                fulfilled += sum(
+                    hardware["quantity_fulfilled"]
+                    for hardware in response.json()["hardware"]
+                )
+            else:
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.hardware.refresh_from_db()
+        self.assertEqual(fulfilled, self.QUANTITY_AVAILABLE)
+        self.assertEqual(
+            OrderItem.objects.filter(hardware=self.hardware).aggregate(
+                quantity=Sum("quantity")
+            )["quantity"],
+            self.QUANTITY_AVAILABLE,
+        )
+        self.assertEqual(self.hardware.quantity_checked_out, self.QUANTITY_AVAILABLE)
+        self.assertEqual(self.hardware.quantity_remaining, 0)
+
+    @benchmark
+    def test_benchmark_throughput(self):
+        (_, elapsed) = self._place_orders()
+        throughput = self.NUM_TEAMS / elapsed
+        self.assertGreaterEqual(
+            throughput,
+            self.MIN_THROUGHPUT,
+            f"{self.NUM_TEAMS} parallel orders for {self.QUANTITY_AVAILABLE} units "
+            f"in {elapsed:.3f}s ({throughput:.1f} orders/s)",
+        )
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "sqlite serializes all writes, so entries always commit in id order",
+)
+class ChangeLogConcurrencyTestCase(TransactionTestCase):
+    def _long_transaction(self, inserted, commit):
+        try:
+            with transaction.atomic():
+                ChangeLogEntry.objects.record("hardware", [1])
+                inserted.set()
+                commit.wait(10)
+        finally:
+            connection.close()
+
+    def test_late_commit_not_skipped(self):
+        inserted = threading.Event()
+        commit = threading.Event()
+        thread = threading.Thread(
+            target=self._long_transaction, args=(inserted, commit)
+        )
+        thread.start()
+        inserted.wait(10)
+
+        # Committed after the entry of the long transaction got its id
+        ChangeLogEntry.objects.record("hardware", [2])
+        (cursor, _, changes) = get_changes(0, ["hardware"])
+        self.assertEqual(changes["hardware"]["changed"], [2])
+
+        commit.set()
+        thread.join()
+        (next_cursor, _, changes) = get_changes(cursor, ["hardware"])
+        self.assertEqual(changes["hardware"]["changed"], [1])
+        self.assertGreater(next_cursor, cursor)
+        self.assertEqual(get_current_cursor(), next_cursor)
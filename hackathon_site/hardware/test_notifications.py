@@ -0,0 +1,241 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.utils import timezone
+
+from event.models import OutboxEmail, Profile, Team, User
+from event.notifications import Notification
+from event.outbox import build_email
+from hackathon_site.tests import benchmark
+from hardware.models import OrderNotification
+from hardware.notifications import (
+    queue_admin_digest,
+    queue_due_notifications,
+    queue_team_notifications,
+)
+from hardware.views import (
+    ORDER_STATUS_CLOSING_MSG,
+    ORDER_STATUS_MSG,
+    OrderDetailView,
+)
+
+
+class NotificationRenderingTestCase(TestCase):
+    """
+    The status change emails of an order of a team of TEAM_SIZE members, built with
+    Notification against rendering every template for every recipient.
+    """
+
+    TEAM_SIZE = 4
+    REPEAT = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        team = Team.objects.create()
+        for i in range(cls.TEAM_SIZE):
+            user = User.objects.create_user(
+                username=f"user{i}@bar.com",
+                email=f"user{i}@bar.com",
+                first_name=f"User {i}",
+            )
+            Profile.objects.create(user=user, team=team)
+        cls.order = {
+            "id": 1,
+            "team_id": team.id,
+            "team_code": team.team_code,
+            "status": "Ready for Pickup",
+        }
+
+    def setUp(self):
+        self.users = [
+            profile.user
+            for profile in Profile.objects.select_related("user").order_by("id")
+        ]
+
+    def render_per_recipient(self):
+        context = {
+            "recipient": "Hardware Inventory Admins",
+            "order": self.order,
+            "order_status_message": ORDER_STATUS_MSG[self.order["status"]],
+        }
+        emails = [
+            build_email(
+                subject=render_to_string(
+                    OrderDetailView.update_order_email_subject_template, context
+                ),
+                message=render_to_string(
+                    OrderDetailView.update_order_email_template_admin, context
+                ),
+                html_message=render_to_string(
+                    OrderDetailView.update_order_email_template_admin, context
+                ),
+                recipient_list=[settings.HSS_ADMIN_EMAIL],
+            )
+        ]
+        for user in self.users:
+            context = {
+                **context,
+                "recipient": user,
+                "order_status_closing_message": ORDER_STATUS_CLOSING_MSG[
+                    self.order["status"]
+                ],
+            }
+            emails.append(
+                build_email(
+                    subject=render_to_string(
+                        OrderDetailView.update_order_email_subject_template, context
+                    ),
+                    message=render_to_string(
+                        OrderDetailView.update_order_email_template_participant,
+                        context,
+                    ),
+                    html_message=render_to_string(
+                        OrderDetailView.update_order_email_template_participant,
+                        context,
+                    ),
+                    recipient_list=[user.email],
+                )
+            )
+        return emails
+
+    def render_once(self):
+        context = {
+            "order": self.order,
+            "order_status_message": ORDER_STATUS_MSG[self.order["status"]],
+        }
+        emails = [
+            Notification(
+                OrderDetailView.update_order_email_subject_template,
+                OrderDetailView.update_order_email_template_admin,
+                context,
+            ).to_email("Hardware Inventory Admins", [settings.HSS_ADMIN_EMAIL])
+        ]
+        notification = Notification(
+            OrderDetailView.update_order_email_subject_template,
+            OrderDetailView.update_order_email_template_participant,
+            {
+                **context,
+                "order_status_closing_message": ORDER_STATUS_CLOSING_MSG[
+                    self.order["status"]
+                ],
+            },
+        )
+        emails.extend(notification.to_email(user, [user.email]) for user in self.users)
+        return emails
+
+    def test_same_emails(self):
+        per_recipient_emails = self.render_per_recipient()
+        once_emails = self.render_once()
+        self.assertEqual(len(once_emails), self.TEAM_SIZE + 1)
+
+        # Same emails, but with a plain text body
+        for (email, expected) in zip(once_emails, per_recipient_emails):
+            self.assertEqual(email.subject, expected.subject)
+            self.assertEqual(email.to, expected.to)
+            self.assertEqual(email.alternatives, expected.alternatives)
+            self.assertNotIn("<p>", email.body)
+
+    def _time(self, build):
+        build()
+        start = time.perf_counter()
+        for _ in range(self.REPEAT):
+            build()
+        return (time.perf_counter() - start) / self.REPEAT
+
+    @benchmark
+    def test_benchmark_status_change(self):
+        per_recipient_time = self._time(self.render_per_recipient)
+        once_time = self._time(self.render_once)
+        self.assertLess(
+            once_time,
+            per_recipient_time,
+            f"Status change emails to a team of {self.TEAM_SIZE}: "
+            f"{per_recipient_time * 1e6:.0f}us rendering per recipient, "
+            f"{once_time * 1e6:.0f}us rendering once",
+        )
+
+
+class OrderNotificationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.team = Team.objects.create()
+        cls.users = []
+        for i in range(2):
+            user = User.objects.create_user(
+                username=f"user{i}@bar.com",
+                email=f"user{i}@bar.com",
+                first_name=f"User {i}",
+            )
+            Profile.objects.create(user=user, team=cls.team)
+            cls.users.append(user)
+
+    def _order(self, order_id, status):
+        return {
+            "id": order_id,
+            "team_id": self.team.id,
+            "team_code": self.team.team_code,
+            "status": status,
+        }
+
+    def _age(self, seconds):
+        OrderNotification.objects.update(
+            created_at=timezone.now() - timedelta(seconds=seconds)
+        )
+
+    def test_admin_digest(self):
+        OrderDetailView.queue_status_change_emails(
+            [self._order(1, "Ready for Pickup"), self._order(2, "Cancelled")]
+        )
+        self.assertEqual(queue_due_notifications(), 0)
+
+        self._age(settings.ADMIN_NOTIFICATION_DIGEST_INTERVAL)
+        now = timezone.now()
+        self.assertEqual(queue_admin_digest(now), 1)
+        (email,) = [email.to_message() for email in OutboxEmail.objects.all()]
+        self.assertEqual(email.to, [settings.HSS_ADMIN_EMAIL])
+        self.assertIn("2 Hardware Notifications", email.subject)
+        self.assertIn("Order #1", email.body)
+        self.assertIn("Order #2", email.body)
+
+        # Kept as a log once emailed
+        self.assertEqual(
+            OrderNotification.objects.filter(audience="Admins", emailed_at=now).count(),
+            2,
+        )
+        self.assertEqual(queue_admin_digest(timezone.now(), force=True), 0)
+
+    def test_team_status_changes_coalesced(self):
+        for status in ("Ready for Pickup", "Picked Up"):
+            OrderDetailView.queue_status_change_emails([self._order(1, status)])
+        self.assertEqual(queue_team_notifications(timezone.now()), 0)
+
+        self._age(settings.TEAM_NOTIFICATION_WINDOW)
+        self.assertEqual(queue_team_notifications(timezone.now()), 2)
+        emails = [email.to_message() for email in OutboxEmail.objects.all()]
+        self.assertEqual(
+            sorted(email.to[0] for email in emails),
+            sorted(user.email for user in self.users),
+        )
+        for email in emails:
+            self.assertIn(f"Team {self.team.team_code}'s Orders", email.subject)
+            self.assertIn(ORDER_STATUS_MSG["Ready for Pickup"], email.body)
+            self.assertIn(ORDER_STATUS_MSG["Picked Up"], email.body)
+        self.assertIn("User 0", emails[0].body + emails[1].body)
+        self.assertFalse(
+            OrderNotification.objects.filter(
+                audience="Team", emailed_at__isnull=True
+            ).exists()
+        )
+
+    def test_single_team_status_change(self):
+        OrderDetailView.queue_status_change_emails([self._order(1, "Picked Up")])
+        self.assertEqual(queue_team_notifications(timezone.now(), force=True), 2)
+        email = OutboxEmail.objects.first().to_message()
+        self.assertEqual(
+            email.subject,
+            f"Order #1 for Team {self.team.team_code} "
+            f"{ORDER_STATUS_MSG['Picked Up']} - {settings.HACKATHON_NAME}",
+        )
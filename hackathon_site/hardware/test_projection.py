@@ -0,0 +1,215 @@
+import json
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+
+from event.models import Team
+from hackathon_site.tests import SetupUserMixin, benchmark
+from hardware.models import Category, Hardware, Order, OrderItem
+from hardware.serializers import (
+    HardwareSerializer,
+    OrderItemListSerializer,
+    OrderListSerializer,
+)
+
+
+class ProjectionTestCase(SetupUserMixin, TestCase):
+    """
+    The projections give the same representations as the serializers
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.request = APIRequestFactory().get("/api/hardware/")
+        self.sensors = Category.objects.create(name="Sensors", max_per_team=4)
+        self.boards = Category.objects.create(name="Boards")
+        self.hardware = Hardware.objects.create(
+            name="Arduino",
+            model_number="A000066",
+            manufacturer="Arduino",
+            datasheet="https://example.com/datasheet.pdf",
+            quantity_available=5,
+            max_per_team=2,
+            picture="uploads/hardware/pictures/arduino.png",
+            image_url="https://example.com/arduino.png",
+        )
+        self.hardware.categories.add(self.sensors, self.boards)
+        self.other_hardware = Hardware.objects.create(name="Wire", quantity_available=3)
+
+        team = Team.objects.create()
+        self.order = Order.objects.create(
+            status="Submitted",
+            team=team,
+            request={"hardware": [{"id": self.hardware.id, "quantity": 2}]},
+        )
+        OrderItem.objects.create(order=self.order, hardware=self.hardware)
+        OrderItem.objects.create(
+            order=self.order,
+            hardware=self.other_hardware,
+            part_returned_health="Healthy",
+        )
+        # An order whose team was deleted, without items
+        Order.objects.create(status="Cancelled", request={"hardware": []})
+
+    def assertSameRepresentations(self, serializer_class, queryset, context=None):
+        context = {"request": self.request, **(context or {})}
+        serializer = serializer_class(context=context)
+        self.assertTrue(serializer.can_project())
+        projected = serializer.to_representations(list(serializer.project(queryset)))
+        serialized = serializer_class(queryset, many=True, context=context).data
+        # Dumped to also compare the order of the fields
+        self.assertEqual(json.dumps(projected), json.dumps(serialized))
+        return projected
+
+    def test_hardware(self):
+        projected = self.assertSameRepresentations(
+            HardwareSerializer, Hardware.objects.order_by("id")
+        )
+        self.assertEqual(
+            projected[0]["picture"],
+            "http://testserver/media/uploads/hardware/pictures/arduino.png",
+        )
+        self.assertEqual(projected[0]["categories"], [self.sensors.id, self.boards.id])
+        self.assertEqual(projected[1]["categories"], [])
+
+    def test_hardware_sparse_fields(self):
+        self.assertSameRepresentations(
+            HardwareSerializer,
+            Hardware.objects.order_by("id"),
+            {"fields": ["id", "picture", "categories"], "expand": ["categories"]},
+        )
+
+    def test_orders(self):
+        projected = self.assertSameRepresentations(
+            OrderListSerializer, Order.objects.order_by("id")
+        )
+        self.assertEqual(projected[1]["team_code"], None)
+        self.assertEqual(projected[1]["items"], [])
+
+    def test_order_items(self):
+        self.assertSameRepresentations(
+            OrderItemListSerializer, OrderItem.objects.order_by("id")
+        )
+
+    def test_list_view(self):
+        self._login()
+        view = reverse("api:hardware:hardware-list")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(view)
+        Hardware.objects.create(name="Resistor", quantity_available=3).categories.add(
+            self.sensors
+        )
+
+        # The categories of all the hardware are read at once
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(view)
+        self.assertEqual(
+            response.json()["results"],
+            HardwareSerializer(
+                Hardware.objects.all(),
+                many=True,
+                context={"request": response.wsgi_request},
+            ).data,
+        )
+
+    def test_not_supported(self):
+        serializer = OrderListSerializer(context={"request": self.request})
+        serializer.fields["hardware"] = HardwareSerializer(source="*")
+        self.assertFalse(serializer.can_project())
+
+
+@benchmark
+class ProjectionBenchmarkTestCase(TestCase):
+    """
+    Benchmark of the projections against the serializers they replace in the list
+    views, over NUM_ROWS hardware and NUM_ROWS orders, the default page size.
+    """
+
+    NUM_ROWS = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    REPEAT = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.bulk_create([Category(name=f"Category {i}") for i in range(5)])
+        # bulk_create does not set the ids on sqlite
+        categories = list(Category.objects.order_by("id"))
+        Hardware.objects.bulk_create(
+            [
+                Hardware(
+                    name=f"Hardware {i}",
+                    model_number=f"M{i}",
+                    manufacturer="Manufacturer",
+                    datasheet="https://example.com/datasheet.pdf",
+                    quantity_available=10,
+                    notes="Notes",
+                    picture=f"uploads/hardware/pictures/{i}.png",
+                )
+                for i in range(cls.NUM_ROWS)
+            ]
+        )
+        hardware = list(Hardware.objects.order_by("id"))
+        Hardware.categories.through.objects.bulk_create(
+            [
+                Hardware.categories.through(
+                    hardware_id=item.id, category_id=categories[i % 5].id
+                )
+                for (i, item) in enumerate(hardware)
+            ]
+        )
+        team = Team.objects.create()
+        Order.objects.bulk_create(
+            [
+                Order(status="Submitted", team=team, request={"hardware": []})
+                for _ in range(cls.NUM_ROWS)
+            ]
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, hardware=hardware[i])
+                for order in Order.objects.all()
+                for i in range(3)
+            ]
+        )
+
+    def _time(self, serialize):
+        serialize()
+        start = time.perf_counter()
+        for _ in range(self.REPEAT):
+            data = serialize()
+        self.assertEqual(len(data), self.NUM_ROWS)
+        return (time.perf_counter() - start) / (self.REPEAT * self.NUM_ROWS)
+
+    def _compare(self, serializer_class, queryset):
+        context = {"request": APIRequestFactory().get("/api/hardware/")}
+        serializer_time = self._time(
+            lambda: serializer_class(queryset.all(), many=True, context=context).data
+        )
+
+        def project():
+            serializer = serializer_class(context=context)
+            return serializer.to_representations(list(serializer.project(queryset)))
+
+        projection_time = self._time(project)
+        self.assertLess(
+            projection_time,
+            serializer_time,
+            f"{serializer_class.__name__}: {serializer_time * 1e6:.0f}us per row, "
+            f"{projection_time * 1e6:.0f}us with the projection",
+        )
+
+    def test_benchmark_hardware(self):
+        # The categories are prefetched, unlike in the list view
+        self._compare(
+            HardwareSerializer, Hardware.objects.prefetch_related("categories")
+        )
+
+    def test_benchmark_orders(self):
+        self._compare(
+            OrderListSerializer,
+            Order.objects.select_related("team").prefetch_related("items"),
+        )
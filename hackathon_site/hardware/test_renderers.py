@@ -0,0 +1,138 @@
+import time
+
+import msgpack
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from event.models import Team
+from hackathon_site.renderers import FastJSONRenderer, MessagePackRenderer
+from hackathon_site.tests import SetupUserMixin, benchmark
+from hardware.models import Category, Hardware, Order, OrderItem
+
+
+class HardwareRenderersTestCase(SetupUserMixin, APITestCase):
+    """
+    Negotiation of the API renderers, and benchmark of the JSON and MessagePack
+    renderers against DRF's JSONRenderer on a page of the hardware list and of the
+    order list.
+    """
+
+    NUM_ROWS = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    REPEAT = 50
+
+    @classmethod
+    def setUpTestData(cls):
+        Category.objects.bulk_create([Category(name=f"Category {i}") for i in range(5)])
+        # bulk_create does not set the ids on sqlite
+        categories = list(Category.objects.order_by("id"))
+        Hardware.objects.bulk_create(
+            [
+                Hardware(
+                    name=f"Hardware {i}",
+                    model_number=f"M{i}",
+                    manufacturer="Manufacturer",
+                    datasheet="https://example.com/datasheet.pdf",
+                    quantity_available=10,
+                    notes="Notes about the hardware",
+                    picture=f"uploads/hardware/pictures/{i}.png",
+                )
+                for i in range(cls.NUM_ROWS)
+            ]
+        )
+        hardware = list(Hardware.objects.order_by("id"))
+        Hardware.categories.through.objects.bulk_create(
+            [
+                Hardware.categories.through(
+                    hardware_id=item.id, category_id=categories[i % 5].id
+                )
+                for (i, item) in enumerate(hardware)
+            ]
+        )
+        team = Team.objects.create()
+        Order.objects.bulk_create(
+            [
+                Order(
+                    status="Submitted",
+                    team=team,
+                    request={"hardware": [{"id": hardware[0].id, "quantity": 3}]},
+                )
+                for _ in range(cls.NUM_ROWS)
+            ]
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, hardware=hardware[i], quantity=1)
+                for order in Order.objects.all()
+                for i in range(3)
+            ]
+        )
+
+    def setUp(self):
+        super().setUp()
+        self._login(
+            Permission.objects.filter(
+                content_type__app_label="hardware", codename="view_order"
+            )
+        )
+
+    def test_json_by_default(self):
+        response = self.client.get(reverse("api:hardware:hardware-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("Accept", response["Vary"])
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_msgpack(self):
+        for params in ({"format": "msgpack"}, {}):
+            response = self.client.get(
+                reverse("api:hardware:order-list"),
+                params,
+                HTTP_ACCEPT="application/msgpack",
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response["Content-Type"], "application/msgpack")
+            self.assertEqual(
+                msgpack.unpackb(response.content),
+                self.client.get(reverse("api:hardware:order-list")).json(),
+            )
+
+    def _time(self, render, data):
+        start = time.perf_counter()
+        for _ in range(self.REPEAT):
+            content = render(data)
+        return ((time.perf_counter() - start) / self.REPEAT, len(content))
+
+    def _compare(self, view):
+        data = self.client.get(reverse(view)).data
+        self.assertEqual(len(data["results"]), self.NUM_ROWS)
+
+        results = [
+            (name, *self._time(renderer.render, data))
+            for (name, renderer) in (
+                ("JSONRenderer", JSONRenderer()),
+                ("FastJSONRenderer", FastJSONRenderer()),
+                ("MessagePackRenderer", MessagePackRenderer()),
+            )
+        ]
+        ((_, json_time, _), (_, fast_json_time, _), _) = results
+        self.assertLess(
+            fast_json_time,
+            json_time,
+            f"Rendered {self.NUM_ROWS} rows of {view}: "
+            + ", ".join(
+                f"{name} {seconds * 1000:.2f}ms, {size} bytes"
+                for (name, seconds, size) in results
+            ),
+        )
+
+    @benchmark
+    def test_benchmark_hardware_list(self):
+        self._compare("api:hardware:hardware-list")
+
+    @benchmark
+    def test_benchmark_order_list(self):
+        self._compare("api:hardware:order-list")
@@ -0,0 +1,224 @@
+import random
+import time
+from unittest import skipIf, skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from hackathon_site.tests import SetupUserMixin, benchmark
+from hardware.models import Category, Hardware
+from hardware.search import search_hardware
+
+postgres_only = skipUnless(
+    connection.vendor == "postgresql",
+    "Full text and trigram search need postgres with the pg_trgm extension",
+)
+
+
+@postgres_only
+class HardwareSearchTestCase(SetupUserMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.microcontrollers = Category.objects.create(name="Microcontrollers")
+        self.sensors = Category.objects.create(name="Sensors")
+        self.arduino = Hardware.objects.create(
+            name="Arduino Uno Rev3",
+            model_number="A000066",
+            manufacturer="Arduino",
+            notes="Comes with a USB cable",
+            quantity_available=5,
+        )
+        self.arduino.categories.add(self.microcontrollers)
+        self.ultrasonic = Hardware.objects.create(
+            name="Ultrasonic Distance Sensor",
+            model_number="HC-SR04",
+            manufacturer="Elecfreaks",
+            quantity_available=5,
+        )
+        self.ultrasonic.categories.add(self.sensors)
+        self.cable = Hardware.objects.create(
+            name="USB Cable", manufacturer="Generic", quantity_available=5
+        )
+        self.view = reverse("api:hardware:hardware-list")
+
+    def _search(self, search):
+        return list(search_hardware(Hardware.objects.all(), search))
+
+    def test_ranked_by_field(self):
+        # A match in the name ranks above a match in the notes
+        self.assertEqual(self._search("usb cable"), [self.cable, self.arduino])
+
+    def test_typo_tolerant(self):
+        self.assertEqual(self._search("arduno"), [self.arduino])
+        self.assertEqual(self._search("ultrasonik"), [self.ultrasonic])
+        self.assertEqual(self._search("HC-SR4"), [self.ultrasonic])
+
+    def test_category_names(self):
+        self.assertEqual(self._search("microcontroller"), [self.arduino])
+
+        self.microcontrollers.name = "Development Boards"
+        self.microcontrollers.save()
+        self.assertEqual(self._search("development boards"), [self.arduino])
+
+        self.arduino.categories.remove(self.microcontrollers)
+        self.assertEqual(self._search("development boards"), [])
+
+    def test_api(self):
+        self._login()
+        response = self.client.get(self.view, {"search": "arduno"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [hardware["id"] for hardware in response.json()["results"]],
+            [self.arduino.id],
+        )
+
+        # An explicit ordering takes over from the relevance
+        response = self.client.get(self.view, {"search": "usb", "ordering": "name"})
+        self.assertEqual(
+            [hardware["id"] for hardware in response.json()["results"]],
+            [self.arduino.id, self.cable.id],
+        )
+
+
+@skipIf(
+    connection.vendor == "postgresql",
+    "The fallback search is only used without postgres",
+)
+class HardwareSearchFallbackTestCase(SetupUserMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.arduino = Hardware.objects.create(
+            name="Arduino Uno Rev3", model_number="A000066", quantity_available=5
+        )
+        self.cable = Hardware.objects.create(name="USB Cable", quantity_available=0)
+        self.view = reverse("api:hardware:hardware-list")
+
+    def _search(self, **params):
+        response = self.client.get(self.view, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_matches_name(self):
+        self._login()
+        self.assertEqual(
+            [hardware["id"] for hardware in self._search(search="arduino")["results"]],
+            [self.arduino.id],
+        )
+        # Without the trigram search, typos and other fields do not match
+        self.assertEqual(self._search(search="arduno")["results"], [])
+        self.assertEqual(self._search(search="A000066")["results"], [])
+
+    def test_facets(self):
+        self._login()
+        data = self._search(search="usb", in_stock="true", facets="true")
+        self.assertEqual(data["results"], [])
+        # Counted over the search, without the stock filter
+        self.assertEqual(data["facets"]["stock"], {"in_stock": 0, "out_of_stock": 1})
+
+    def test_search_vector_not_maintained(self):
+        category = Category.objects.create(name="Microcontrollers")
+        self.arduino.categories.add(category)
+        category.name = "Development Boards"
+        category.save()
+
+        self.arduino.refresh_from_db()
+        self.assertIsNone(self.arduino.search_vector)
+
+
+@benchmark
+@postgres_only
+class HardwareSearchBenchmarkTestCase(TestCase):
+    """
+    Benchmark of the hardware search over a synthetic catalog of NUM_HARDWARE parts,
+    against the case-insensitive match on the name it replaces. Run against a
+    postgres database.
+    """
+
+    NUM_HARDWARE = 10000
+    NUM_CATEGORIES = 50
+    SEARCHES = ["arduino", "ultrasonic sensor", "resistr", "HC-SR04", "servo motor"]
+    REPEAT = 5
+    # Upper bound on the mean time per search, loose enough for a laptop
+    MAX_SEARCH_SECONDS = 0.25
+
+    WORDS = [
+        "arduino",
+        "raspberry",
+        "ultrasonic",
+        "sensor",
+        "servo",
+        "motor",
+        "resistor",
+        "capacitor",
+        "breadboard",
+        "display",
+        "camera",
+        "relay",
+        "battery",
+        "joystick",
+        "speaker",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(0)
+        categories = Category.objects.bulk_create(
+            [
+                Category(name=f"Category {rng.choice(cls.WORDS)} {i}")
+                for i in range(cls.NUM_CATEGORIES)
+            ]
+        )
+        Hardware.objects.bulk_create(
+            [
+                Hardware(
+                    name=" ".join(rng.sample(cls.WORDS, 3)) + f" {i}",
+                    model_number=f"HC-SR{i:04d}",
+                    manufacturer=rng.choice(["Adafruit", "Sparkfun", "Elecfreaks"]),
+                    notes=" ".join(rng.choices(cls.WORDS, k=10)),
+                    quantity_available=10,
+                )
+                for i in range(cls.NUM_HARDWARE)
+            ],
+            batch_size=1000,
+        )
+        Hardware.categories.through.objects.bulk_create(
+            [
+                Hardware.categories.through(
+                    hardware_id=hardware_id, category_id=rng.choice(categories).id
+                )
+                for hardware_id in Hardware.objects.values_list("id", flat=True)
+            ],
+            batch_size=1000,
+        )
+        Hardware.objects.all().update_search_vector()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE hardware_hardware")
+
+    def _time(self, search_queryset):
+        start = time.perf_counter()
+        for _ in range(self.REPEAT):
+            for search in self.SEARCHES:
+                # The first page, as served by the API
+                list(search_queryset(search)[:100])
+        return (time.perf_counter() - start) / (self.REPEAT * len(self.SEARCHES))
+
+    def test_benchmark(self):
+        search_time = self._time(
+            lambda search: search_hardware(Hardware.objects.all(), search)
+        )
+        icontains_time = self._time(
+            lambda search: Hardware.objects.filter(name__icontains=search).order_by(
+                "id"
+            )
+        )
+        self.assertLess(
+            search_time,
+            self.MAX_SEARCH_SECONDS,
+            f"Searched {self.NUM_HARDWARE} hardware in {search_time * 1000:.1f}ms on "
+            f"average, {icontains_time * 1000:.1f}ms with icontains on the name",
+        )
+        # The typo still finds resistors, which icontains does not
+        self.assertTrue(search_hardware(Hardware.objects.all(), "resistr").exists())
+        self.assertFalse(Hardware.objects.filter(name__icontains="resistr").exists())
@@ -1,8 +1,33 @@
-from django.test import TestCase
+import asyncio
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.core import mail
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from rest_framework import serializers
 
-from hardware.models import Hardware, Category, Order, OrderItem, Incident
-from event.models import Team
+from hardware.models import (
+    Hardware,
+    Category,
+    Order,
+    OrderItem,
+    Incident,
+    OrderNotification,
+    OrderTicket,
+)
+from event.models import OutboxEmail, Team, Profile, User
+from event.outbox import deliver_pending
+from hardware.event_stream import EventHub, EventStreamApplication
+from hardware.events import EVENTS_CHANNEL
+from hardware.notifications import queue_due_notifications
+from hardware.order_queue import get_next_batch
+from hardware.serializers import OrderChangeSerializer, OrderTicketSerializer
+from hackathon_site.tests import SetupUserMixin
 from hardware.serializers import (
     HardwareSerializer,
     CategorySerializer,
@@ -188,6 +213,92 @@ class HardwareQuantityRemainingTestCase(TestCase):
         self.assertEqual(hardware_serializer.data["quantity_remaining"], 4)
 
 
+class HardwareStockCountersTestCase(TestCase):
+    def setUp(self):
+        self.hardware = Hardware.objects.create(
+            name="name",
+            model_number="model",
+            manufacturer="manufacturer",
+            datasheet="/datasheet/location/",
+            quantity_available=4,
+            max_per_team=1,
+            picture="/picture/location",
+        )
+        self.team = Team.objects.create()
+        self.order = Order.objects.create(
+            status="Submitted",
+            team=self.team,
+            request={"hardware": [{"id": 1, "quantity": 2}]},
+        )
+
+    def test_new_hardware_has_full_stock(self):
+        self.assertEqual(self.hardware.quantity_checked_out, 0)
+        self.assertEqual(self.hardware.quantity_remaining, 4)
+
+    def test_order_item_created_and_deleted(self):
+        order_item = OrderItem.objects.create(order=self.order, hardware=self.hardware)
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_checked_out, 1)
+        self.assertEqual(self.hardware.quantity_remaining, 3)
+
+        order_item.delete()
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_checked_out, 0)
+        self.assertEqual(self.hardware.quantity_remaining, 4)
+
+    def test_order_cancelled(self):
+        OrderItem.objects.create(order=self.order, hardware=self.hardware)
+        OrderItem.objects.create(order=self.order, hardware=self.hardware)
+
+        self.order.status = "Cancelled"
+        self.order.save()
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 4)
+
+    def test_quantity_available_changed(self):
+        OrderItem.objects.create(order=self.order, hardware=self.hardware)
+
+        # Edit a stale instance, as the admin would
+        hardware = Hardware.objects.get(pk=self.hardware.pk)
+        OrderItem.objects.create(order=self.order, hardware=self.hardware)
+        hardware.quantity_available = 10
+        hardware.save()
+
+        self.assertEqual(hardware.quantity_checked_out, 2)
+        self.assertEqual(hardware.quantity_remaining, 8)
+
+    def test_update_stock_after_bulk_create(self):
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=self.order, hardware=self.hardware) for _ in range(3)]
+        )
+        Hardware.objects.filter(pk=self.hardware.pk).update_stock()
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_checked_out, 3)
+        self.assertEqual(self.hardware.quantity_remaining, 1)
+
+    def test_reconcile_command(self):
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=self.order, hardware=self.hardware) for _ in range(3)]
+        )
+
+        out = StringIO()
+        call_command("reconcile_hardware_stock", "--dry-run", stdout=out)
+        self.assertIn(f"Hardware {self.hardware.id} (name)", out.getvalue())
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 4)
+
+        out = StringIO()
+        call_command("reconcile_hardware_stock", stdout=out)
+        self.assertIn("Corrected 1 hardware stock counter(s).", out.getvalue())
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_checked_out, 3)
+        self.assertEqual(self.hardware.quantity_remaining, 1)
+
+        out = StringIO()
+        call_command("reconcile_hardware_stock", stdout=out)
+        self.assertIn("All hardware stock counters match.", out.getvalue())
+
+
 class CategorySerializerTestCase(TestCase):
     def setUp(self):
         self.category = Category.objects.create(name="category", max_per_team=4)
@@ -279,6 +390,7 @@ class IncidentSerializerTestCase(TestCase):
                 "hardware": 1,
                 "order": 1,
                 "part_returned_health": "Healthy",
+                "quantity": 1,
             },
             "team_id": 1,
             "created_at": serializers.DateTimeField().to_representation(
@@ -363,11 +475,13 @@ class OrderListSerializerTestCase(TestCase):
                     "id": item_1.id,
                     "part_returned_health": "Healthy",
                     "hardware_id": self.hardware.id,
+                    "quantity": 1,
                 },
                 {
                     "id": item_2.id,
                     "part_returned_health": None,
                     "hardware_id": self.other_hardware.id,
+                    "quantity": 1,
                 },
             ],
             "created_at": serializers.DateTimeField().to_representation(
@@ -381,3 +495,384 @@ class OrderListSerializerTestCase(TestCase):
             },
         }
         self.assertEqual(order_serializer, expected_response)
+
+
+class OrderQueueTestCase(TestCase):
+    def setUp(self):
+        self.team1 = Team.objects.create()
+        self.team2 = Team.objects.create()
+        self.users = {}
+        for team in (self.team1, self.team2):
+            self.users[team] = User.objects.create_user(
+                username=f"{team.team_code}@email.com",
+                email=f"{team.team_code}@email.com",
+                password="foobar123",
+            )
+            Profile.objects.create(user=self.users[team], team=team)
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=3, max_per_team=3
+        )
+
+    def _ticket(self, team, quantity=1):
+        return OrderTicket.objects.create(
+            team=team,
+            requester=self.users[team],
+            request=[{"id": self.hardware.id, "quantity": quantity}],
+        )
+
+    def test_next_batch_round_robin_between_teams(self):
+        tickets = [
+            self._ticket(self.team1),
+            self._ticket(self.team1),
+            self._ticket(self.team1),
+            self._ticket(self.team2),
+        ]
+        self.assertEqual(
+            get_next_batch(3), [tickets[0].id, tickets[3].id, tickets[1].id]
+        )
+
+    def test_queue_position_follows_round_robin(self):
+        tickets = [
+            self._ticket(self.team1),
+            self._ticket(self.team1),
+            self._ticket(self.team2),
+        ]
+        self.assertEqual(
+            [
+                OrderTicketSerializer(ticket).data["queue_position"]
+                for ticket in tickets
+            ],
+            [1, 3, 2],
+        )
+
+    def test_process_batch(self):
+        completed_ticket = self._ticket(self.team1, 2)
+        partial_ticket = self._ticket(self.team2, 2)
+        rejected_ticket = self._ticket(self.team1, 2)
+
+        out = StringIO()
+        call_command("process_order_queue", "--once", stdout=out)
+        self.assertIn("Processed 3 ticket(s)", out.getvalue())
+        self.assertIn("0 still queued", out.getvalue())
+
+        completed_ticket.refresh_from_db()
+        self.assertEqual(completed_ticket.status, "Completed")
+        self.assertEqual(
+            completed_ticket.response,
+            {
+                "order_id": completed_ticket.order_id,
+                "hardware": [
+                    {"hardware_id": self.hardware.id, "quantity_fulfilled": 2}
+                ],
+                "errors": [],
+            },
+        )
+        self.assertIsNotNone(completed_ticket.processed_at)
+
+        partial_ticket.refresh_from_db()
+        self.assertEqual(partial_ticket.status, "Completed")
+        self.assertEqual(
+            partial_ticket.response["hardware"],
+            [{"hardware_id": self.hardware.id, "quantity_fulfilled": 1}],
+        )
+
+        rejected_ticket.refresh_from_db()
+        self.assertEqual(rejected_ticket.status, "Rejected")
+        self.assertIsNone(rejected_ticket.order)
+        self.assertEqual(
+            rejected_ticket.response,
+            {
+                "errors": [
+                    "Maximum number of items for Hardware hardware is reached (limit of 3 per team)"
+                ]
+            },
+        )
+
+        self.hardware.refresh_from_db()
+        self.assertEqual(self.hardware.quantity_remaining, 0)
+        self.assertEqual(Order.objects.count(), 2)
+        # One email to the team member per placed order, and one notification to the
+        # admins, sent together in a digest
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+        self.assertEqual(
+            OrderNotification.objects.filter(
+                audience="Admins", emailed_at__isnull=True
+            ).count(),
+            2,
+        )
+        queue_due_notifications(force=True)
+        deliver_pending()
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class OrderAdminStatusActionsTestCase(SetupUserMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+        self.user.user_permissions.add(
+            *Permission.objects.filter(
+                content_type__app_label="hardware",
+                codename__in=("view_order", "change_order"),
+            )
+        )
+        self.team = Team.objects.create()
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=5, max_per_team=5
+        )
+        self.changelist = reverse("admin:hardware_order_changelist")
+
+    def _create_order(self, status):
+        order = Order.objects.create(
+            status=status,
+            team=self.team,
+            request={"hardware": [{"id": self.hardware.id, "quantity": 1}]},
+        )
+        OrderItem.objects.create(order=order, hardware=self.hardware)
+        return order
+
+    def test_mark_cancelled(self):
+        self._login()
+        submitted_order = self._create_order("Submitted")
+        returned_order = self._create_order("Returned")
+
+        response = self.client.post(
+            self.changelist,
+            {
+                "action": "mark_cancelled",
+                "_selected_action": [submitted_order.id, returned_order.id],
+            },
+            follow=True,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Changed the status of 1 order(s) to Cancelled.")
+        self.assertContains(
+            response,
+            f"Order #{returned_order.id}: Cannot change the status for this order.",
+        )
+
+        submitted_order.refresh_from_db()
+        returned_order.refresh_from_db()
+        self.assertEqual(submitted_order.status, "Cancelled")
+        self.assertEqual(returned_order.status, "Returned")
+        self.hardware.refresh_from_db()
+        # Only the item of the cancelled order is back in stock
+        self.assertEqual(self.hardware.quantity_remaining, 4)
+        queue_due_notifications(force=True)
+        deliver_pending()
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class OrderAdminPickListTestCase(SetupUserMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+        self.view = reverse("admin:hardware-order-pick-list")
+        self.team = Team.objects.create(team_code="AAAAA")
+        self.hardware = Hardware.objects.create(
+            name="Resistor", model_number="R1", quantity_available=10
+        )
+        order = Order.objects.create(
+            status="Submitted",
+            team=self.team,
+            request={"hardware": [{"id": self.hardware.id, "quantity": 3}]},
+        )
+        OrderItem.objects.create(order=order, hardware=self.hardware, quantity=3)
+
+    def test_permission_denied(self):
+        self._login()
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, 403)
+
+    def test_printable_pick_list(self):
+        self._login()
+        self.user.user_permissions.add(
+            Permission.objects.get(
+                content_type__app_label="hardware", codename="view_order"
+            )
+        )
+        response = self.client.get(self.view)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Pick List: Submitted Orders")
+        self.assertContains(response, "3 item(s) of 1 hardware to pull.")
+        self.assertContains(response, "AAAAA")
+
+        response = self.client.get(self.view, {"status": "Submitted", "format": "csv"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn(
+            f"{self.hardware.id},Resistor,R1,,7,3,AAAAA,3,1",
+            response.content.decode().splitlines(),
+        )
+
+
+@override_settings(HARDWARE_EVENTS_ENABLED=True)
+class HardwareEventsPublishTestCase(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create()
+        self.hardware = Hardware.objects.create(
+            name="hardware", quantity_available=5, max_per_team=5
+        )
+        self.order = Order.objects.create(
+            team=self.team,
+            request={"hardware": [{"id": self.hardware.id, "quantity": 2}]},
+        )
+        OrderItem.objects.create(order=self.order, hardware=self.hardware, quantity=2)
+
+    def _published_events(self, mock_get_redis_connection):
+        publish = mock_get_redis_connection.return_value.publish
+        events = []
+        for call in publish.call_args_list:
+            (channel, message) = call[0]
+            self.assertEqual(channel, EVENTS_CHANNEL)
+            events += json.loads(message)
+        return events
+
+    @patch("hardware.events.get_redis_connection")
+    def test_published_after_commit(self, mock_get_redis_connection):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.order.status = "Cancelled"
+            self.order.save()
+        mock_get_redis_connection.return_value.publish.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        events = self._published_events(mock_get_redis_connection)
+        self.assertIn(
+            {
+                "type": "order",
+                "id": self.order.id,
+                "team_id": self.team.id,
+                "status": "Cancelled",
+            },
+            events,
+        )
+        self.assertIn(
+            {"type": "hardware", "id": self.hardware.id, "quantity_remaining": 5},
+            events,
+        )
+
+    @patch("hardware.events.get_redis_connection")
+    def test_bulk_status_changes(self, mock_get_redis_connection):
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderChangeSerializer.change_statuses({self.order.id: "Ready for Pickup"})
+        self.assertIn(
+            {
+                "type": "order",
+                "id": self.order.id,
+                "team_id": self.team.id,
+                "status": "Ready for Pickup",
+            },
+            self._published_events(mock_get_redis_connection),
+        )
+
+    @patch("hardware.events.get_redis_connection")
+    def test_stream_disabled(self, mock_get_redis_connection):
+        with self.settings(HARDWARE_EVENTS_ENABLED=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.order.status = "Cancelled"
+                self.order.save()
+        mock_get_redis_connection.assert_not_called()
+
+
+class EventStreamApplicationTestCase(TestCase):
+    def setUp(self):
+        self.team = Team.objects.create()
+        self.user = User.objects.create_user(
+            username="foo@bar.com", password="hellothere31415"
+        )
+        Profile.objects.create(user=self.user, team=self.team)
+        self.client.login(username="foo@bar.com", password="hellothere31415")
+        self.hub = EventHub(listen=False)
+        self.application = EventStreamApplication(None, hub=self.hub)
+
+    def _scope(self, method="GET", logged_in=True):
+        headers = []
+        if logged_in:
+            session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+            headers.append(
+                (b"cookie", f"{settings.SESSION_COOKIE_NAME}={session_key}".encode())
+            )
+        return {
+            "type": "http",
+            "method": method,
+            "path": "/api/hardware/events/",
+            "root_path": "",
+            "query_string": b"",
+            "headers": headers,
+        }
+
+    async def _open_stream(self, scope):
+        received = asyncio.Queue()
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        stream = asyncio.ensure_future(self.application(scope, received.get, send))
+        for _ in range(100):
+            if self.hub.queues or stream.done():
+                break
+            await asyncio.sleep(0.01)
+        return (stream, received, sent)
+
+    @staticmethod
+    def _body(sent):
+        return b"".join(
+            message["body"]
+            for message in sent
+            if message["type"] == "http.response.body"
+        ).decode()
+
+    async def test_events_filtered_by_team(self):
+        (stream, received, sent) = await self._open_stream(self._scope())
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), sent[0]["headers"])
+
+        hardware_event = {"type": "hardware", "id": 1, "quantity_remaining": 3}
+        team_order_event = {
+            "type": "order",
+            "id": 1,
+            "team_id": self.team.id,
+            "status": "Ready for Pickup",
+        }
+        other_order_event = {
+            "type": "order",
+            "id": 2,
+            "team_id": self.team.id + 1,
+            "status": "Cancelled",
+        }
+        self.hub.dispatch([hardware_event, other_order_event, team_order_event])
+        await asyncio.sleep(0.05)
+        await received.put({"type": "http.disconnect"})
+        await asyncio.wait_for(stream, timeout=1)
+
+        self.assertEqual(
+            self._body(sent),
+            "retry: 5000\n\n"
+            f"event: hardware\ndata: {json.dumps(hardware_event)}\n\n"
+            f"event: order\ndata: {json.dumps(team_order_event)}\n\n",
+        )
+        self.assertEqual(self.hub.queues, set())
+
+    async def test_slow_client_disconnected(self):
+        (stream, received, sent) = await self._open_stream(self._scope())
+        queue = next(iter(self.hub.queues))
+        # Overflow the queue before the stream gets to read from it
+        for _ in range(queue.maxsize + 1):
+            self.hub.dispatch([{"type": "hardware", "id": 1, "quantity_remaining": 1}])
+        await asyncio.wait_for(stream, timeout=1)
+        self.assertEqual(sent[-1], {"type": "http.response.body", "body": b""})
+        self.assertEqual(self.hub.queues, set())
+
+    async def test_not_logged_in(self):
+        (stream, received, sent) = await self._open_stream(self._scope(logged_in=False))
+        await asyncio.wait_for(stream, timeout=1)
+        self.assertEqual(sent[0]["status"], 401)
+        self.assertEqual(self.hub.queues, set())
+
+    async def test_method_not_allowed(self):
+        (stream, received, sent) = await self._open_stream(self._scope(method="POST"))
+        await asyncio.wait_for(stream, timeout=1)
+        self.assertEqual(sent[0]["status"], 405)
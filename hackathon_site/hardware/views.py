@@ -1,31 +1,55 @@
 import logging
 
 from django.conf import settings
-from django.core import mail
-from django.core.mail import send_mail
 from django_filters import rest_framework as filters
 from django.db import transaction
 from django.http import HttpResponseServerError
 from drf_yasg.utils import swagger_auto_schema
-from django.template.loader import render_to_string
 
 from rest_framework import generics, mixins, status, permissions
+from rest_framework.settings import api_settings
 from rest_framework.response import Response
 from rest_framework.filters import SearchFilter, OrderingFilter
 
-from event.models import Profile
+from event.models import OutboxEmail, Profile, Team as TeamEvent
+from event.notifications import Notification
 from event.permissions import UserHasProfile, FullDjangoModelPermissions, UserIsAdmin
+from hackathon_site.sparse_fields import SparseFieldsViewMixin
 from hardware.api_filters import (
     HardwareFilter,
+    HardwareSearchFilter,
     OrderFilter,
     IncidentFilter,
     OrderItemFilter,
 )
-from hardware.models import Hardware, Category, Order, Incident, OrderItem
+from hardware.catalog_cache import cached_catalog_response
+from hardware.changes import (
+    CHANGE_LOG_PERMISSIONS,
+    get_changes,
+    get_current_cursor,
+)
+from hardware.etags import conditional_response
+from hardware.facets import get_hardware_facets
+from hardware.idempotency import idempotent
+from hardware.notifications import admin_notification, status_change_notification
+from hardware.pagination import LimitOffsetOrKeysetPagination
+from hardware.pick_list import get_pick_list
+from hardware.projection import ProjectionListViewMixin
+from hardware.renderers import PickListCSVRenderer
+from hardware.models import (
+    Hardware,
+    Category,
+    Order,
+    Incident,
+    OrderItem,
+    OrderNotification,
+    OrderTicket,
+)
 
 from hardware.serializers import (
     CategorySerializer,
     HardwareSerializer,
+    HardwareListQuerySerializer,
     IncidentSerializer,
     IncidentPatchSerializer,
     IncidentCreateSerializer,
@@ -36,6 +60,16 @@ from hardware.serializers import (
     OrderItemListSerializer,
     OrderItemReturnSerializer,
     OrderItemReturnResponseSerializer,
+    OrderItemBulkReturnResponseSerializer,
+    OrderCheckSerializer,
+    OrderCheckResponseSerializer,
+    OrderTicketSerializer,
+    OrderBulkStatusChangeSerializer,
+    OrderBulkStatusChangeResponseSerializer,
+    PickListQuerySerializer,
+    PickListSerializer,
+    ChangeListQuerySerializer,
+    ChangeListSerializer,
 )
 
 logger = logging.getLogger(__name__)
@@ -55,29 +89,70 @@ ORDER_STATUS_CLOSING_MSG = {
 }
 
 
-class HardwareListView(mixins.ListModelMixin, generics.GenericAPIView):
+class HardwareListView(
+    SparseFieldsViewMixin,
+    ProjectionListViewMixin,
+    mixins.ListModelMixin,
+    generics.GenericAPIView,
+):
     queryset = Hardware.objects.all()
     serializer_class = HardwareSerializer
 
-    filter_backends = (filters.DjangoFilterBackend, SearchFilter, OrderingFilter)
+    filter_backends = (
+        filters.DjangoFilterBackend,
+        HardwareSearchFilter,
+        OrderingFilter,
+    )
     filterset_class = HardwareFilter
     search_fields = ("name",)
     ordering_fields = ("name", "quantity_remaining")
-
+    # Left out of the queryset the facets are counted over
+    facet_filters = ("category_ids", "in_stock")
+
+    def get_facet_queryset(self):
+        """
+        The hardware the facets are counted over: the hardware matching the search
+        and filters of the request, except for the category and stock filters, so
+        that the counts show how many results selecting each of them would give.
+        """
+        query_params = self.request.query_params.copy()
+        for name in self.facet_filters:
+            query_params.pop(name, None)
+        queryset = self.filterset_class(
+            query_params, queryset=self.get_queryset(), request=self.request
+        ).qs
+        return HardwareSearchFilter().filter_queryset(self.request, queryset, self)
+
+    @swagger_auto_schema(query_serializer=HardwareListQuerySerializer)
+    @conditional_response
+    @cached_catalog_response
     def get(self, request, *args, **kwargs):
-        return self.list(request, *args, **kwargs)
+        """
+        List the hardware. With ?facets=true, the response also has the hardware
+        counts per category and per stock state under "facets".
+        """
+        query_serializer = HardwareListQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        response = self.list(request, *args, **kwargs)
+        if query_serializer.validated_data["facets"]:
+            response.data["facets"] = get_hardware_facets(self.get_facet_queryset())
+        return response
 
 
 class HardwareDetailView(mixins.RetrieveModelMixin, generics.GenericAPIView):
     queryset = Hardware.objects.all()
     serializer_class = HardwareSerializer
 
+    @conditional_response
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
 
 class IncidentListView(
-    mixins.ListModelMixin, mixins.CreateModelMixin, generics.GenericAPIView
+    SparseFieldsViewMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    generics.GenericAPIView,
 ):
     search_fields = (
         "state",
@@ -90,6 +165,7 @@ class IncidentListView(
     filterset_class = IncidentFilter
     permission_classes = [FullDjangoModelPermissions]
     queryset = Incident.objects.all().select_related("order_item__order__team")
+    pagination_class = LimitOffsetOrKeysetPagination
 
     def get_serializer_class(self):
         if self.request.method == "GET":
@@ -134,13 +210,21 @@ class IncidentDetailView(
             return Response(str(e), status=status.HTTP_400_BAD_REQUEST)
 
 
-class OrderItemListView(mixins.ListModelMixin, generics.GenericAPIView):
+class OrderItemListView(
+    SparseFieldsViewMixin,
+    ProjectionListViewMixin,
+    mixins.ListModelMixin,
+    generics.GenericAPIView,
+):
     search_fields = ("order__team__team_code", "order__id")
     filter_backends = (filters.DjangoFilterBackend, SearchFilter)
     filterset_class = OrderItemFilter
     permission_classes = [FullDjangoModelPermissions]
     queryset = OrderItem.objects.all().select_related("order__team")
     serializer_class = OrderItemListSerializer
+    pagination_class = LimitOffsetOrKeysetPagination
+    # Order items have no creation time, their ids are allocated in creation order
+    keyset_fields = ("id",)
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -150,11 +234,14 @@ class CategoryListView(mixins.ListModelMixin, generics.GenericAPIView):
     queryset = Category.objects.all().prefetch_related("hardware_set")
     serializer_class = CategorySerializer
 
+    @cached_catalog_response
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(
+    SparseFieldsViewMixin, ProjectionListViewMixin, generics.ListAPIView
+):
     queryset = Order.objects.all().select_related("team").prefetch_related("items",)
     serializer_method_classes = {
         "GET": OrderListSerializer,
@@ -165,6 +252,7 @@ class OrderListView(generics.ListAPIView):
     filterset_class = OrderFilter
     ordering_fields = ("created_at",)
     search_fields = ("team__team_code", "id")
+    pagination_class = LimitOffsetOrKeysetPagination
 
     create_order_email_subject_template = (
         "hardware/emails/create_order/create_order_email_subject.txt"
@@ -189,75 +277,112 @@ class OrderListView(generics.ListAPIView):
             return [FullDjangoModelPermissions()]
         return [permissions.IsAuthenticated()]
 
+    @conditional_response
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
-    @transaction.atomic
-    @swagger_auto_schema(responses={201: OrderCreateResponseSerializer})
+    @idempotent
+    @swagger_auto_schema(
+        responses={201: OrderCreateResponseSerializer, 202: OrderTicketSerializer}
+    )
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        create_response = serializer.save()
-        response_serializer = OrderCreateResponseSerializer(data=create_response)
-        if not response_serializer.is_valid():
-            logger.error(response_serializer.error_messages)
-            return HttpResponseServerError()
-        response_data = response_serializer.data
-
-        profiles = Profile.objects.filter(team__exact=request.user.profile.team)
-        connection = mail.get_connection(fail_silently=False)
-        connection.open()
-
-        try:
-            render_to_string_context = {
-                "requester": request.user,
-                "recipient": "Hardware Inventory Admins",
-                "order": response_data,
-            }
-            send_mail(
-                subject=render_to_string(
-                    self.create_order_email_subject_template, render_to_string_context
-                ),
-                message=render_to_string(
-                    self.create_order_email_body_template_admin,
-                    render_to_string_context,
-                ),
-                html_message=render_to_string(
-                    self.create_order_email_body_template_admin,
-                    render_to_string_context,
-                ),
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                connection=connection,
-                recipient_list=[settings.HSS_ADMIN_EMAIL],
+        if settings.HARDWARE_ORDER_QUEUE_ENABLED:
+            return self.enqueue(request, serializer.validated_data)
+
+        # The emails are queued in the transaction which places the order, so that
+        # they are only sent if it commits
+        with transaction.atomic():
+            create_response = serializer.save()
+            response_serializer = OrderCreateResponseSerializer(data=create_response)
+            if not response_serializer.is_valid():
+                logger.error(response_serializer.error_messages)
+                return HttpResponseServerError()
+            response_data = response_serializer.data
+
+            self.queue_order_created_emails(
+                request.user, request.user.profile.team, response_data
             )
-            for profile in profiles:
-                render_to_string_context = {
-                    **render_to_string_context,
-                    "recipient": profile.user,
-                }
-                profile.user.email_user(
-                    subject=render_to_string(
-                        self.create_order_email_subject_template,
-                        render_to_string_context,
-                    ),
-                    message=render_to_string(
-                        self.create_order_email_body_template_participant,
-                        render_to_string_context,
-                    ),
-                    html_message=render_to_string(
-                        self.create_order_email_body_template_participant,
-                        render_to_string_context,
-                    ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    connection=connection,
-                )
-        except Exception as e:
-            logger.error(e)
-            raise e
-        finally:
-            connection.close()
         return Response(response_data, status=status.HTTP_201_CREATED)
 
+    def enqueue(self, request, validated_data):
+        """
+        Accept a validated order into the order queue, unless the queue is full or
+        the team already has as many tickets waiting as it is allowed.
+        """
+        team = request.user.profile.team
+        requested_hardware = OrderCreateSerializer.merge_requests(
+            hardware_requests=validated_data["hardware"]
+        )
+        with transaction.atomic():
+            # Submissions from the same team are serialized by the team lock, which
+            # keeps the number of tickets per team exact
+            TeamEvent.objects.select_for_update().get(pk=team.pk)
+            queued_tickets = OrderTicket.objects.filter(status="Queued")
+            if queued_tickets.count() >= settings.HARDWARE_ORDER_QUEUE_MAX_DEPTH:
+                return Response(
+                    {"detail": "The order queue is full, please try again shortly."},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": "30"},
+                )
+            if (
+                queued_tickets.filter(team=team).count()
+                >= settings.HARDWARE_ORDER_QUEUE_MAX_PER_TEAM
+            ):
+                return Response(
+                    {"detail": "Your team already has an order waiting in the queue."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            ticket = OrderTicket.objects.create(
+                team=team,
+                requester=request.user,
+                request=[
+                    {"id": hardware.id, "quantity": quantity}
+                    for (hardware, quantity) in requested_hardware.items()
+                ],
+            )
+        return Response(
+            OrderTicketSerializer(ticket).data, status=status.HTTP_202_ACCEPTED
+        )
+
+    @classmethod
+    def queue_order_created_emails(cls, requester, team, order_data):
+        """
+        Queue the emails about a new order to the team members, and add it to the
+        next digest to the admins.
+        """
+        profiles = Profile.objects.filter(team__exact=team).select_related(
+            "user", "team"
+        )
+        context = {"requester": requester, "order": order_data}
+        admin_notification(
+            cls.create_order_email_subject_template,
+            cls.create_order_email_body_template_admin,
+            context,
+        ).save()
+        participant_notification = Notification(
+            cls.create_order_email_subject_template,
+            cls.create_order_email_body_template_participant,
+            context,
+        )
+        OutboxEmail.objects.queue(
+            participant_notification.to_email(profile.user, [profile.user.email])
+            for profile in profiles
+        )
+
+
+class OrderTicketDetailView(generics.RetrieveAPIView):
+    """
+    Poll the status of an order submitted while the order queue is enabled.
+    """
+
+    serializer_class = OrderTicketSerializer
+    permission_classes = [UserHasProfile]
+
+    def get_queryset(self):
+        return OrderTicket.objects.filter(team_id=self.request.user.profile.team_id)
+
 
 class OrderDetailView(generics.GenericAPIView, mixins.UpdateModelMixin):
     queryset = Order.objects.all()
@@ -274,69 +399,214 @@ class OrderDetailView(generics.GenericAPIView, mixins.UpdateModelMixin):
         "hardware/emails/order_status_change/order_status_change_email_admin_body.html"
     )
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         response = self.partial_update(request, *args, **kwargs)
 
         if "status" in request.data:
-            profiles = Profile.objects.filter(team__exact=response.data["team_id"])
-            connection = mail.get_connection(fail_silently=False)
-            connection.open()
-
-            try:
-                render_to_string_context = {
-                    "recipient": "Hardware Inventory Admins",
-                    "order": response.data,
-                    "order_status_message": ORDER_STATUS_MSG[response.data["status"]],
-                }
-                send_mail(
-                    subject=render_to_string(
-                        self.update_order_email_subject_template,
-                        render_to_string_context,
-                    ),
-                    message=render_to_string(
-                        self.update_order_email_template_admin,
-                        render_to_string_context,
-                    ),
-                    html_message=render_to_string(
-                        self.update_order_email_template_admin,
-                        render_to_string_context,
-                    ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    connection=connection,
-                    recipient_list=[settings.HSS_ADMIN_EMAIL],
+            self.queue_status_change_emails(
+                [response.data], ORDER_STATUS_MSG[response.data["status"]]
+            )
+        return response
+
+    @staticmethod
+    def get_status_change_email_order(order):
+        """
+        The data of an Order instance used by the status change emails
+        """
+        return {
+            "id": order.id,
+            "team_id": order.team_id,
+            "team_code": order.team.team_code if order.team else None,
+            "status": order.status,
+        }
+
+    @classmethod
+    def queue_status_change_emails(cls, orders, order_status_message=None):
+        """
+        Add the new status of several orders, given as dicts with their id, team_id,
+        team_code and status, to the next digest to the admins and to the next email
+        to the members of each team. order_status_message defaults to the message of
+        each status.
+        """
+        notifications = []
+        for order in orders:
+            message = order_status_message or ORDER_STATUS_MSG[order["status"]]
+            notifications.append(
+                admin_notification(
+                    cls.update_order_email_subject_template,
+                    cls.update_order_email_template_admin,
+                    {"order": order, "order_status_message": message},
                 )
-                for profile in profiles:
-                    render_to_string_context = {
-                        **render_to_string_context,
-                        "recipient": profile.user,
-                        "order_status_closing_message": ORDER_STATUS_CLOSING_MSG[
-                            response.data["status"]
-                        ],
-                    }
-                    profile.user.email_user(
-                        subject=render_to_string(
-                            self.update_order_email_subject_template,
-                            render_to_string_context,
-                        ),
-                        message=render_to_string(
-                            self.update_order_email_template_participant,
-                            render_to_string_context,
-                        ),
-                        html_message=render_to_string(
-                            self.update_order_email_template_participant,
-                            render_to_string_context,
-                        ),
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        connection=connection,
+            )
+            if order["team_id"] is not None:
+                notifications.append(
+                    status_change_notification(
+                        order["team_id"],
+                        order,
+                        message,
+                        ORDER_STATUS_CLOSING_MSG[order["status"]],
                     )
-            except Exception as e:
-                logger.error(e)
-                raise e
-            finally:
-                connection.close()
+                )
+        OrderNotification.objects.bulk_create(notifications)
+
+
+class OrderBulkStatusView(generics.GenericAPIView):
+    """
+    Change the status of several orders at once. Each order is changed if the
+    transition is allowed, and the result is reported per order.
+    """
+
+    queryset = Order.objects.all()
+    serializer_class = OrderBulkStatusChangeSerializer
+    permission_classes = [FullDjangoModelPermissions]
+
+    @transaction.atomic
+    @swagger_auto_schema(responses={200: OrderBulkStatusChangeResponseSerializer})
+    def patch(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        (results, changed_orders) = OrderChangeSerializer.change_statuses(
+            {
+                order["id"]: order["status"]
+                for order in serializer.validated_data["orders"]
+            }
+        )
+        if changed_orders:
+            OrderDetailView.queue_status_change_emails(
+                [
+                    OrderDetailView.get_status_change_email_order(order)
+                    for order in changed_orders
+                ]
+            )
+        return Response({"orders": results}, status=status.HTTP_200_OK)
+
+
+class OrderPickListView(generics.GenericAPIView):
+    """
+    List the hardware to pull for all orders in a given status, Submitted by
+    default, with the total quantity of each hardware and its quantity per team.
+    Append ?format=csv to download it as CSV.
+    """
+
+    queryset = Order.objects.all()
+    serializer_class = PickListQuerySerializer
+    permission_classes = [FullDjangoModelPermissions]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, PickListCSVRenderer]
+    pagination_class = None
+
+    @swagger_auto_schema(
+        query_serializer=PickListQuerySerializer, responses={200: PickListSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        order_status = serializer.validated_data["status"]
+        response = Response(
+            {"status": order_status, "hardware": get_pick_list(order_status)},
+            status=status.HTTP_200_OK,
+        )
+        if request.accepted_renderer.format == "csv":
+            filename = f"pick-list-{order_status.lower().replace(' ', '-')}.csv"
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
         return response
 
 
+class ChangeListView(generics.GenericAPIView):
+    """
+    Sync the hardware, orders, order items and incidents: returns the objects
+    created or updated, and the ids of the objects deleted, since the cursor given
+    as ?since=, along with the cursor to pass next time. When has_more is set, there
+    are more changes to fetch right away.
+
+    Without ?since=, only returns the current cursor. Clients fetch it before loading
+    the full lists, then sync from it. ?models= limits the sync to a comma-separated
+    list of models, by default all the models the user is allowed to view.
+    """
+
+    serializer_class = ChangeListQuerySerializer
+    change_querysets = {
+        "hardware": (
+            Hardware.objects.all().prefetch_related("categories"),
+            HardwareSerializer,
+        ),
+        "order": (
+            Order.objects.all().select_related("team").prefetch_related("items"),
+            OrderListSerializer,
+        ),
+        "order_item": (
+            OrderItem.objects.all().select_related("order__team"),
+            OrderItemListSerializer,
+        ),
+        "incident": (
+            Incident.objects.all().select_related("order_item__order__team"),
+            IncidentSerializer,
+        ),
+    }
+
+    @swagger_auto_schema(
+        query_serializer=ChangeListQuerySerializer,
+        responses={200: ChangeListSerializer},
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        allowed_models = [
+            model
+            for (model, permission) in CHANGE_LOG_PERMISSIONS.items()
+            if permission is None or request.user.has_perm(permission)
+        ]
+        models = serializer.validated_data.get("models")
+        if models is None:
+            models = allowed_models
+        elif any(model not in allowed_models for model in models):
+            self.permission_denied(request)
+
+        since = serializer.validated_data.get("since")
+        if since is None:
+            return Response(
+                {"cursor": get_current_cursor(), "has_more": False, "changes": {}},
+                status=status.HTTP_200_OK,
+            )
+
+        (cursor, has_more, changes) = get_changes(since, models)
+        for (model, model_changes) in changes.items():
+            (queryset, model_serializer_class) = self.change_querysets[model]
+            # Objects deleted after their last entry in this page are left out,
+            # their tombstone comes with a later page
+            model_changes["changed"] = (
+                model_serializer_class(
+                    queryset.filter(id__in=model_changes["changed"]).order_by("id"),
+                    many=True,
+                    context=self.get_serializer_context(),
+                ).data
+                if model_changes["changed"]
+                else []
+            )
+        return Response(
+            {"cursor": cursor, "has_more": has_more, "changes": changes},
+            status=status.HTTP_200_OK,
+        )
+
+
+class OrderCheckView(generics.GenericAPIView):
+    """
+    Check which of the hardware in a cart could be ordered, and in which quantities,
+    without placing an order. Nothing is written, so the cart can check itself on
+    every change.
+    """
+
+    serializer_class = OrderCheckSerializer
+    permission_classes = [UserHasProfile]
+
+    @swagger_auto_schema(responses={200: OrderCheckResponseSerializer})
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class OrderItemReturnView(generics.GenericAPIView):
     queryset = Order.objects.all().prefetch_related("items",)
     serializer_class = OrderItemReturnSerializer
@@ -352,71 +622,60 @@ class OrderItemReturnView(generics.GenericAPIView):
         "hardware/emails/return_order/return_order_email_admin_body.html"
     )
 
+    @idempotent
     @transaction.atomic
     @swagger_auto_schema(responses={201: OrderItemReturnResponseSerializer})
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         create_response = serializer.save()
-        response_serializer = OrderItemReturnResponseSerializer(data=create_response)
+        if "orders" in create_response:
+            response_serializer = OrderItemBulkReturnResponseSerializer(
+                data=create_response
+            )
+            order_responses = create_response["orders"]
+        else:
+            response_serializer = OrderItemReturnResponseSerializer(
+                data=create_response
+            )
+            order_responses = [create_response]
         if not response_serializer.is_valid():
             logger.error(response_serializer.errors)
             return HttpResponseServerError()
 
-        if len(create_response["returned_items"]) > 0:
-            profiles = Profile.objects.filter(
-                team__team_code=create_response["team_code"]
+        order_responses = [
+            order_response
+            for order_response in order_responses
+            if len(order_response["returned_items"]) > 0
+        ]
+        if order_responses:
+            profiles = list(
+                Profile.objects.filter(
+                    team__team_code=create_response["team_code"]
+                ).select_related("user")
             )
-            connection = mail.get_connection(fail_silently=False)
-            connection.open()
-
-            try:
-                render_to_string_context = {
-                    "requester": request.user,
-                    "recipient": "Hardware Inventory Admins",
-                    "order": create_response,
-                }
-                send_mail(
-                    subject=render_to_string(
+            emails = []
+            admin_notifications = []
+            for order_response in order_responses:
+                context = {"requester": request.user, "order": order_response}
+                admin_notifications.append(
+                    admin_notification(
                         self.return_order_email_subject_template,
-                        render_to_string_context,
-                    ),
-                    message=render_to_string(
                         self.return_order_email_body_template_admin,
-                        render_to_string_context,
-                    ),
-                    html_message=render_to_string(
-                        self.return_order_email_body_template_admin,
-                        render_to_string_context,
-                    ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    connection=connection,
-                    recipient_list=[settings.HSS_ADMIN_EMAIL],
+                        context,
+                    )
                 )
-                for profile in profiles:
-                    render_to_string_context = {
-                        **render_to_string_context,
-                        "recipient": profile.user,
-                    }
-                    profile.user.email_user(
-                        subject=render_to_string(
-                            self.return_order_email_subject_template,
-                            render_to_string_context,
-                        ),
-                        message=render_to_string(
-                            self.return_order_email_body_template_participant,
-                            render_to_string_context,
-                        ),
-                        html_message=render_to_string(
-                            self.return_order_email_body_template_participant,
-                            render_to_string_context,
-                        ),
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        connection=connection,
+                participant_notification = Notification(
+                    self.return_order_email_subject_template,
+                    self.return_order_email_body_template_participant,
+                    context,
+                )
+                emails.extend(
+                    participant_notification.to_email(
+                        profile.user, [profile.user.email]
                     )
-            except Exception as e:
-                logger.error(e)
-                raise e
-            finally:
-                connection.close()
+                    for profile in profiles
+                )
+            OrderNotification.objects.bulk_create(admin_notifications)
+            OutboxEmail.objects.queue(emails)
         return Response(create_response, status=status.HTTP_201_CREATED)
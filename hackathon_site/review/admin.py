@@ -1,8 +1,7 @@
+from django.conf import settings
 from django.contrib import admin, messages
-from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.db.models import Count, Max
-from django.db import transaction
 from django.urls import reverse, path
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
@@ -12,9 +11,14 @@ from import_export.admin import ExportMixin
 from django.http import HttpResponseRedirect
 
 from registration.models import Application
+from review.assignment import get_team_queue, get_teams_to_review
 from review.forms import ReviewForm, ApplicationReviewInlineFormset
 from review.models import Review, TeamReview
-from review.views import MailerView
+from review.views import (
+    DecisionCampaignProgressView,
+    DecisionCampaignStateView,
+    MailerView,
+)
 
 
 class ReviewResource(resources.ModelResource):
@@ -305,6 +309,11 @@ class TeamReviewAdmin(admin.ModelAdmin):
         """
         return False
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if not form.instance.applications.filter(review__isnull=True).exists():
+            get_team_queue().complete(form.instance.id)
+
     def assign_to_team_view(self, request):
         """
         Assign the current user to the next team with no reviewer assigned.
@@ -314,55 +323,28 @@ class TeamReviewAdmin(admin.ModelAdmin):
 
         Each user can be assigned as a reviewer to one team. When that user
         requests a new team, they are unassigned from the previous one. The assignment
-        will expire after 20 minutes.
+        will expire after settings.REVIEW_ASSIGNMENT_TIMEOUT seconds.
+
+        Teams are claimed from a queue in the cache, see review.assignment, which is
+        reloaded from the database every settings.REVIEW_QUEUE_RELOAD_INTERVAL
+        seconds.
         """
 
         if not self.has_change_permission(request):
             raise PermissionDenied
 
-        active_reviewers_set_cache_key = "admin:assign_to_team:active_reviewers"
-
-        def build_reviewer_assignment_cache_key(user_id):
-            """
-            Build a key that stores which team a reviewer is assigned to
-            """
-            return f"admin:assign_to_team:user-{user_id}"
-
-        with transaction.atomic():
-            # Set of reviewers IDs that are currently reviewing
-            active_reviewers = cache.get(active_reviewers_set_cache_key, set())
-
-            # Get a dictionary mapping user id -> assigned team
-            assigned_teams = cache.get_many(
-                [
-                    build_reviewer_assignment_cache_key(user_id)
-                    for user_id in active_reviewers
-                ]
+        team_queue = get_team_queue()
+        if not team_queue.is_loaded():
+            team_queue.reload(
+                get_teams_to_review(), settings.REVIEW_QUEUE_RELOAD_INTERVAL
             )
 
-            current_user_cache_key = build_reviewer_assignment_cache_key(
-                request.user.id
+        while True:
+            team_id = team_queue.claim(
+                request.user.id, settings.REVIEW_ASSIGNMENT_TIMEOUT
             )
-
-            queryset = (
-                self.get_queryset(request)
-                .filter(applications__isnull=False)  # Exclude any teams that are empty
-                # Get any team where at least one application is missing a review
-                .filter(applications__review__isnull=True)
-                .exclude(
-                    id__in=list(assigned_teams.values())
-                )  # Exclude teams that are currently assigned
-                .order_by(
-                    "most_recent_submission"
-                )  # Ascending order, annotated in self.get_queryset
-            )
-
-            team = queryset.first()
-
-            if team is None:
+            if team_id is None:
                 # No more teams left to review
-                cache.delete(current_user_cache_key)
-
                 messages.add_message(
                     request,
                     messages.INFO,
@@ -373,18 +355,15 @@ class TeamReviewAdmin(admin.ModelAdmin):
                 return HttpResponseRedirect(
                     reverse("admin:review_teamreview_changelist")
                 )
-
-            # Assign the user to their team in the cache, 20 minute TTL
-            cache.set(current_user_cache_key, team.id, timeout=60 * 20)
-
-            # Add the user to the set of active reviewers
-            active_reviewers.add(request.user.id)
-
-            # Update the active reviewers cache set, 20 minute TTL
-            cache.set(active_reviewers_set_cache_key, active_reviewers, timeout=60 * 20)
+            # The queue is reloaded periodically, teams reviewed since are skipped
+            if Application.objects.filter(
+                team_id=team_id, review__isnull=True
+            ).exists():
+                break
+            team_queue.complete(team_id)
 
         team_review_page = reverse(
-            "admin:review_teamreview_change", kwargs={"object_id": team.id}
+            "admin:review_teamreview_change", kwargs={"object_id": team_id}
         )
         return HttpResponseRedirect(team_review_page)
 
@@ -401,5 +380,24 @@ class TeamReviewAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(MailerView.as_view(), cacheable=False),
                 name="send-decision-emails",
             ),
+            path(
+                "send-mail/progress/",
+                self.admin_site.admin_view(DecisionCampaignProgressView.as_view()),
+                name="decision-campaign-progress",
+            ),
+            path(
+                "send-mail/<int:pk>/pause/",
+                self.admin_site.admin_view(
+                    DecisionCampaignStateView.as_view(action="pause")
+                ),
+                name="pause-decision-campaign",
+            ),
+            path(
+                "send-mail/<int:pk>/resume/",
+                self.admin_site.admin_view(
+                    DecisionCampaignStateView.as_view(action="resume")
+                ),
+                name="resume-decision-campaign",
+            ),
         ]
         return new_urls + urls
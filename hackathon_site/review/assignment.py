@@ -0,0 +1,248 @@
+import threading
+import time
+
+from django.core.cache import caches
+from django.db.models import Max
+from django_redis import get_redis_connection
+from django_redis.cache import RedisCache
+
+from registration.models import Team
+
+KEY_PREFIX = "admin:assign_to_team:"
+
+# Returns the leases which expired to the queue, then pops the team with the oldest
+# submission for the reviewer, releasing the team they were reviewing
+CLAIM_SCRIPT = """
+local queue, leases, owners, reviewers, scores = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+local user, now, lease = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+
+local function release(team)
+    local score = redis.call("HGET", scores, team)
+    redis.call("ZREM", leases, team)
+    redis.call("HDEL", owners, team)
+    redis.call("HDEL", scores, team)
+    if score then
+        redis.call("ZADD", queue, score, team)
+    end
+end
+
+for _, team in ipairs(redis.call("ZRANGEBYSCORE", leases, "-inf", now)) do
+    local owner = redis.call("HGET", owners, team)
+    if owner and redis.call("HGET", reviewers, owner) == team then
+        redis.call("HDEL", reviewers, owner)
+    end
+    release(team)
+end
+
+local previous = redis.call("HGET", reviewers, user)
+local popped = redis.call("ZPOPMIN", queue)
+if previous and redis.call("HGET", owners, previous) == user then
+    release(previous)
+end
+redis.call("HDEL", reviewers, user)
+if #popped == 0 then
+    return false
+end
+
+local team, score = popped[1], popped[2]
+redis.call("ZADD", leases, now + lease, team)
+redis.call("HSET", owners, team, user)
+redis.call("HSET", scores, team, score)
+redis.call("HSET", reviewers, user, team)
+return team
+"""
+
+# Removes a team from the queue and from the leases, for good
+COMPLETE_SCRIPT = """
+local queue, leases, owners, reviewers, scores = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+local team = ARGV[1]
+
+redis.call("ZREM", queue, team)
+local owner = redis.call("HGET", owners, team)
+if owner and redis.call("HGET", reviewers, owner) == team then
+    redis.call("HDEL", reviewers, owner)
+end
+redis.call("ZREM", leases, team)
+redis.call("HDEL", owners, team)
+redis.call("HDEL", scores, team)
+"""
+
+# Replaces the queue with the teams to review, except those which are leased
+RELOAD_SCRIPT = """
+local queue, owners, scores, loaded = KEYS[1], KEYS[2], KEYS[3], KEYS[4]
+
+redis.call("DEL", queue)
+for i = 2, #ARGV, 2 do
+    local team, score = ARGV[i], ARGV[i + 1]
+    if redis.call("HEXISTS", owners, team) == 1 then
+        redis.call("HSET", scores, team, score)
+    else
+        redis.call("ZADD", queue, score, team)
+    end
+end
+redis.call("SET", loaded, 1, "EX", ARGV[1])
+"""
+
+
+def get_teams_to_review():
+    """
+    (team id, timestamp of the most recent submission) of the teams with at least
+    one application missing a review
+    """
+    return (
+        Team.objects.annotate(most_recent_submission=Max("applications__updated_at"))
+        .filter(applications__isnull=False)
+        .filter(applications__review__isnull=True)
+        .values_list("id", "most_recent_submission")
+    )
+
+
+class RedisTeamQueue:
+    """
+    The teams waiting for a reviewer, in a sorted set scored by their most recent
+    submission, and the teams assigned to reviewers, in a sorted set scored by the
+    expiry of the assignment. Every operation is a script, so concurrent reviewers
+    cannot be given the same team, and claiming the next team takes O(log n).
+    """
+
+    def __init__(self, client, prefix=KEY_PREFIX):
+        self.client = client
+        self.keys = [
+            f"{prefix}{name}"
+            for name in ("queue", "leases", "owners", "reviewers", "scores")
+        ]
+        self.loaded_key = f"{prefix}loaded"
+        self.claim_script = client.register_script(CLAIM_SCRIPT)
+        self.complete_script = client.register_script(COMPLETE_SCRIPT)
+        self.reload_script = client.register_script(RELOAD_SCRIPT)
+
+    def is_loaded(self):
+        return bool(self.client.exists(self.loaded_key))
+
+    def reload(self, teams, timeout):
+        """
+        Replace the queue with teams, pairs of (team id, submission datetime). The
+        queue is loaded for timeout seconds.
+        """
+        args = [timeout]
+        for (team_id, submitted_at) in teams:
+            args.extend((team_id, submitted_at.timestamp()))
+        (queue, _, owners, _, scores) = self.keys
+        self.reload_script(keys=[queue, owners, scores, self.loaded_key], args=args)
+
+    def claim(self, user_id, lease):
+        """
+        Assign the user to the next team for lease seconds, releasing the team they
+        were assigned to. Returns the id of the team, or None if no team is left.
+        """
+        team_id = self.claim_script(keys=self.keys, args=[user_id, time.time(), lease])
+        return None if team_id is None else int(team_id)
+
+    def complete(self, team_id):
+        """
+        Remove a team which does not need to be reviewed anymore.
+        """
+        self.complete_script(keys=self.keys, args=[team_id])
+
+    def delete(self):
+        self.client.delete(*self.keys, self.loaded_key)
+
+
+class CacheTeamQueue:
+    """
+    The same queue as RedisTeamQueue, stored as one value in a cache which is not
+    Redis, such as the local memory cache used in development and tests. Operations
+    are atomic within a process only, which is as far as such a cache is shared.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, cache, prefix=KEY_PREFIX):
+        self.cache = cache
+        self.key = f"{prefix}state"
+
+    def _update(self, update):
+        with self.lock:
+            state = self.cache.get(self.key) or {
+                "queue": {},
+                "leases": {},
+                "reviewers": {},
+                "loaded_until": 0,
+            }
+            result = update(state)
+            self.cache.set(self.key, state, timeout=None)
+        return result
+
+    @staticmethod
+    def _release(state, team_id):
+        (_, _, score) = state["leases"].pop(team_id)
+        state["queue"][team_id] = score
+
+    def is_loaded(self):
+        state = self.cache.get(self.key)
+        return state is not None and state["loaded_until"] > time.time()
+
+    def reload(self, teams, timeout):
+        def update(state):
+            state["queue"] = {}
+            for (team_id, submitted_at) in teams:
+                if team_id in state["leases"]:
+                    (expiry, owner, _) = state["leases"][team_id]
+                    state["leases"][team_id] = (
+                        expiry,
+                        owner,
+                        submitted_at.timestamp(),
+                    )
+                else:
+                    state["queue"][team_id] = submitted_at.timestamp()
+            state["loaded_until"] = time.time() + timeout
+
+        teams = list(teams)
+        self._update(update)
+
+    def claim(self, user_id, lease):
+        def update(state):
+            now = time.time()
+            for (team_id, (expiry, owner, _)) in list(state["leases"].items()):
+                if expiry <= now:
+                    if state["reviewers"].get(owner) == team_id:
+                        del state["reviewers"][owner]
+                    self._release(state, team_id)
+
+            previous = state["reviewers"].pop(user_id, None)
+            team_id = None
+            if state["queue"]:
+                team_id = min(
+                    state["queue"], key=lambda team: (state["queue"][team], team)
+                )
+                score = state["queue"].pop(team_id)
+            (_, owner, _) = state["leases"].get(previous, (None, None, None))
+            if previous is not None and owner == user_id:
+                self._release(state, previous)
+            if team_id is None:
+                return None
+
+            state["leases"][team_id] = (now + lease, user_id, score)
+            state["reviewers"][user_id] = team_id
+            return team_id
+
+        return self._update(update)
+
+    def complete(self, team_id):
+        def update(state):
+            state["queue"].pop(team_id, None)
+            lease = state["leases"].pop(team_id, None)
+            if lease is not None and state["reviewers"].get(lease[1]) == team_id:
+                del state["reviewers"][lease[1]]
+
+        self._update(update)
+
+    def delete(self):
+        self.cache.delete(self.key)
+
+
+def get_team_queue():
+    cache = caches["default"]
+    if isinstance(cache, RedisCache):
+        return RedisTeamQueue(get_redis_connection("default"))
+    return CacheTeamQueue(cache)
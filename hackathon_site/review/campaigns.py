@@ -0,0 +1,157 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from event.notifications import Notification
+from event.outbox import OutboxSender
+from review.models import DecisionCampaign, Review
+
+logger = logging.getLogger(__name__)
+
+
+def get_chunk_interval(sent, emails_per_minute):
+    """
+    Minimum time in seconds to spend on a chunk of sent emails, to send at most
+    emails_per_minute emails per minute. No limit if emails_per_minute is falsy.
+    """
+    if not emails_per_minute:
+        return 0
+    return sent * 60 / emails_per_minute
+
+
+def claim_campaign_chunk(chunk_size):
+    """
+    Claim the next chunk of at most chunk_size reviews of the oldest running
+    campaign which is not claimed by another worker. The campaign and the reviews
+    are leased for settings.DECISION_EMAIL_LEASE_TIME, so that other workers skip
+    them while the emails are sent.
+
+    Returns (campaign, reviews), or None if no campaign is running. The reviews are
+    empty if the campaign has no decision left to send, in which case it is
+    completed.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.DECISION_EMAIL_LEASE_TIME)
+    unleased = Q(lease_until__isnull=True) | Q(lease_until__lte=now)
+    with transaction.atomic():
+        campaign = (
+            DecisionCampaign.objects.select_for_update(skip_locked=True)
+            .filter(unleased, state="Running")
+            .order_by("id")
+            .first()
+        )
+        if campaign is None:
+            return None
+        reviews = list(
+            campaign.get_reviews()
+            .filter(
+                Q(decision_lease_until__isnull=True) | Q(decision_lease_until__lte=now)
+            )
+            .select_for_update(skip_locked=True, of=("self",))[
+                : min(chunk_size, campaign.remaining)
+            ]
+        )
+        if not reviews:
+            # Unless the remaining reviews are being sent by another campaign
+            if not campaign.remaining or not campaign.get_reviews().exists():
+                campaign.state = "Completed"
+                campaign.save()
+            return (campaign, [])
+
+        Review.objects.filter(id__in=[review.id for review in reviews]).update(
+            decision_lease_until=lease_until
+        )
+        campaign.lease_until = lease_until
+        campaign.save()
+    return (campaign, reviews)
+
+
+def record_campaign_chunk(campaign, reviews, sent_review_ids, error=None):
+    """
+    Mark the decisions of the reviews which were emailed as sent, release the
+    leases of the chunk and record the progress of the campaign, which is paused if
+    an email failed. The campaign is read again, to keep its state if it was paused
+    while the chunk was sent.
+    """
+    with transaction.atomic():
+        Review.objects.filter(id__in=sent_review_ids).update(
+            decision_sent_date=timezone.localdate(), decision_lease_until=None
+        )
+        Review.objects.filter(
+            id__in=[review.id for review in reviews if review.id not in sent_review_ids]
+        ).update(decision_lease_until=None)
+
+        campaign = DecisionCampaign.objects.select_for_update().get(id=campaign.id)
+        campaign.sent += len(sent_review_ids)
+        campaign.lease_until = None
+        if error is not None:
+            campaign.state = "Paused"
+            campaign.last_error = repr(error)
+        elif campaign.state == "Running" and not campaign.remaining:
+            campaign.state = "Completed"
+        campaign.save()
+    return campaign
+
+
+def send_campaign_chunk(sender, chunk_size):
+    """
+    Claim the next chunk of emails of the oldest running campaign, send them with
+    sender outside of any transaction, and record the progress of the campaign. The
+    campaign is paused if an email fails.
+
+    Returns (campaign, sent), or None if no campaign is running.
+    """
+    claimed = claim_campaign_chunk(chunk_size)
+    if claimed is None:
+        return None
+    (campaign, reviews) = claimed
+    if not reviews:
+        return (campaign, 0)
+
+    status = campaign.status.lower()
+    notification = Notification(
+        f"review/emails/{status}_email_subject.txt",
+        f"review/emails/{status}_email_body.html",
+        {"dashboard_url": campaign.dashboard_url},
+        recipient_name="user",
+    )
+    sent_review_ids = []
+    error = None
+    try:
+        for review in reviews:
+            user = review.application.user
+            sender.send_message(notification.to_email(user, [user.email]))
+            sent_review_ids.append(review.id)
+    except Exception as e:
+        logger.error(f"Failed to send the decision of review {review.id}: {e!r}")
+        error = e
+
+    campaign = record_campaign_chunk(campaign, reviews, sent_review_ids, error)
+    return (campaign, len(sent_review_ids))
+
+
+def send_running_campaigns(chunk_size=None):
+    """
+    Send all the emails of the running campaigns, without limiting the rate, and
+    return the number of emails sent. Used by tests and for one-off runs, the
+    send_decision_emails command keeps polling.
+    """
+    chunk_size = chunk_size or settings.DECISION_EMAIL_CHUNK_SIZE
+    sender = OutboxSender()
+    sent = 0
+    try:
+        while True:
+            result = send_campaign_chunk(sender, chunk_size)
+            if result is None:
+                return sent
+            (campaign, chunk_sent) = result
+            if not chunk_sent and campaign.state == "Running":
+                # The remaining reviews are being sent by another worker
+                return sent
+            sent += chunk_sent
+    finally:
+        sender.close()
@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from event.outbox import OutboxSender
+from review.campaigns import get_chunk_interval, send_campaign_chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the decision emails of the campaigns started from the Send Decisions "
+        "page, in chunks and at most at the given rate. Must be running for any "
+        "decision email to be sent."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=settings.DECISION_EMAIL_CHUNK_SIZE,
+            help="Number of emails sent before the progress is recorded.",
+        )
+        parser.add_argument(
+            "--per-minute",
+            type=int,
+            default=settings.DECISION_EMAILS_PER_MINUTE,
+            help="Maximum number of emails sent per minute, 0 for no limit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds to wait before polling for running campaigns again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send the emails of the running campaigns, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        sender = OutboxSender()
+        try:
+            while True:
+                start = time.monotonic()
+                result = send_campaign_chunk(sender, options["chunk_size"])
+                if result is None:
+                    if options["once"]:
+                        return
+                    # Do not keep the connection open while waiting for a campaign
+                    sender.close()
+                    time.sleep(options["interval"])
+                    continue
+
+                (campaign, sent) = result
+                self.stdout.write(
+                    f"Sent {sent} {campaign.status} decision(s), {campaign.sent} of "
+                    f"{campaign.total} in total. The campaign is {campaign.state}."
+                )
+                if campaign.last_error and campaign.state == "Paused":
+                    self.stderr.write(campaign.last_error)
+                if not sent:
+                    # The remaining reviews are being sent by another worker
+                    time.sleep(options["interval"])
+                    continue
+                delay = get_chunk_interval(sent, options["per_minute"]) - (
+                    time.monotonic() - start
+                )
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            sender.close()
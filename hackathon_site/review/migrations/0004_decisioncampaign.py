@@ -0,0 +1,70 @@
+# Generated by Django 3.2.15 on 2026-10-18 10:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("review", "0003_reviewergoup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DecisionCampaign",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("Accepted", "Accepted"),
+                            ("Waitlisted", "Waitlisted"),
+                            ("Rejected", "Rejected"),
+                        ],
+                        max_length=64,
+                    ),
+                ),
+                ("date_start", models.DateTimeField()),
+                ("date_end", models.DateTimeField()),
+                ("dashboard_url", models.CharField(max_length=255)),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("Running", "Running"),
+                            ("Paused", "Paused"),
+                            ("Completed", "Completed"),
+                        ],
+                        default="Running",
+                        max_length=64,
+                    ),
+                ),
+                ("total", models.PositiveIntegerField()),
+                ("sent", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("review", "0004_decisioncampaign"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="decisioncampaign",
+            name="lease_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="review",
+            name="decision_lease_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
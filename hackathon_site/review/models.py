@@ -1,4 +1,8 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.core import validators
 from event.models import User
 from registration.models import Application, Team
@@ -29,6 +33,8 @@ class Review(models.Model):
     reviewer_comments = models.TextField(null=True, blank=True)
     status = models.CharField(max_length=64, choices=STATUS_CHOICES, null=False)
     decision_sent_date = models.DateField(null=True, blank=True)
+    # Set while a decision campaign is sending the decision, see DecisionCampaign
+    decision_lease_until = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=False)
     updated_at = models.DateTimeField(auto_now=True, null=False)
 
@@ -50,3 +56,81 @@ class TeamReview(Team):
     class Meta:
         proxy = True
         verbose_name = "Team"
+
+
+class DecisionCampaign(models.Model):
+    """
+    A run of decision emails for the reviews with a status, updated between
+    date_start and date_end and whose decision was not sent yet, started from the
+    Send Decisions page. The send_decision_emails command sends them in chunks, and
+    marks the decision of the reviews as sent after each chunk.
+
+    A chunk is claimed in a short transaction, which leases the campaign and its
+    reviews for settings.DECISION_EMAIL_LEASE_TIME so that other workers skip them,
+    and the emails are sent outside of any transaction.
+
+    A campaign is paused if sending an email fails, and can be resumed from the Send
+    Decisions page, which sends the decisions which were not sent yet.
+    """
+
+    STATE_CHOICES = [
+        ("Running", "Running"),
+        ("Paused", "Paused"),
+        ("Completed", "Completed"),
+    ]
+
+    status = models.CharField(max_length=64, choices=Review.STATUS_CHOICES, null=False)
+    date_start = models.DateTimeField(null=False)
+    date_end = models.DateTimeField(null=False)
+    # Absolute URL of the dashboard linked to in the emails
+    dashboard_url = models.CharField(max_length=255, null=False)
+    created_by = models.ForeignKey(
+        User, related_name="+", on_delete=models.SET_NULL, null=True
+    )
+
+    state = models.CharField(max_length=64, choices=STATE_CHOICES, default="Running")
+    # Number of emails to send, at most the quantity requested
+    total = models.PositiveIntegerField(null=False)
+    sent = models.PositiveIntegerField(default=0, null=False)
+    last_error = models.TextField(blank=True, null=False, default="")
+    lease_until = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, null=False)
+    updated_at = models.DateTimeField(auto_now=True, null=False)
+
+    def __str__(self):
+        return f"{self.status} decisions, {self.created_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def remaining(self):
+        return max(self.total - self.sent, 0)
+
+    def is_stalled(self):
+        """
+        Whether the campaign is running but no chunk was claimed for
+        settings.DECISION_CAMPAIGN_STALLED_AFTER seconds since it started, which
+        means that no send_decision_emails command is running
+        """
+        return (
+            self.state == "Running"
+            and not self.sent
+            and self.lease_until is None
+            and self.created_at
+            <= timezone.now()
+            - timedelta(seconds=settings.DECISION_CAMPAIGN_STALLED_AFTER)
+        )
+
+    def get_reviews(self):
+        """
+        The reviews whose decision is still to be sent, with their user
+        """
+        return (
+            Review.objects.filter(
+                status=self.status,
+                updated_at__gte=self.date_start,
+                updated_at__lte=self.date_end,
+                decision_sent_date__isnull=True,
+            )
+            .select_related("application__user")
+            .order_by("id")
+        )
@@ -557,3 +557,19 @@ class AssignReviewerToTeamViewTestCase(SetupUserMixin, TestCase):
         expected_url = reverse("admin:review_teamreview_changelist")
         self.assertRedirects(response, expected_url)
         self.assertContains(response, "No more teams remaining")
+
+    def test_skips_team_reviewed_since_queue_loaded(self):
+        """
+        Teams reviewed after the queue of teams was loaded should not be assigned
+        """
+        self._login()
+        # Loads the queue, and assigns self.user to team2
+        self.client.get(self.view)
+
+        for application in self.team3.applications.all():
+            self._review(application)
+
+        self.client.login(username=self.user2.username, password=self.user2_password)
+        response = self.client.get(self.view, follow=True)
+        self.assertRedirects(response, reverse("admin:review_teamreview_changelist"))
+        self.assertContains(response, "No more teams remaining")
@@ -0,0 +1,210 @@
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from unittest import SkipTest
+
+import redis
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from review.assignment import CacheTeamQueue, RedisTeamQueue
+
+
+class TeamQueueTestMixin:
+    """
+    Tests of a team queue, made by self._make_queue. The stress tests claim teams
+    from REVIEWERS threads at once.
+    """
+
+    REVIEWERS = 16
+    TEAMS = 200
+    LEASE = 60
+
+    def setUp(self):
+        self.queue = self._make_queue()
+        start = datetime(2024, 10, 1, tzinfo=settings.TZ_INFO)
+        # Team i submitted i minutes after start, so teams are claimed in order
+        self.queue.reload(
+            [
+                (team_id, start + timedelta(minutes=team_id))
+                for team_id in range(1, self.TEAMS + 1)
+            ],
+            timeout=60,
+        )
+
+    def tearDown(self):
+        self.queue.delete()
+
+    def _run_reviewers(self, review):
+        """
+        Run review(user_id) in REVIEWERS threads started together, and return the
+        results by user id.
+        """
+        barrier = threading.Barrier(self.REVIEWERS)
+        results = {}
+
+        def run(user_id):
+            queue = self._make_queue()
+            barrier.wait()
+            results[user_id] = review(queue, user_id)
+
+        threads = [
+            threading.Thread(target=run, args=(user_id,))
+            for user_id in range(1, self.REVIEWERS + 1)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_claims_oldest_team(self):
+        self.assertTrue(self.queue.is_loaded())
+        self.assertEqual(self.queue.claim(1, self.LEASE), 1)
+        self.assertEqual(self.queue.claim(2, self.LEASE), 2)
+
+    def test_claim_releases_previous_team(self):
+        self.assertEqual(self.queue.claim(1, self.LEASE), 1)
+        self.assertEqual(self.queue.claim(1, self.LEASE), 2)
+        # Team 1 is back in the queue
+        self.assertEqual(self.queue.claim(2, self.LEASE), 1)
+
+    def test_expired_lease_released(self):
+        self.assertEqual(self.queue.claim(1, 0), 1)
+        time.sleep(0.01)
+        self.assertEqual(self.queue.claim(2, self.LEASE), 1)
+
+    def test_completed_team_not_released(self):
+        self.assertEqual(self.queue.claim(1, self.LEASE), 1)
+        self.queue.complete(1)
+        self.assertEqual(self.queue.claim(1, self.LEASE), 2)
+        self.assertEqual(self.queue.claim(2, self.LEASE), 3)
+
+    def test_reload_keeps_leases(self):
+        self.assertEqual(self.queue.claim(1, self.LEASE), 1)
+        self.queue.reload(
+            [(1, datetime(2024, 10, 1, tzinfo=settings.TZ_INFO))], timeout=60
+        )
+        self.assertIsNone(self.queue.claim(2, self.LEASE))
+
+    def test_concurrent_claims_are_distinct(self):
+        results = self._run_reviewers(
+            lambda queue, user_id: queue.claim(user_id, self.LEASE)
+        )
+        self.assertEqual(
+            sorted(results.values()), list(range(1, self.REVIEWERS + 1)),
+        )
+
+    def test_concurrent_reviews(self):
+        """
+        Reviewers claim and complete teams until none is left: every team must be
+        reviewed exactly once.
+        """
+
+        def review(queue, user_id):
+            reviewed = []
+            while True:
+                team_id = queue.claim(user_id, self.LEASE)
+                if team_id is None:
+                    return reviewed
+                reviewed.append(team_id)
+                queue.complete(team_id)
+
+        results = self._run_reviewers(review)
+        reviewed = [team_id for teams in results.values() for team_id in teams]
+        self.assertEqual(sorted(reviewed), list(range(1, self.TEAMS + 1)))
+
+    def test_concurrent_skips(self):
+        """
+        Reviewers skip teams without completing them: no team is assigned to two
+        reviewers at the end, and every team is still available.
+        """
+
+        def skip(queue, user_id):
+            for _ in range(20):
+                team_id = queue.claim(user_id, self.LEASE)
+            return team_id
+
+        results = self._run_reviewers(skip)
+        assigned = list(results.values())
+        self.assertEqual(len(set(assigned)), self.REVIEWERS)
+
+        def review_all(queue, user_id):
+            reviewed = []
+            while True:
+                team_id = queue.claim(user_id, self.LEASE)
+                if team_id is None:
+                    return reviewed
+                reviewed.append(team_id)
+                queue.complete(team_id)
+
+        remaining = review_all(self.queue, 0)
+        self.assertEqual(
+            sorted(remaining + assigned), list(range(1, self.TEAMS + 1)),
+        )
+
+
+class CacheTeamQueueTestCase(TeamQueueTestMixin, SimpleTestCase):
+    def _make_queue(self):
+        return CacheTeamQueue(caches["default"], prefix="test:assign_to_team:")
+
+
+class RedisTeamQueueTestCase(TeamQueueTestMixin, SimpleTestCase):
+    """
+    Runs against the Redis server at settings.REDIS_URI, and is skipped if there is
+    none, unless settings.REDIS_TESTS_REQUIRED is set, as in CI.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.redis = redis.Redis.from_url(
+            f"redis://{settings.REDIS_URI}", socket_connect_timeout=1
+        )
+        try:
+            cls.redis.ping()
+        except redis.ConnectionError:
+            if settings.REDIS_TESTS_REQUIRED:
+                raise
+            cls.tearDownClass()
+            raise SkipTest("No Redis server")
+        cls.prefix = f"test:assign_to_team:{uuid.uuid4().hex}:"
+
+    def _make_queue(self):
+        return RedisTeamQueue(self.redis, prefix=self.prefix)
+
+    def test_same_as_cache_queue(self):
+        """
+        The scripts and CacheTeamQueue are kept in sync by hand: random operations
+        give the same teams with both.
+        """
+        cache_queue = CacheTeamQueue(
+            caches["default"], prefix=f"test:assign_to_team:{uuid.uuid4().hex}:"
+        )
+        self.addCleanup(cache_queue.delete)
+        start = datetime(2024, 10, 1, tzinfo=settings.TZ_INFO)
+        rng = random.Random(0)
+
+        def submissions(teams):
+            return [(team_id, start + timedelta(minutes=team_id)) for team_id in teams]
+
+        for queue in (self.queue, cache_queue):
+            queue.reload(submissions(range(1, 41)), timeout=60)
+
+        for _ in range(500):
+            operation = rng.choice(["claim", "claim", "expire", "complete", "reload"])
+            if operation == "claim":
+                args = (rng.randint(1, 8), self.LEASE)
+            elif operation == "expire":
+                (operation, args) = ("claim", (rng.randint(1, 8), 0))
+            elif operation == "complete":
+                args = (rng.randint(1, 40),)
+            else:
+                args = (submissions(rng.sample(range(1, 41), 30)), 60)
+            results = [
+                getattr(queue, operation)(*args) for queue in (self.queue, cache_queue)
+            ]
+            self.assertEqual(results[0], results[1], (operation, args))
@@ -1,16 +1,29 @@
 import re
+import smtplib
 from datetime import datetime, timedelta
+from io import StringIO
 from unittest.mock import patch, MagicMock
 
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.core import mail
 from django.conf import settings
 from hackathon_site.tests import SetupUserMixin
 from django.contrib.auth.models import Permission
 from django.db.models import Q
 from rest_framework import status
-from review.models import Review, User
+from event.outbox import OutboxSender
+from review.campaigns import (
+    claim_campaign_chunk,
+    get_chunk_interval,
+    send_campaign_chunk,
+    send_running_campaigns,
+)
+from review.models import DecisionCampaign, Review, User
 
 
 class MailerTestCase(SetupUserMixin, TestCase):
@@ -158,6 +171,8 @@ class MailerTestCase(SetupUserMixin, TestCase):
 
         response = self.client.post(self.view, data=self.form_data)
 
+        send_running_campaigns()
+
         quantity_after = Review.objects.filter(
             decision_sent_date__isnull=True, status="Accepted"
         ).count()
@@ -181,6 +196,8 @@ class MailerTestCase(SetupUserMixin, TestCase):
 
         response = self.client.post(self.view, data=self.form_data)
 
+        send_running_campaigns()
+
         quantity_after = Review.objects.filter(
             decision_sent_date__isnull=True, status="Accepted"
         ).count()
@@ -211,6 +228,7 @@ class MailerTestCase(SetupUserMixin, TestCase):
 
         # Send 1 accepted email
         response = self.client.post(self.view, data=self.form_data)
+        send_running_campaigns()
 
         clean = re.compile("<.*?>")
         clean_mail_body = re.sub(clean, "", mail.outbox[0].body)
@@ -241,6 +259,7 @@ class MailerTestCase(SetupUserMixin, TestCase):
         # Send 1 waitlisted email
         self.form_data["status"] = "Waitlisted"
         self.client.post(self.view, data=self.form_data)
+        send_running_campaigns()
 
         clean = re.compile("<.*?>")
         clean_mail_body = re.sub(clean, "", mail.outbox[0].body)
@@ -268,6 +287,7 @@ class MailerTestCase(SetupUserMixin, TestCase):
         # Send 1 rejected email
         self.form_data["status"] = "Rejected"
         self.client.post(self.view, data=self.form_data)
+        send_running_campaigns()
 
         clean = re.compile("<.*?>")
         clean_mail_body = re.sub(clean, "", mail.outbox[0].body)
@@ -280,3 +300,186 @@ class MailerTestCase(SetupUserMixin, TestCase):
             "we are not able to offer you a spot in the event this year",
             clean_mail_body,
         )
+
+    def _start_campaign(self, quantity=8):
+        self._login()
+        self._create_teams_and_reviews_for_mail_tests()
+        self.form_data["quantity"] = quantity
+        self.client.post(self.view, data=self.form_data)
+        return DecisionCampaign.objects.get()
+
+    def test_campaign_sent_in_background(self):
+        campaign = self._start_campaign(quantity=5)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            (campaign.state, campaign.sent, campaign.total), ("Running", 0, 5)
+        )
+
+        sender = OutboxSender()
+        self.addCleanup(sender.close)
+        (_, sent) = send_campaign_chunk(sender, 3)
+        self.assertEqual(sent, 3)
+        self.assertEqual(
+            Review.objects.filter(decision_sent_date__isnull=False).count(), 3
+        )
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.state, campaign.sent), ("Running", 3))
+
+        self.assertEqual(send_running_campaigns(), 2)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.state, campaign.sent), ("Completed", 5))
+        self.assertEqual(len({email.to[0] for email in mail.outbox}), 5)
+
+    def test_campaign_chunk_queries(self):
+        self._start_campaign()
+        sender = OutboxSender()
+        self.addCleanup(sender.close)
+        # The reviews of a chunk are read with their user, and marked at once
+        with CaptureQueriesContext(connection) as queries:
+            send_campaign_chunk(sender, 2)
+        with self.assertNumQueries(len(queries)):
+            send_campaign_chunk(sender, 5)
+        self.assertEqual(len(mail.outbox), 7)
+
+    def test_campaign_email_alternatives(self):
+        self._start_campaign(quantity=1)
+        send_running_campaigns()
+        email = mail.outbox[0]
+        self.assertNotIn("<", email.body)
+        self.assertNotIn("font-family", email.body)
+        self.assertIn(
+            f"dashboard (http://testserver{reverse('event:dashboard')})", email.body
+        )
+        self.assertEqual(email.alternatives[0][1], "text/html")
+        user = User.objects.get(email=email.to[0])
+        self.assertIn(f"Congratulations {user.first_name}!", email.alternatives[0][0])
+
+    def test_campaign_paused_on_failure_and_resumed(self):
+        campaign = self._start_campaign(quantity=4)
+
+        class FailingSender(OutboxSender):
+            def send_message(self, message):
+                if len(mail.outbox) == 2:
+                    raise smtplib.SMTPServerDisconnected(
+                        "Connection unexpectedly closed"
+                    )
+                super().send_message(message)
+
+        sender = FailingSender()
+        self.addCleanup(sender.close)
+        self.assertEqual(send_campaign_chunk(sender, 4)[1], 2)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.state, campaign.sent), ("Paused", 2))
+        self.assertIn("Connection unexpectedly closed", campaign.last_error)
+        # The decisions which were sent are recorded
+        self.assertEqual(
+            Review.objects.filter(decision_sent_date__isnull=False).count(), 2
+        )
+        self.assertEqual(send_running_campaigns(), 0)
+
+        response = self.client.post(
+            reverse("admin:resume-decision-campaign", args=[campaign.id])
+        )
+        self.assertRedirects(response, self.view)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.state, campaign.last_error), ("Running", ""))
+
+        self.assertEqual(send_running_campaigns(), 2)
+        self.assertEqual(len({email.to[0] for email in mail.outbox}), 4)
+
+    def test_campaign_paused(self):
+        campaign = self._start_campaign()
+        self.client.post(reverse("admin:pause-decision-campaign", args=[campaign.id]))
+        self.assertEqual(send_running_campaigns(), 0)
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.state, "Paused")
+
+    def test_campaign_chunk_leased(self):
+        campaign = self._start_campaign(quantity=5)
+        (claimed_campaign, reviews) = claim_campaign_chunk(3)
+        self.assertEqual(claimed_campaign, campaign)
+        self.assertEqual(len(reviews), 3)
+        # The emails are sent outside of a transaction, so other workers skip the
+        # campaign while it is leased
+        self.assertIsNone(claim_campaign_chunk(3))
+        self.assertEqual(send_running_campaigns(), 0)
+
+        # Until the lease expires, if the worker did not record the chunk
+        DecisionCampaign.objects.update(lease_until=timezone.now())
+        (_, expired_reviews) = claim_campaign_chunk(3)
+        self.assertEqual(len(expired_reviews), 3)
+        self.assertFalse(
+            {review.id for review in reviews} & {r.id for r in expired_reviews}
+        )
+
+    def test_campaign_paused_while_sending(self):
+        campaign = self._start_campaign(quantity=4)
+
+        class PausingSender(OutboxSender):
+            def send_message(self, message):
+                DecisionCampaign.objects.update(state="Paused")
+                super().send_message(message)
+
+        sender = PausingSender()
+        self.addCleanup(sender.close)
+        self.assertEqual(send_campaign_chunk(sender, 2)[1], 2)
+        campaign.refresh_from_db()
+        self.assertEqual((campaign.state, campaign.sent), ("Paused", 2))
+        self.assertIsNone(campaign.lease_until)
+        self.assertFalse(
+            Review.objects.filter(decision_lease_until__isnull=False).exists()
+        )
+        self.assertEqual(send_running_campaigns(), 0)
+
+    def test_campaign_stalled(self):
+        campaign = self._start_campaign()
+        hidden = 'id="decision-campaigns-stalled" style="display: none"'
+        self.assertContains(self.client.get(self.view), hidden)
+
+        # No worker claimed a chunk since the campaign started
+        DecisionCampaign.objects.update(
+            created_at=timezone.now()
+            - timedelta(seconds=settings.DECISION_CAMPAIGN_STALLED_AFTER)
+        )
+        response = self.client.get(self.view)
+        self.assertContains(response, 'id="decision-campaigns-stalled"')
+        self.assertNotContains(response, hidden)
+        response = self.client.get(reverse("admin:decision-campaign-progress"))
+        self.assertTrue(response.json()["campaigns"][0]["stalled"])
+
+        claim_campaign_chunk(2)
+        campaign.refresh_from_db()
+        self.assertFalse(campaign.is_stalled())
+
+    def test_campaign_progress(self):
+        campaign = self._start_campaign(quantity=3)
+        response = self.client.get(self.view)
+        self.assertContains(response, "0 / 3")
+
+        call_command(
+            "send_decision_emails", "--once", "--per-minute", "0", stdout=StringIO()
+        )
+        response = self.client.get(reverse("admin:decision-campaign-progress"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()["campaigns"][0],
+            {
+                "id": campaign.id,
+                "status": "Accepted",
+                "state": "Completed",
+                "sent": 3,
+                "total": 3,
+                "last_error": "",
+                "created_at": response.json()["campaigns"][0]["created_at"],
+                "stalled": False,
+            },
+        )
+
+        self.user.is_superuser = False
+        self.user.save()
+        response = self.client.get(reverse("admin:decision-campaign-progress"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_chunk_interval(self):
+        self.assertEqual(get_chunk_interval(25, 120), 12.5)
+        self.assertEqual(get_chunk_interval(25, 0), 0)
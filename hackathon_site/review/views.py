@@ -1,32 +1,52 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
-from django.urls import reverse_lazy
-from django.shortcuts import redirect
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.urls import reverse, reverse_lazy
+from django.shortcuts import get_object_or_404, redirect
+from django.views import View
 from django.views.generic.edit import FormView
 from django.contrib.auth.mixins import UserPassesTestMixin
 
-from django.template.loader import render_to_string
-from django.core import mail
-
 from review.forms import MailerForm
-from review.models import Review
+from review.models import DecisionCampaign, Review
 from hackathon_site import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Number of campaigns shown on the Send Decisions page
+RECENT_CAMPAIGNS = 10
 
-class MailerView(UserPassesTestMixin, FormView):
-    template_name = "review/send-decisions.html"
-    success_url = reverse_lazy("admin:send-decision-emails")
-    form_class = MailerForm
 
+def get_campaign_progress(campaign):
+    return {
+        "id": campaign.id,
+        "status": campaign.status,
+        "state": campaign.state,
+        "sent": campaign.sent,
+        "total": campaign.total,
+        "last_error": campaign.last_error,
+        "created_at": campaign.created_at,
+        "stalled": campaign.is_stalled(),
+    }
+
+
+class SuperuserRequiredMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_superuser
 
+
+class MailerView(SuperuserRequiredMixin, FormView):
+    template_name = "review/send-decisions.html"
+    success_url = reverse_lazy("admin:send-decision-emails")
+    form_class = MailerForm
+
     def form_valid(self, form, **kwargs):
         """
-        On form submission valid get the data and send emails depending on the status.
+        On form submission valid start a campaign sending the emails for the status,
+        see DecisionCampaign. They are sent in the background by the
+        send_decision_emails command.
 
         Accepted / Waitlisted / Rejected emails will be sent for applications reviewed
         (with last_updated_date) between date_start and date_end. The number of emails
@@ -38,70 +58,70 @@ class MailerView(UserPassesTestMixin, FormView):
         date_end = datetime.combine(
             form.cleaned_data["date_end"], datetime.max.time()
         ).replace(tzinfo=settings.TZ_INFO)
-        status = form.cleaned_data["status"]
-        quantity = form.cleaned_data["quantity"]
-
-        queryset = Review.objects.filter(
-            status=status,
-            updated_at__gte=date_start,
-            updated_at__lte=date_end,
-            decision_sent_date__isnull=True,
-        )[:quantity]
-
-        # Get a mail socket connection and manually open it
-        connection = mail.get_connection(fail_silently=False)
-        connection.open()
-
-        try:
-            for review in queryset:
-                current_date = datetime.now().date()
-
-                # Create context data for rendering the template. Note that this assumes that both the message
-                # and html_message have identical context data
-                render_to_string_context = {
-                    "user": review.application.user,
-                    "request": self.request,
-                }
-
-                review.application.user.email_user(
-                    subject=render_to_string(
-                        f"review/emails/{status.lower()}_email_subject.txt"
-                    ),
-                    message=render_to_string(
-                        f"review/emails/{status.lower()}_email_body.html",
-                        render_to_string_context,  # Pass context data to the template
-                    ),
-                    html_message=render_to_string(
-                        f"review/emails/{status.lower()}_email_body.html",
-                        render_to_string_context,  # Pass context data to the template
-                    ),
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    connection=connection,
-                )
-
-                review.decision_sent_date = current_date
-                review.save()
-        except Exception as e:
-            logger.error(e)
-            raise e
-        finally:
-            connection.close()
+
+        campaign = DecisionCampaign(
+            status=form.cleaned_data["status"],
+            date_start=date_start,
+            date_end=date_end,
+            dashboard_url=self.request.build_absolute_uri(reverse("event:dashboard")),
+            created_by=self.request.user,
+        )
+        campaign.total = min(
+            form.cleaned_data["quantity"], campaign.get_reviews().count()
+        )
+        if not campaign.total:
+            campaign.state = "Completed"
+        campaign.save()
 
         return redirect(self.get_success_url())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        context["accepted_count"] = Review.objects.filter(
-            decision_sent_date__isnull=True, status="Accepted"
-        ).count()
+        counts = Review.objects.filter(decision_sent_date__isnull=True).aggregate(
+            **{
+                f"{status.lower()}_count": Count("id", filter=Q(status=status))
+                for (status, _) in Review.STATUS_CHOICES
+            }
+        )
+        context.update(counts)
+        context["campaigns"] = DecisionCampaign.objects.order_by("-id")[
+            :RECENT_CAMPAIGNS
+        ]
+        context["stalled"] = any(
+            campaign.is_stalled() for campaign in context["campaigns"]
+        )
 
-        context["waitlisted_count"] = Review.objects.filter(
-            decision_sent_date__isnull=True, status="Waitlisted"
-        ).count()
+        return context
 
-        context["rejected_count"] = Review.objects.filter(
-            decision_sent_date__isnull=True, status="Rejected"
-        ).count()
 
-        return context
+class DecisionCampaignProgressView(SuperuserRequiredMixin, View):
+    """
+    The progress of the recent campaigns, polled by the Send Decisions page
+    """
+
+    def get(self, request, *args, **kwargs):
+        campaigns = DecisionCampaign.objects.order_by("-id")[:RECENT_CAMPAIGNS]
+        return JsonResponse(
+            {"campaigns": [get_campaign_progress(campaign) for campaign in campaigns]}
+        )
+
+
+class DecisionCampaignStateView(SuperuserRequiredMixin, View):
+    """
+    Pause a running campaign, or resume a paused campaign
+    """
+
+    transitions = {"pause": ("Running", "Paused"), "resume": ("Paused", "Running")}
+    action = None
+
+    def post(self, request, *args, **kwargs):
+        campaign = get_object_or_404(DecisionCampaign, pk=kwargs["pk"])
+        (from_state, to_state) = self.transitions[self.action]
+        # Does not wait for the chunk being sent, if any, since it is sent outside of
+        # a transaction. The worker still records it, and only then sees the new
+        # state, when record_campaign_chunk reads the campaign again.
+        DecisionCampaign.objects.filter(pk=campaign.pk, state=from_state).update(
+            state=to_state, last_error=""
+        )
+        return redirect("admin:send-decision-emails")